@@ -5,6 +5,7 @@ import click
 
 from agents.ag2.agent import YoutubeMCPAgent
 from agents.ag2.task_manager import AgentTaskManager
+from agents.lifespan import close_on_shutdown
 from common.server import A2AServer
 from common.types import (
     AgentCapabilities,
@@ -57,12 +58,16 @@ def main(host, port):
             skills=skills,
         )
 
+        agent = YoutubeMCPAgent()
         server = A2AServer(
             agent_card=agent_card,
-            task_manager=AgentTaskManager(agent=YoutubeMCPAgent()),
+            task_manager=AgentTaskManager(agent=agent),
             host=host,
             port=port,
         )
+        if agent.initialized:
+            # Reap the mcp-youtube subprocesses of the pooled sessions
+            close_on_shutdown(server.app, agent.pool.close)
 
         logger.info(f'Starting AG2 Youtube MCP agent on {host}:{port}')
         server.start()
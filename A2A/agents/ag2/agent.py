@@ -1,6 +1,7 @@
 import json
 import logging
 import os
+import tempfile
 import traceback
 
 from collections.abc import AsyncIterable
@@ -8,11 +9,14 @@ from typing import Any, Literal
 
 from autogen import AssistantAgent, LLMConfig
 from autogen.mcp import create_toolkit
+from autogen.tools import Tool
 from dotenv import load_dotenv
 from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
 from pydantic import BaseModel
 
+from agents.ag2.mcp_pool import MCPSessionPool
+from agents.ag2.transcripts import TranscriptCache, cached_caption_tool
+
 
 logger = logging.getLogger(__name__)
 
@@ -52,27 +56,23 @@ class YoutubeMCPAgent:
                 response_format=ResponseModel,
             )
 
-            # Create the assistant agent that will use MCP tools
-            self.agent = AssistantAgent(
-                name='YoutubeMCPAgent',
-                llm_config=llm_config,
-                system_message=(
-                    'You are a specialized assistant for processing YouTube videos. '
-                    'You can use MCP tools to fetch captions and process YouTube content. '
-                    'You can provide captions, summarize videos, or analyze content from YouTube. '
-                    "If the user asks about anything not related to YouTube videos or doesn't provide a YouTube URL, "
-                    'politely state that you can only help with tasks related to YouTube videos.\n\n'
-                    'IMPORTANT: Always respond using the ResponseModel format with these fields:\n'
-                    '- text_reply: Your main response text\n'
-                    '- closed_captions: YouTube captions if available, null if not relevant\n'
-                    "- status: Always use 'TERMINATE' for all responses \n\n"
-                    'Example response:\n'
-                    '{\n'
-                    '  "text_reply": "Here\'s the information you requested...",\n'
-                    '  "closed_captions": null,\n'
-                    '  "status": "TERMINATE"\n'
-                    '}'
+            self.llm_config = llm_config
+            # Captions already downloaded, checked before the MCP tool runs
+            self.transcripts = TranscriptCache(
+                os.getenv('TRANSCRIPT_CACHE_DIR')
+                or os.path.join(
+                    tempfile.gettempdir(), 'a2a_youtube_transcripts'
                 ),
+                max_bytes=int(os.getenv('TRANSCRIPT_CACHE_MB', '256'))
+                * 1024
+                * 1024,
+            )
+            # Warm mcp-youtube sessions, each with its own toolkit and
+            # assistant agent, as a run registers its tools on the agent
+            self.pool = MCPSessionPool(
+                StdioServerParameters(command='mcp-youtube'),
+                setup=self._setup_session,
+                size=int(os.getenv('MCP_POOL_SIZE', '4')),
             )
 
             self.initialized = True
@@ -81,6 +81,42 @@ class YoutubeMCPAgent:
             logger.error(f'Failed to import AG2 components: {e}')
             self.initialized = False
 
+    def create_agent(self) -> AssistantAgent:
+        """Create the assistant agent that will use MCP tools."""
+        return AssistantAgent(
+            name='YoutubeMCPAgent',
+            llm_config=self.llm_config,
+            system_message=(
+                'You are a specialized assistant for processing YouTube videos. '
+                'You can use MCP tools to fetch captions and process YouTube content. '
+                'You can provide captions, summarize videos, or analyze content from YouTube. '
+                "If the user asks about anything not related to YouTube videos or doesn't provide a YouTube URL, "
+                'politely state that you can only help with tasks related to YouTube videos.\n\n'
+                'IMPORTANT: Always respond using the ResponseModel format with these fields:\n'
+                '- text_reply: Your main response text\n'
+                '- closed_captions: YouTube captions if available, null if not relevant\n'
+                "- status: Always use 'TERMINATE' for all responses \n\n"
+                'Example response:\n'
+                '{\n'
+                '  "text_reply": "Here\'s the information you requested...",\n'
+                '  "closed_captions": null,\n'
+                '  "status": "TERMINATE"\n'
+                '}'
+            ),
+        )
+
+    async def _setup_session(
+        self, session: ClientSession
+    ) -> tuple[AssistantAgent, list[Tool]]:
+        toolkit = await create_toolkit(session=session)
+        tools = [
+            cached_caption_tool(x, session, self.transcripts)
+            if x.name == 'download_closed_captions'
+            else x
+            for x in toolkit.tools
+        ]
+        return self.create_agent(), tools
+
     def get_agent_response(self, response: str) -> dict[str, Any]:
         """Format agent response in a consistent structure."""
         try:
@@ -128,26 +164,12 @@ class YoutubeMCPAgent:
             logger.info(f'Processing query: {query[:50]}...')
 
             try:
-                # Create stdio server parameters for mcp-youtube
-                server_params = StdioServerParameters(
-                    command='mcp-youtube',
-                )
-
-                # Connect to the MCP server using stdio client
-                async with (
-                    stdio_client(server_params) as (read, write),
-                    ClientSession(read, write) as session,
-                ):
-                    # Initialize the connection
-                    await session.initialize()
-
-                    # Create toolkit and register tools
-                    toolkit = await create_toolkit(session=session)
-                    toolkit.register_for_llm(self.agent)
-
-                    result = await self.agent.a_run(
+                # Borrow a warm session, with the tools created for it
+                async with self.pool.session() as pooled:
+                    agent, tools = pooled.context
+                    result = await agent.a_run(
                         message=query,
-                        tools=toolkit.tools,
+                        tools=tools,
                         max_turns=2,  # Fixed at 2 turns to allow tool usage
                         user_input=False,
                     )
@@ -169,8 +191,8 @@ class YoutubeMCPAgent:
                             f'Error processing request: {extraction_error!s}'
                         )
 
-                    # Final response
-                    yield self.get_agent_response(response)
+                # Final response
+                yield self.get_agent_response(response)
 
             except Exception as e:
                 logger.error(
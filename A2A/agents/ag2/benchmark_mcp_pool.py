@@ -0,0 +1,104 @@
+"""Per-request latency of MCP tool calls with and without the session pool.
+
+Runs against a local fake MCP server, agents.ag2.fake_mcp_server, which
+answers the caption tool instantly, so the timings are the cost of reaching
+the tool:
+
+- spawn: a new server process, handshake and toolkit per request, as the
+  agent used to do.
+- pool: a session borrowed from a warm MCPSessionPool.
+
+run:
+  cd A2A && uv run python -m agents.ag2.benchmark_mcp_pool
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+from autogen.mcp import create_toolkit
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from agents.ag2.fake_mcp_server import CAPTIONS
+from agents.ag2.mcp_pool import MCPSessionPool
+
+
+REQUESTS = 20
+CONCURRENCY = 4
+
+SERVER_PARAMS = StdioServerParameters(
+    command=sys.executable,
+    args=['-m', 'agents.ag2.fake_mcp_server'],
+)
+
+
+async def call_tool(session: ClientSession):
+    result = await session.call_tool(
+        'download_closed_captions', {'video_url': 'https://youtu.be/x'}
+    )
+    assert result.content[0].text == CAPTIONS
+
+
+async def spawn_request():
+    async with (
+        stdio_client(SERVER_PARAMS) as (read, write),
+        ClientSession(read, write) as session,
+    ):
+        await session.initialize()
+        await create_toolkit(session=session)
+        await call_tool(session)
+
+
+async def pool_request(pool: MCPSessionPool):
+    async with pool.session() as pooled:
+        await call_tool(pooled.session)
+
+
+async def measure(request, concurrency: int) -> list[float]:
+    latencies = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def timed():
+        async with slots:
+            started = time.perf_counter()
+            await request()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*[timed() for _ in range(REQUESTS)])
+    return latencies
+
+
+async def main():
+    pool = MCPSessionPool(
+        SERVER_PARAMS,
+        setup=lambda session: create_toolkit(session=session),
+        size=CONCURRENCY,
+    )
+    started = time.perf_counter()
+    await pool.warm()
+    print(
+        f'warmed {CONCURRENCY} sessions in '
+        f'{(time.perf_counter() - started) * 1000:.0f} ms'
+    )
+    print(f'{"mode":>6} {"concurrency":>12} {"p50 ms":>8} {"max ms":>8}')
+    try:
+        for concurrency in [1, CONCURRENCY]:
+            for name, request in [
+                ('spawn', spawn_request),
+                ('pool', lambda: pool_request(pool)),
+            ]:
+                latencies = await measure(request, concurrency)
+                print(
+                    f'{name:>6} {concurrency:>12} '
+                    f'{statistics.median(latencies) * 1000:>8.1f} '
+                    f'{max(latencies) * 1000:>8.1f}'
+                )
+        print(pool.metrics())
+    finally:
+        await pool.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,22 @@
+"""Fake YouTube MCP server for benchmarks, answering instantly.
+
+run:
+  cd A2A && uv run python -m agents.ag2.fake_mcp_server
+"""
+
+from mcp.server.fastmcp import FastMCP
+
+
+CAPTIONS = 'Never gonna give you up, never gonna let you down.'
+
+server = FastMCP('fake-youtube', log_level='WARNING')
+
+
+@server.tool()
+def download_closed_captions(video_url: str) -> str:
+    """Download the closed captions of a YouTube video."""
+    return CAPTIONS
+
+
+if __name__ == '__main__':
+    server.run()
@@ -0,0 +1,239 @@
+"""Pool of warm MCP stdio sessions.
+
+Spawning the MCP server and the MCP handshake dominate the latency of a
+request, so sessions are kept open and reused across requests instead.
+"""
+
+import asyncio
+import contextlib
+import dataclasses
+import logging
+import time
+
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
+
+import anyio
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+
+
+logger = logging.getLogger(__name__)
+
+# What an MCP session raises when its server fails, exits or cannot be
+# spawned. Timeouts are OSErrors too.
+SESSION_ERRORS = (
+    McpError,
+    OSError,
+    anyio.BrokenResourceError,
+    anyio.ClosedResourceError,
+)
+
+
+@dataclasses.dataclass
+class MCPPoolMetrics:
+    spawned: int = 0
+    reused: int = 0
+    recycled: int = 0
+    failed_health_checks: int = 0
+    idle: int = 0
+
+
+class PooledSession:
+    """An MCP session kept open by a task of its own.
+
+    The stdio client and the session are entered and exited by the same
+    task, as anyio requires, while requests borrow the session from others.
+    """
+
+    def __init__(self):
+        self.session: ClientSession | None = None
+        # Whatever the pool's setup returned for this session.
+        self.context: Any = None
+        self.uses = 0
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self._ready: asyncio.Future | None = None
+        self._closed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(
+        self,
+        server_params: StdioServerParameters,
+        setup: Callable[[ClientSession], Awaitable[Any]] | None,
+        timeout: float,
+    ):
+        self._ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run(server_params, setup))
+        try:
+            await asyncio.wait_for(asyncio.shield(self._ready), timeout)
+        except BaseException:
+            await self.close()
+            raise
+
+    async def _run(
+        self,
+        server_params: StdioServerParameters,
+        setup: Callable[[ClientSession], Awaitable[Any]] | None,
+    ):
+        try:
+            async with (
+                stdio_client(server_params) as (read, write),
+                ClientSession(read, write) as session,
+            ):
+                await session.initialize()
+                self.context = await setup(session) if setup else None
+                self.session = session
+                self._ready.set_result(None)
+                await self._closed.wait()
+        except* SESSION_ERRORS as group:
+            # The stdio client's task groups wrap the error of the session.
+            e = group
+            while isinstance(e, BaseExceptionGroup):
+                e = e.exceptions[0]
+            if not self._ready.done():
+                self._ready.set_exception(e)
+            else:
+                logger.warning(f'MCP session ended: {e}')
+        finally:
+            # Other errors are raised by the task, but must not keep start
+            # waiting for its timeout.
+            if not self._ready.done():
+                self._ready.set_exception(
+                    RuntimeError('MCP session ended before it was ready')
+                )
+
+    async def ping(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except SESSION_ERRORS as e:
+            logger.warning(f'MCP session failed its health check: {e}')
+            return False
+
+    async def close(self):
+        self._closed.set()
+        if self._task:
+            try:
+                await asyncio.wait_for(self._task, 10)
+            except (Exception, asyncio.CancelledError) as e:
+                logger.warning(f'Failed to close MCP session cleanly: {e}')
+
+
+class MCPSessionPool:
+    """Hands out warm MCP sessions, at most `size` at a time.
+
+    A session is recycled after `max_uses` requests or `max_age` seconds,
+    and an idle session is pinged before reuse if it has not been used for
+    `ping_after` seconds or its last request failed. `setup` runs once per
+    session, e.g. to create the toolkit, and its result is reused with it.
+    """
+
+    def __init__(
+        self,
+        server_params: StdioServerParameters,
+        setup: Callable[[ClientSession], Awaitable[Any]] | None = None,
+        size: int = 4,
+        max_uses: int = 100,
+        max_age: float = 60 * 60,
+        ping_after: float = 30.0,
+        ping_timeout: float = 5.0,
+        start_timeout: float = 30.0,
+    ):
+        self._server_params = server_params
+        self._setup = setup
+        self._size = size
+        self._max_uses = max_uses
+        self._max_age = max_age
+        self._ping_after = ping_after
+        self._ping_timeout = ping_timeout
+        self._start_timeout = start_timeout
+        self._slots = asyncio.Semaphore(size)
+        # Most recently used last, and reused first as it is the warmest.
+        self._idle: list[PooledSession] = []
+        # Sessions being closed in the background, referenced until done.
+        self._closing: set[asyncio.Task] = set()
+        self._metrics = MCPPoolMetrics()
+
+    @contextlib.asynccontextmanager
+    async def session(self) -> AsyncIterator[PooledSession]:
+        """Borrow a session for the duration of a request."""
+        async with self._slots:
+            pooled = await self._acquire()
+            try:
+                yield pooled
+            except BaseException:
+                # Check the session before it is used again.
+                pooled.last_used = 0.0
+                raise
+            finally:
+                self._release(pooled)
+
+    async def warm(self, count: int | None = None):
+        """Open sessions ahead of the first requests."""
+        count = min(count or self._size, self._size) - len(self._idle)
+        sessions = await asyncio.gather(
+            *[self._spawn() for _ in range(count)], return_exceptions=True
+        )
+        for pooled in sessions:
+            if isinstance(pooled, PooledSession):
+                self._idle.append(pooled)
+            else:
+                logger.warning(f'Failed to open MCP session: {pooled}')
+
+    async def close(self):
+        """Close the idle sessions and wait for those already closing."""
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*[x.close() for x in idle], *self._closing)
+
+    def metrics(self) -> MCPPoolMetrics:
+        return dataclasses.replace(self._metrics, idle=len(self._idle))
+
+    async def _acquire(self) -> PooledSession:
+        while self._idle:
+            pooled = self._idle.pop()
+            if not pooled.alive or self._expired(pooled):
+                self._metrics.recycled += 1
+                await pooled.close()
+                continue
+            if time.monotonic() - pooled.last_used > self._ping_after and (
+                not await pooled.ping(self._ping_timeout)
+            ):
+                self._metrics.failed_health_checks += 1
+                await pooled.close()
+                continue
+            self._metrics.reused += 1
+            return pooled
+        return await self._spawn()
+
+    def _release(self, pooled: PooledSession):
+        pooled.uses += 1
+        if pooled.last_used:
+            pooled.last_used = time.monotonic()
+        if pooled.alive and not self._expired(pooled):
+            self._idle.append(pooled)
+            return
+        self._metrics.recycled += 1
+        task = asyncio.create_task(pooled.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _expired(self, pooled: PooledSession) -> bool:
+        return (
+            pooled.uses >= self._max_uses
+            or time.monotonic() - pooled.created_at > self._max_age
+        )
+
+    async def _spawn(self) -> PooledSession:
+        pooled = PooledSession()
+        await pooled.start(
+            self._server_params, self._setup, self._start_timeout
+        )
+        self._metrics.spawned += 1
+        return pooled
@@ -0,0 +1,219 @@
+import asyncio
+import contextlib
+import unittest
+
+from unittest import mock
+
+from mcp import StdioServerParameters
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, ErrorData
+
+from agents.ag2 import mcp_pool
+from agents.ag2.mcp_pool import MCPSessionPool
+
+
+class FakeClientSession:
+    """Stands in for an MCP ClientSession, without spawning a server."""
+
+    instances: list['FakeClientSession'] = []
+    fail_initialize = False
+
+    def __init__(self, read, write):
+        self.closed = False
+        self.ping_fails = False
+        self.instances.append(self)
+
+    async def __aenter__(self) -> 'FakeClientSession':
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        self.closed = True
+
+    async def initialize(self) -> None:
+        if self.fail_initialize:
+            raise ConnectionError('server exited')
+
+    async def send_ping(self) -> None:
+        if self.ping_fails:
+            raise ConnectionError('no pong')
+
+
+@contextlib.asynccontextmanager
+async def fake_stdio_client(server_params):
+    yield None, None
+
+
+class MCPSessionPoolTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for MCPSessionPool."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        FakeClientSession.instances = []
+        FakeClientSession.fail_initialize = False
+        self.now = 1000.0
+        for target, value in [
+            ('stdio_client', fake_stdio_client),
+            ('ClientSession', FakeClientSession),
+            # The module's clock only, the event loop keeps the real one.
+            ('time', mock.Mock(monotonic=lambda: self.now)),
+        ]:
+            patcher = mock.patch.object(mcp_pool, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.setups = 0
+
+    async def setup_session(self, session: FakeClientSession) -> int:
+        self.setups += 1
+        return self.setups
+
+    def make_pool(self, **kwargs) -> MCPSessionPool:
+        pool = MCPSessionPool(
+            StdioServerParameters(command='mcp-server'),
+            **{'setup': self.setup_session, **kwargs},
+        )
+        self.addAsyncCleanup(pool.close)
+        return pool
+
+    async def test_sessions_are_reused(self) -> None:
+        """Test a released session serves the next request with its setup."""
+        pool = self.make_pool()
+        async with pool.session() as first:
+            self.assertEqual(first.context, 1)
+        async with pool.session() as second:
+            self.assertIs(second, first)
+        metrics = pool.metrics()
+        self.assertEqual((metrics.spawned, metrics.reused), (1, 1))
+        self.assertEqual(metrics.idle, 1)
+        self.assertEqual(self.setups, 1)
+
+    async def test_concurrent_requests_are_bounded_by_size(self) -> None:
+        """Test at most `size` sessions are borrowed at a time."""
+        pool = self.make_pool(size=2)
+        borrowed = 0
+        most = 0
+
+        async def request():
+            nonlocal borrowed, most
+            async with pool.session():
+                borrowed += 1
+                most = max(most, borrowed)
+                await asyncio.sleep(0.01)
+                borrowed -= 1
+
+        await asyncio.gather(*[request() for _ in range(5)])
+        self.assertEqual(most, 2)
+        self.assertEqual(pool.metrics().spawned, 2)
+
+    async def test_sessions_are_recycled_after_max_uses(self) -> None:
+        """Test a session used `max_uses` times is closed and replaced."""
+        pool = self.make_pool(max_uses=2)
+        async with pool.session() as first:
+            pass
+        async with pool.session():
+            pass
+        await asyncio.sleep(0)
+        async with pool.session() as third:
+            self.assertIsNot(third, first)
+        self.assertTrue(FakeClientSession.instances[0].closed)
+        self.assertEqual(pool.metrics().recycled, 1)
+
+    async def test_sessions_are_recycled_after_max_age(self) -> None:
+        """Test an idle session older than `max_age` is replaced."""
+        pool = self.make_pool(max_age=60, ping_after=3600)
+        async with pool.session() as first:
+            pass
+        self.now += 61
+        async with pool.session() as second:
+            self.assertIsNot(second, first)
+        self.assertEqual(pool.metrics().recycled, 1)
+
+    async def test_idle_session_failing_ping_is_replaced(self) -> None:
+        """Test sessions idle for `ping_after` are checked before reuse."""
+        pool = self.make_pool(ping_after=30)
+        async with pool.session() as first:
+            pass
+        FakeClientSession.instances[0].ping_fails = True
+        self.now += 10
+        async with pool.session() as second:
+            self.assertIs(second, first)
+        self.now += 31
+        async with pool.session() as third:
+            self.assertIsNot(third, first)
+        self.assertEqual(pool.metrics().failed_health_checks, 1)
+
+    async def test_failed_request_checks_the_session(self) -> None:
+        """Test a session whose request failed is pinged before reuse."""
+        pool = self.make_pool()
+        with self.assertRaises(RuntimeError):
+            async with pool.session():
+                raise RuntimeError('tool failed')
+        FakeClientSession.instances[0].ping_fails = True
+        async with pool.session() as pooled:
+            self.assertIs(pooled.session, FakeClientSession.instances[1])
+        self.assertEqual(pool.metrics().failed_health_checks, 1)
+
+    async def test_start_failure_is_raised(self) -> None:
+        """Test a session that cannot start fails the request."""
+        FakeClientSession.fail_initialize = True
+        pool = self.make_pool()
+        with self.assertRaises(ConnectionError):
+            async with pool.session():
+                pass
+        self.assertEqual(pool.metrics().spawned, 0)
+
+    async def test_wrapped_session_errors_are_raised(self) -> None:
+        """Test the error of a session is raised out of its task groups."""
+
+        async def setup_session(session):
+            raise ExceptionGroup(
+                'task group',
+                [
+                    McpError(
+                        ErrorData(
+                            code=CONNECTION_CLOSED, message='Connection closed'
+                        )
+                    )
+                ],
+            )
+
+        pool = self.make_pool(setup=setup_session)
+        with self.assertRaisesRegex(McpError, 'Connection closed'):
+            async with pool.session():
+                pass
+
+    async def test_unexpected_start_errors_fail_at_once(self) -> None:
+        """Test errors other than the session's do not wait for the timeout."""
+
+        async def setup_session(session):
+            raise ValueError('bad toolkit')
+
+        pool = self.make_pool(setup=setup_session, start_timeout=60)
+        with (
+            self.assertLogs(mcp_pool.logger, 'WARNING') as logs,
+            self.assertRaisesRegex(RuntimeError, 'before it was ready'),
+        ):
+            async with asyncio.timeout(5), pool.session():
+                pass
+        self.assertIn('bad toolkit', '\n'.join(logs.output))
+
+    async def test_close_waits_for_closing_sessions(self) -> None:
+        """Test close reaps the sessions recycled in the background."""
+        pool = self.make_pool(max_uses=1)
+        async with pool.session():
+            pass
+        await pool.close()
+        self.assertTrue(FakeClientSession.instances[0].closed)
+
+    async def test_warm_opens_sessions_ahead(self) -> None:
+        """Test warm fills the pool up to its size."""
+        pool = self.make_pool(size=3)
+        await pool.warm(2)
+        self.assertEqual(pool.metrics().idle, 2)
+        await pool.warm()
+        self.assertEqual(pool.metrics().idle, 3)
+        await pool.close()
+        self.assertTrue(all(x.closed for x in FakeClientSession.instances))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,217 @@
+import os
+import tempfile
+import threading
+import types
+import unittest
+
+from unittest import mock
+
+from autogen.tools import Tool
+
+from agents.ag2.transcripts import (
+    TranscriptCache,
+    cached_caption_tool,
+    video_id,
+)
+
+
+VIDEO = 'dQw4w9WgXcQ'
+
+
+class VideoIdTest(unittest.TestCase):
+    """Tests for video_id."""
+
+    def test_urls_of_every_form(self) -> None:
+        """Test the id is found in the URL forms YouTube uses."""
+        for url in [
+            VIDEO,
+            f'https://www.youtube.com/watch?v={VIDEO}&t=42',
+            f'youtube.com/watch?v={VIDEO}',
+            f'https://m.youtube.com/watch?v={VIDEO}',
+            f'https://youtu.be/{VIDEO}?si=abc',
+            f'https://www.youtube.com/shorts/{VIDEO}',
+            f'https://www.youtube.com/embed/{VIDEO}',
+            f' https://www.youtube.com/live/{VIDEO} ',
+        ]:
+            self.assertEqual(video_id(url), VIDEO, url)
+
+    def test_other_urls_have_no_id(self) -> None:
+        """Test URLs that are not of a video return None."""
+        for url in [
+            'https://vimeo.com/123456789',
+            'https://www.youtube.com/channel/abc',
+            'https://www.youtube.com/watch?v=short',
+            '',
+        ]:
+            self.assertIsNone(video_id(url), url)
+
+
+class TranscriptCacheTest(unittest.TestCase):
+    """Tests for the on disk TranscriptCache."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_put_and_get(self) -> None:
+        """Test transcripts are kept by video and language."""
+        cache = TranscriptCache(self.tmp.name)
+        cache.put(VIDEO, 'en', 'hello')
+        self.assertEqual(cache.get(VIDEO, 'en'), 'hello')
+        self.assertIsNone(cache.get(VIDEO, 'fr'))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(os.listdir(self.tmp.name), [f'{VIDEO}.en.txt'])
+
+    def test_unsafe_keys_are_hashed(self) -> None:
+        """Test keys that are not safe file names stay in the directory."""
+        cache = TranscriptCache(self.tmp.name)
+        cache.put('../../etc', 'en', 'hello')
+        self.assertEqual(cache.get('../../etc', 'en'), 'hello')
+        [name] = os.listdir(self.tmp.name)
+        self.assertRegex(name, r'^[0-9a-f]{64}\.txt$')
+
+    def test_least_recently_used_transcript_is_evicted(self) -> None:
+        """Test transcripts over `max_bytes` are evicted from disk."""
+        cache = TranscriptCache(self.tmp.name, max_bytes=10)
+        cache.put('a', 'en', 'aaaa')
+        cache.put('b', 'en', 'bbbb')
+        cache.get('a', 'en')
+        cache.put('c', 'en', 'cccc')
+        self.assertIsNone(cache.get('b', 'en'))
+        self.assertEqual(cache.get('a', 'en'), 'aaaa')
+        self.assertEqual(len(os.listdir(self.tmp.name)), 2)
+
+    def test_replacing_a_transcript_updates_its_size(self) -> None:
+        """Test putting a transcript again replaces it."""
+        cache = TranscriptCache(self.tmp.name, max_bytes=10)
+        cache.put('a', 'en', 'aaaaaaaa')
+        cache.put('a', 'en', 'aa')
+        cache.put('b', 'en', 'bbbbbbbb')
+        self.assertEqual(cache.get('a', 'en'), 'aa')
+
+    def test_files_of_previous_runs_are_picked_up(self) -> None:
+        """Test a new cache serves and bounds the existing files."""
+        TranscriptCache(self.tmp.name).put('a', 'en', 'aaaa')
+        cache = TranscriptCache(self.tmp.name)
+        self.assertEqual(cache.get('a', 'en'), 'aaaa')
+        TranscriptCache(self.tmp.name, max_bytes=0)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_unfinished_writes_are_deleted_on_start(self) -> None:
+        """Test temporary files left by a previous run are removed."""
+        TranscriptCache(self.tmp.name).put('a', 'en', 'aaaa')
+        with open(os.path.join(self.tmp.name, 'tmpabc.tmp'), 'w') as f:
+            f.write('partial')
+        TranscriptCache(self.tmp.name)
+        self.assertEqual(os.listdir(self.tmp.name), ['a.en.txt'])
+
+    def test_excerpts_keep_the_relevant_lines(self) -> None:
+        """Test excerpts of a transcript keep the lines that match."""
+        cache = TranscriptCache(self.tmp.name)
+        lines = [f'filler {i}' for i in range(100)]
+        lines[50] = 'the chorus about giving you up'
+        excerpts = cache.excerpts(VIDEO, 'en', '\n'.join(lines), 'chorus', 1)
+        self.assertIn('the chorus about giving you up', excerpts)
+        self.assertNotIn('filler 0\n', excerpts)
+
+
+class FakeSession:
+    """Answers tool calls with fixed captions, counting the calls."""
+
+    def __init__(self, text: str, is_error: bool = False):
+        self.calls: list[tuple[str, dict]] = []
+        self.text = text
+        self.is_error = is_error
+
+    async def call_tool(self, name: str, arguments: dict):
+        self.calls.append((name, arguments))
+        return types.SimpleNamespace(
+            content=[types.SimpleNamespace(type='text', text=self.text)],
+            isError=self.is_error,
+        )
+
+
+class CachedCaptionToolTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for cached_caption_tool."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = TranscriptCache(self.tmp.name)
+
+        async def download_closed_captions(url: str) -> str:
+            raise AssertionError('The MCP tool is called through the session')
+
+        self.tool = Tool(
+            name='download_closed_captions',
+            description='Download YouTube captions',
+            func_or_tool=download_closed_captions,
+            parameters_json_schema={
+                'type': 'object',
+                'properties': {'url': {'type': 'string'}},
+                'required': ['url'],
+            },
+        )
+
+    def wrap(self, session: FakeSession, **kwargs) -> Tool:
+        return cached_caption_tool(self.tool, session, self.cache, **kwargs)
+
+    async def test_captions_are_downloaded_once(self) -> None:
+        """Test later calls for the same video are served from the cache."""
+        session = FakeSession('never gonna give you up')
+        tool = self.wrap(session)
+        # The schema registered with the agent, tool_schema is derived from
+        # the signature of the function.
+        self.assertEqual(
+            list(tool._func_schema['function']['parameters']['properties']),
+            ['url', 'question'],
+        )
+        for url in [VIDEO, f'https://youtu.be/{VIDEO}']:
+            self.assertEqual(
+                await tool.func(url=url), 'never gonna give you up'
+            )
+        self.assertEqual(session.calls, [(self.tool.name, {'url': VIDEO})])
+
+    async def test_cache_is_used_off_the_event_loop(self) -> None:
+        """Test the cache files are read and written on executor threads."""
+        threads = []
+        for name in ['get', 'put']:
+            method = getattr(self.cache, name)
+
+            def call(*args, method=method):
+                threads.append(threading.current_thread())
+                return method(*args)
+
+            patcher = mock.patch.object(self.cache, name, side_effect=call)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        await self.wrap(FakeSession('never gonna give you up')).func(url=VIDEO)
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.current_thread(), threads)
+
+    async def test_errors_are_not_cached(self) -> None:
+        """Test a failed download is returned and tried again next time."""
+        session = FakeSession('video unavailable', is_error=True)
+        tool = self.wrap(session)
+        self.assertEqual(await tool.func(url=VIDEO), 'video unavailable')
+        await tool.func(url=VIDEO)
+        self.assertEqual(len(session.calls), 2)
+        self.assertIsNone(self.cache.get(VIDEO, 'en'))
+
+    async def test_long_captions_are_cut_to_the_question(self) -> None:
+        """Test captions over `max_chars` are cut when asked a question."""
+        lines = [f'filler {i}' for i in range(100)]
+        lines[50] = 'the chorus about giving you up'
+        session = FakeSession('\n'.join(lines))
+        tool = self.wrap(session, max_chars=100)
+        answer = await tool.func(url=VIDEO, question='chorus')
+        self.assertIn('the chorus about giving you up', answer)
+        self.assertLess(len(answer), len(session.text))
+        self.assertEqual(session.calls, [(self.tool.name, {'url': VIDEO})])
+        self.assertEqual(await tool.func(url=VIDEO), session.text)
+
+
+if __name__ == '__main__':
+    unittest.main()
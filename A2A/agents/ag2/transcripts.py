@@ -0,0 +1,229 @@
+"""Cache of YouTube closed captions, in front of the MCP caption tool."""
+
+import collections
+import contextlib
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import textwrap
+import threading
+
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+from autogen.tools import Tool
+from mcp import ClientSession
+
+from agents.blocking import get_blocking_executor
+from agents.retrieval import BM25Index, merge_ranges
+
+
+logger = logging.getLogger(__name__)
+
+_VIDEO_ID = re.compile(r'^[\w-]{11}$')
+
+
+def video_id(url: str) -> str | None:
+    """The id of a YouTube video from its URL, None if it has none."""
+    url = url.strip()
+    if _VIDEO_ID.match(url):
+        return url
+    parsed = urlparse(url if '//' in url else f'https://{url}')
+    host = parsed.netloc.lower().removeprefix('www.').removeprefix('m.')
+    if host == 'youtu.be':
+        candidate = parsed.path.strip('/').split('/')[0]
+    elif host.endswith('youtube.com'):
+        candidate = parse_qs(parsed.query).get('v', [''])[0]
+        if not candidate:
+            parts = parsed.path.strip('/').split('/')
+            if len(parts) >= 2 and parts[0] in ('shorts', 'embed', 'live'):
+                candidate = parts[1]
+    else:
+        return None
+    return candidate if _VIDEO_ID.match(candidate) else None
+
+
+class TranscriptCache:
+    """Transcripts on disk keyed by video id and language.
+
+    Files are evicted least recently used first once they take more than
+    `max_bytes`, and the cache picks up the files already in `directory` on
+    start, deleting the temporary files of writes that did not finish. The
+    search indexes of the last `max_indexes` transcripts are kept in memory.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_indexes: int = 16,
+    ):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._max_indexes = max_indexes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # File name to size, least recently used first.
+        self._files: collections.OrderedDict[str, int] = (
+            collections.OrderedDict()
+        )
+        self._bytes = 0
+        self._indexes: collections.OrderedDict[
+            str, tuple[list[str], BM25Index]
+        ] = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        files = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.endswith('.tmp'):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(entry.path)
+            elif entry.is_file() and entry.name.endswith('.txt'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._files[name] = size
+            self._bytes += size
+        self._evict()
+
+    def get(self, video_id: str, language: str) -> str | None:
+        name = self._name(video_id, language)
+        with self._lock:
+            if name not in self._files:
+                self.misses += 1
+                return None
+            self._files.move_to_end(name)
+            self.hits += 1
+        try:
+            with open(os.path.join(self._directory, name)) as f:
+                return f.read()
+        except OSError as e:
+            logger.warning(f'Failed to read transcript {name}: {e}')
+            return None
+
+    def put(self, video_id: str, language: str, transcript: str):
+        name = self._name(video_id, language)
+        data = transcript.encode()
+        path = os.path.join(self._directory, name)
+        # Written aside and renamed, so readers never see a partial file.
+        with tempfile.NamedTemporaryFile(
+            dir=self._directory, suffix='.tmp', delete=False
+        ) as f:
+            f.write(data)
+        os.replace(f.name, path)
+        with self._lock:
+            self._bytes += len(data) - self._files.pop(name, 0)
+            self._files[name] = len(data)
+            self._indexes.pop(name, None)
+            self._evict()
+
+    def excerpts(
+        self,
+        video_id: str,
+        language: str,
+        transcript: str,
+        question: str,
+        top_k: int = 6,
+    ) -> str:
+        """The parts of a transcript most relevant to the question."""
+        name = self._name(video_id, language)
+        with self._lock:
+            cached = self._indexes.get(name)
+            if cached:
+                self._indexes.move_to_end(name)
+        if not cached:
+            lines = [
+                wrapped
+                for line in transcript.splitlines()
+                for wrapped in textwrap.wrap(line, 200) or ['']
+            ]
+            cached = (lines, BM25Index(lines, chunk_lines=10, overlap=2))
+            with self._lock:
+                self._indexes[name] = cached
+                while len(self._indexes) > self._max_indexes:
+                    self._indexes.popitem(last=False)
+        lines, index = cached
+        ranges = merge_ranges(
+            index.search(question, top_k) or index.chunks[:top_k]
+        )
+        return '\n[...]\n'.join(
+            '\n'.join(lines[start:end]) for start, end in ranges
+        )
+
+    def _name(self, video_id: str, language: str) -> str:
+        key = f'{video_id}.{language}'
+        # Ids and languages are safe file names, anything else is hashed.
+        if re.fullmatch(r'[\w.-]+', key):
+            return f'{key}.txt'
+        return f'{hashlib.sha256(key.encode()).hexdigest()}.txt'
+
+    def _evict(self):
+        while self._bytes > self._max_bytes and self._files:
+            name, size = self._files.popitem(last=False)
+            self._bytes -= size
+            self._indexes.pop(name, None)
+            try:
+                os.remove(os.path.join(self._directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def cached_caption_tool(
+    tool: Tool,
+    session: ClientSession,
+    cache: TranscriptCache,
+    language: str = 'en',
+    max_chars: int = 8000,
+) -> Tool:
+    """Wrap the MCP caption tool to consult the cache before downloading.
+
+    Transcripts over `max_chars` are cut down to the parts relevant to the
+    `question` argument the tool gains, when the model passes one.
+    """
+    # The schema the MCP tool was declared with, as tool_schema describes
+    # the signature of its function, which only takes **arguments.
+    schema = (tool._func_schema or tool.tool_schema)['function']['parameters']
+    properties = {
+        **schema.get('properties', {}),
+        'question': {
+            'type': 'string',
+            'description': (
+                "The user's question about the video, to only receive the "
+                'relevant parts of long captions. Leave empty for the full '
+                'captions.'
+            ),
+        },
+    }
+
+    async def download_closed_captions(**arguments: Any) -> str:
+        question = arguments.pop('question', '') or ''
+        url = next(
+            (x for x in arguments.values() if isinstance(x, str) and x), ''
+        )
+        video = video_id(url)
+        # The cache reads and writes files, off the event loop.
+        executor = get_blocking_executor()
+        transcript = (
+            await executor.run(cache.get, video, language) if video else None
+        )
+        if transcript is None:
+            result = await session.call_tool(tool.name, arguments)
+            transcript = '\n'.join(
+                x.text for x in result.content if x.type == 'text'
+            )
+            if result.isError:
+                return transcript
+            if video:
+                await executor.run(cache.put, video, language, transcript)
+        if not question or len(transcript) <= max_chars:
+            return transcript
+        return cache.excerpts(video or url, language, transcript, question)
+
+    return Tool(
+        name=tool.name,
+        description=tool.description,
+        func_or_tool=download_closed_captions,
+        parameters_json_schema={**schema, 'properties': properties},
+    )
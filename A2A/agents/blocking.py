@@ -0,0 +1,114 @@
+"""Blocking framework calls run off the event loop, with admission control.
+
+Task managers serve every request of the server on a single event loop, so
+a framework call that blocks, like a synchronous agent invoke, stalls all
+other requests and streams until it returns. Such calls go through the
+executor of the process instead, which also refuses calls once too many
+are waiting rather than queueing them without bound.
+"""
+
+import asyncio
+import contextvars
+import dataclasses
+import functools
+import os
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+
+T = TypeVar('T')
+
+
+class ServerBusyError(Exception):
+    """A blocking call was refused, as too many are already waiting."""
+
+
+@dataclasses.dataclass
+class BlockingCallMetrics:
+    running: int = 0
+    waiting: int = 0
+    completed: int = 0
+    rejected: int = 0
+
+
+class BlockingCallExecutor:
+    """Runs blocking calls on a pool of `max_workers` threads.
+
+    Up to `max_waiting` calls wait for a thread once all are busy, and
+    further calls are rejected with ServerBusyError right away, as are calls
+    that waited for more than `wait_timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        max_waiting: int = 64,
+        wait_timeout: float | None = None,
+    ):
+        self._max_waiting = max_waiting
+        self._wait_timeout = wait_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='blocking-call'
+        )
+        self._slots = asyncio.Semaphore(max_workers)
+        self._metrics = BlockingCallMetrics()
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run `func` on the pool and await its result."""
+        if self._slots.locked() and self._metrics.waiting >= self._max_waiting:
+            self._metrics.rejected += 1
+            raise ServerBusyError(
+                f'{self._metrics.waiting} calls are already waiting'
+            )
+        self._metrics.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self._wait_timeout)
+        except TimeoutError:
+            self._metrics.rejected += 1
+            raise ServerBusyError(
+                f'No worker was free within {self._wait_timeout} seconds'
+            ) from None
+        finally:
+            self._metrics.waiting -= 1
+        self._metrics.running += 1
+        try:
+            # The call sees the context of the caller, as with to_thread.
+            call = functools.partial(
+                contextvars.copy_context().run, func, *args, **kwargs
+            )
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, call
+            )
+        finally:
+            self._metrics.running -= 1
+            self._metrics.completed += 1
+            self._slots.release()
+
+    def metrics(self) -> BlockingCallMetrics:
+        return dataclasses.replace(self._metrics)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_executor: BlockingCallExecutor | None = None
+
+
+def get_blocking_executor() -> BlockingCallExecutor:
+    """The executor of the process, configured by the environment.
+
+    BLOCKING_CALL_WORKERS sets the number of threads, BLOCKING_CALL_MAX_WAITING
+    the calls that may wait for one, and BLOCKING_CALL_WAIT_TIMEOUT how many
+    seconds they may wait.
+    """
+    global _executor
+    if _executor is None:
+        wait_timeout = os.getenv('BLOCKING_CALL_WAIT_TIMEOUT')
+        _executor = BlockingCallExecutor(
+            max_workers=int(os.getenv('BLOCKING_CALL_WORKERS', '8')),
+            max_waiting=int(os.getenv('BLOCKING_CALL_MAX_WAITING', '64')),
+            wait_timeout=float(wait_timeout) if wait_timeout else None,
+        )
+    return _executor
@@ -30,7 +30,14 @@ logger = logging.getLogger(__name__)
 @click.command()
 @click.option('--host', 'host', default='localhost')
 @click.option('--port', 'port', default=10001)
-def main(host, port):
+@click.option(
+    '--image-base-url',
+    'image_base_url',
+    default=None,
+    help='Return images by URI under this URL, such as '
+    'http://localhost:10001, instead of inline.',
+)
+def main(host, port, image_base_url):
     """Entry point for the A2A + CrewAI Image generation sample."""
     try:
         if not os.getenv('GOOGLE_API_KEY') and not os.getenv(
@@ -68,12 +75,22 @@ def main(host, port):
             skills=[skill],
         )
 
+        task_manager = AgentTaskManager(
+            agent=ImageGenerationAgent(),
+            image_base_url=image_base_url,
+        )
         server = A2AServer(
             agent_card=agent_card,
-            task_manager=AgentTaskManager(agent=ImageGenerationAgent()),
+            task_manager=task_manager,
             host=host,
             port=port,
         )
+        if image_base_url:
+            server.app.add_route(
+                '/images/{session_id}/{image_id}',
+                task_manager.handle_image,
+                methods=['GET'],
+            )
         logger.info(f'Starting server on {host}:{port}')
         server.start()
     except MissingAPIKeyError as e:
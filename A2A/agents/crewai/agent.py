@@ -3,24 +3,22 @@
 Handles the agents and also presents the tools required.
 """
 
-import base64
 import logging
 import os
 import re
 
 from collections.abc import AsyncIterable
-from io import BytesIO
 from typing import Any
 from uuid import uuid4
 
-from PIL import Image
-from common.utils.in_memory_cache import InMemoryCache
+from agents.blocking import BlockingCallExecutor, get_blocking_executor
 from crewai import LLM, Agent, Crew, Task
 from crewai.process import Process
 from crewai.tools import tool
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
+from image_store import get_image_store
 from pydantic import BaseModel
 
 
@@ -36,14 +34,14 @@ class Imagedata(BaseModel):
       id: Unique identifier for the image.
       name: Name of the image.
       mime_type: MIME type of the image.
-      bytes: Base64 encoded image data.
+      data: Raw image data.
       error: Error message if there was an issue with the image.
     """
 
     id: str | None = None
     name: str | None = None
     mime_type: str | None = None
-    bytes: str | None = None
+    data: bytes | None = None
     error: str | None = None
 
 
@@ -56,7 +54,7 @@ def generate_image_tool(
         raise ValueError('Prompt cannot be empty')
 
     client = genai.Client()
-    cache = InMemoryCache()
+    store = get_image_store()
 
     text_input = (
         prompt,
@@ -67,33 +65,23 @@ def generate_image_tool(
     logger.info(f'Session id {session_id}')
     print(f'Session id {session_id}')
 
-    # TODO (rvelicheti) - Change convoluted memory handling logic to a better
-    # version.
-    # Get the image from the cache and send it back to the model.
-    # Assuming the last version of the generated image is applicable.
-    # Convert to PIL Image so the context sent to the LLM is not overloaded
-    try:
-        ref_image_data = None
-        # image_id = session_cache[session_id][-1]
-        session_image_data = cache.get(session_id)
-        if artifact_file_id:
-            try:
-                ref_image_data = session_image_data[artifact_file_id]
-                logger.info('Found reference image in prompt input')
-            except Exception:
-                ref_image_data = None
-        if not ref_image_data:
-            # Insertion order is maintained from python 3.7
-            latest_image_key = list(session_image_data.keys())[-1]
-            ref_image_data = session_image_data[latest_image_key]
-
-        ref_bytes = base64.b64decode(ref_image_data.bytes)
-        ref_image = Image.open(BytesIO(ref_bytes))
-    except Exception:
-        ref_image = None
+    # Get the image from the store and send it back to the model, the one
+    # referenced in the prompt or else the latest one of the session.
+    # The raw bytes are sent as is, without decoding the image.
+    ref_image_data = None
+    if artifact_file_id:
+        ref_image_data = store.get(session_id, artifact_file_id)
+        if ref_image_data:
+            logger.info('Found reference image in prompt input')
+    if not ref_image_data:
+        ref_image_data = store.latest(session_id)
+    if ref_image_data:
+        ref_image = types.Part.from_bytes(
+            data=ref_image_data.data, mime_type=ref_image_data.mime_type
+        )
 
     if ref_image:
-        contents = [text_input, ref_image]
+        contents = [*text_input, ref_image]
     else:
         contents = text_input
 
@@ -114,21 +102,18 @@ def generate_image_tool(
         if part.inline_data is not None:
             try:
                 data = Imagedata(
-                    bytes=base64.b64encode(part.inline_data.data).decode(
-                        'utf-8'
-                    ),
+                    data=part.inline_data.data,
                     mime_type=part.inline_data.mime_type,
                     name='generated_image.png',
                     id=uuid4().hex,
                 )
-                session_data = cache.get(session_id)
-                if session_data is None:
-                    # Session doesn't exist, create it with the new item
-                    cache.set(session_id, {data.id: data})
-                else:
-                    # Session exists, update the existing dictionary directly
-                    session_data[data.id] = data
-
+                store.put(
+                    session_id,
+                    data.id,
+                    data.data,
+                    mime_type=data.mime_type,
+                    name=data.name,
+                )
                 return data.id
             except Exception as e:
                 logger.error(f'Error unpacking image {e}')
@@ -141,7 +126,14 @@ class ImageGenerationAgent:
 
     SUPPORTED_CONTENT_TYPES = ['text', 'text/plain', 'image/png']
 
-    def __init__(self):
+    def __init__(self, max_workers: int | None = None):
+        # Kickoff blocks on the model and the tool, so it runs on a bounded
+        # pool rather than on the event loop, the process one by default.
+        self._executor = (
+            BlockingCallExecutor(max_workers=max_workers)
+            if max_workers
+            else get_blocking_executor()
+        )
         if os.getenv('GOOGLE_GENAI_USE_VERTEXAI'):
             self.model = LLM(model='vertex_ai/gemini-2.0-flash')
         elif os.getenv('GOOGLE_API_KEY'):
@@ -150,7 +142,9 @@ class ImageGenerationAgent:
                 api_key=os.getenv('GOOGLE_API_KEY'),
             )
 
-        self.image_creator_agent = Agent(
+    def _create_crew(self) -> Crew:
+        """A crew for a single kickoff, as kickoff interpolates its inputs."""
+        image_creator_agent = Agent(
             role='Image Creation Expert',
             goal=(
                 "Generate an image based on the user's text prompt.If the prompt is"
@@ -171,7 +165,7 @@ class ImageGenerationAgent:
             llm=self.model,
         )
 
-        self.image_creation_task = Task(
+        image_creation_task = Task(
             description=(
                 "Receive a user prompt: '{user_prompt}'.\nAnalyze the prompt and"
                 ' identify if you need to create a new image or edit an existing'
@@ -185,12 +179,12 @@ class ImageGenerationAgent:
                 ' sent to you as {artifact_file_id}'
             ),
             expected_output='The id of the generated image',
-            agent=self.image_creator_agent,
+            agent=image_creator_agent,
         )
 
-        self.image_crew = Crew(
-            agents=[self.image_creator_agent],
-            tasks=[self.image_creation_task],
+        return Crew(
+            agents=[image_creator_agent],
+            tasks=[image_creation_task],
             process=Process.sequential,
             verbose=False,
         )
@@ -217,20 +211,29 @@ class ImageGenerationAgent:
         }
         logger.info(f'Inputs {inputs}')
         print(f'Inputs {inputs}')
-        response = self.image_crew.kickoff(inputs)
+        response = self._create_crew().kickoff(inputs)
         return response
 
+    async def ainvoke(self, query, session_id) -> str:
+        """Kickoff CrewAI on the agent's pool and await the response.
+
+        Raises ServerBusyError when too many kickoffs are already waiting.
+        """
+        return await self._executor.run(self.invoke, query, session_id)
+
     async def stream(self, query: str) -> AsyncIterable[dict[str, Any]]:
         """Streaming is not supported by CrewAI."""
         raise NotImplementedError('Streaming is not supported by CrewAI.')
 
     def get_image_data(self, session_id: str, image_key: str) -> Imagedata:
         """Return Imagedata given a key. This is a helper method from the agent."""
-        cache = InMemoryCache()
-        session_data = cache.get(session_id)
-        try:
-            cache.get(session_id)
-            return session_data[image_key]
-        except KeyError:
+        image = get_image_store().get(session_id, image_key)
+        if not image:
             logger.error('Error generating image')
             return Imagedata(error='Error generating image, please try again.')
+        return Imagedata(
+            id=image.id,
+            name=image.name,
+            mime_type=image.mime_type,
+            data=image.data,
+        )
@@ -0,0 +1,259 @@
+"""Size-bounded store of the images generated in each session."""
+
+import collections
+import dataclasses
+import json
+import logging
+import os
+import threading
+import time
+
+from urllib.parse import quote, unquote
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class StoredImage:
+    id: str
+    name: str | None
+    mime_type: str | None
+    data: bytes
+
+
+@dataclasses.dataclass
+class _Entry:
+    name: str | None
+    mime_type: str | None
+    size: int
+    # None when the image is kept on disk.
+    data: bytes | None
+
+
+class ImageStore:
+    """Images by session, bounded per session and in total.
+
+    Once a session's images take more than `max_session_bytes` its oldest
+    images are evicted, although its latest image is kept over the budget.
+    Once all images take more than `max_total_bytes` the least recently used
+    ones are evicted, latest or not, so the total never exceeds it and an
+    image larger than the whole budget is not kept. With `directory` set,
+    images are kept in files, read when requested rather than held in
+    memory, and are loaded back on start so they survive restarts.
+    """
+
+    def __init__(
+        self,
+        max_session_bytes: int = 64 * 1024 * 1024,
+        max_total_bytes: int = 512 * 1024 * 1024,
+        directory: str | None = None,
+    ):
+        self._max_session_bytes = max_session_bytes
+        self._max_total_bytes = max_total_bytes
+        self._directory = directory
+        self._lock = threading.Lock()
+        # (session id, image id) to its entry, least recently used first.
+        self._entries: collections.OrderedDict[tuple[str, str], _Entry] = (
+            collections.OrderedDict()
+        )
+        # Image ids of each session in the order they were added, so the
+        # latest image is the last one.
+        self._sessions: dict[str, collections.OrderedDict[str, None]] = {}
+        self._session_bytes: dict[str, int] = {}
+        self._total_bytes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def put(
+        self,
+        session_id: str,
+        image_id: str,
+        data: bytes,
+        mime_type: str | None = None,
+        name: str | None = None,
+    ):
+        entry = _Entry(
+            name=name, mime_type=mime_type, size=len(data), data=data
+        )
+        if self._directory:
+            self._write(session_id, image_id, entry)
+            entry.data = None
+        with self._lock:
+            self._add(session_id, image_id, entry)
+            self._evict(session_id)
+
+    def get(self, session_id: str, image_id: str) -> StoredImage | None:
+        key = (session_id, image_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            self._entries.move_to_end(key)
+        return self._image(session_id, image_id, entry)
+
+    def latest(self, session_id: str) -> StoredImage | None:
+        """The image added last to a session."""
+        with self._lock:
+            image_ids = self._sessions.get(session_id)
+            if not image_ids:
+                return None
+            image_id = next(reversed(image_ids))
+            key = (session_id, image_id)
+            entry = self._entries[key]
+            self._entries.move_to_end(key)
+        return self._image(session_id, image_id, entry)
+
+    def _image(
+        self, session_id: str, image_id: str, entry: _Entry
+    ) -> StoredImage | None:
+        data = entry.data
+        if data is None:
+            try:
+                data = self._read(session_id, image_id)
+            except OSError as e:
+                logger.warning(f'Failed to read image {image_id}: {e}')
+                return None
+        return StoredImage(
+            id=image_id, name=entry.name, mime_type=entry.mime_type, data=data
+        )
+
+    def _add(self, session_id: str, image_id: str, entry: _Entry):
+        # Replacing an image keeps the file just written for it.
+        self._remove((session_id, image_id), delete_files=False)
+        self._entries[(session_id, image_id)] = entry
+        self._sessions.setdefault(session_id, collections.OrderedDict())[
+            image_id
+        ] = None
+        self._session_bytes[session_id] = (
+            self._session_bytes.get(session_id, 0) + entry.size
+        )
+        self._total_bytes += entry.size
+
+    def _remove(self, key: tuple[str, str], delete_files: bool = True) -> bool:
+        entry = self._entries.pop(key, None)
+        if not entry:
+            return False
+        session_id, image_id = key
+        image_ids = self._sessions[session_id]
+        del image_ids[image_id]
+        self._session_bytes[session_id] -= entry.size
+        if not image_ids:
+            del self._sessions[session_id]
+            del self._session_bytes[session_id]
+        self._total_bytes -= entry.size
+        if self._directory and delete_files:
+            for path in self._paths(session_id, image_id):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return True
+
+    def _evict(self, session_id: str):
+        image_ids = self._sessions.get(session_id)
+        while (
+            image_ids
+            and len(image_ids) > 1
+            and self._session_bytes[session_id] > self._max_session_bytes
+        ):
+            self._remove((session_id, next(iter(image_ids))))
+        while self._total_bytes > self._max_total_bytes:
+            key, entry = next(iter(self._entries.items()))
+            if entry.size > self._max_total_bytes:
+                logger.warning(
+                    f'Image {key[1]} of {entry.size} bytes is larger than '
+                    f'the store, {self._max_total_bytes} bytes'
+                )
+            self._remove(key)
+
+    def _paths(self, session_id: str, image_id: str) -> tuple[str, str]:
+        """The data and metadata files of an image."""
+        directory = os.path.join(self._directory, quote(session_id, safe=''))
+        path = os.path.join(directory, quote(image_id, safe=''))
+        return path, f'{path}.json'
+
+    def _write(self, session_id: str, image_id: str, entry: _Entry):
+        path, metadata_path = self._paths(session_id, image_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(entry.data)
+        # The metadata is written last, so only complete images are loaded.
+        with open(metadata_path, 'w') as f:
+            json.dump(
+                {
+                    'name': entry.name,
+                    'mime_type': entry.mime_type,
+                    'created': time.time(),
+                },
+                f,
+            )
+
+    def _read(self, session_id: str, image_id: str) -> bytes:
+        path, _ = self._paths(session_id, image_id)
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _load(self):
+        images = []
+        for session_dir in os.scandir(self._directory):
+            if not session_dir.is_dir():
+                continue
+            for file in os.scandir(session_dir.path):
+                if not file.name.endswith('.json'):
+                    continue
+                path = file.path.removesuffix('.json')
+                try:
+                    with open(file.path) as f:
+                        metadata = json.load(f)
+                    size = os.path.getsize(path)
+                except (OSError, ValueError) as e:
+                    logger.warning(f'Skipping stored image {path}: {e}')
+                    continue
+                images.append(
+                    (
+                        metadata.get('created', 0),
+                        unquote(session_dir.name),
+                        unquote(file.name.removesuffix('.json')),
+                        _Entry(
+                            name=metadata.get('name'),
+                            mime_type=metadata.get('mime_type'),
+                            size=size,
+                            data=None,
+                        ),
+                    )
+                )
+        # Oldest first, so the order of use and the latest images carry over.
+        for _, session_id, image_id, entry in sorted(
+            images, key=lambda x: x[0]
+        ):
+            self._add(session_id, image_id, entry)
+            self._evict(session_id)
+        logger.info(
+            f'Loaded {len(self._entries)} images of {len(self._sessions)} '
+            f'sessions, {self._total_bytes} bytes'
+        )
+
+
+_store: ImageStore | None = None
+
+
+def get_image_store() -> ImageStore:
+    """The store of the process, configured by the environment.
+
+    IMAGE_STORE_DIR keeps the images on disk, and IMAGE_STORE_SESSION_MB
+    and IMAGE_STORE_TOTAL_MB set the budgets.
+    """
+    global _store
+    if _store is None:
+        _store = ImageStore(
+            max_session_bytes=int(os.getenv('IMAGE_STORE_SESSION_MB', '64'))
+            * 1024
+            * 1024,
+            max_total_bytes=int(os.getenv('IMAGE_STORE_TOTAL_MB', '512'))
+            * 1024
+            * 1024,
+            directory=os.getenv('IMAGE_STORE_DIR') or None,
+        )
+    return _store
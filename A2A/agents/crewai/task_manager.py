@@ -1,10 +1,11 @@
 """Agent Task Manager."""
 
+import base64
 import logging
 
 from collections.abc import AsyncIterable
 
-from agent import ImageGenerationAgent
+from agent import ImageGenerationAgent, Imagedata
 from common.server import utils
 from common.server.task_manager import InMemoryTaskManager
 from common.types import (
@@ -22,6 +23,8 @@ from common.types import (
     TaskStatus,
     TextPart,
 )
+from starlette.requests import Request
+from starlette.responses import Response
 
 
 logger = logging.getLogger(__name__)
@@ -30,9 +33,17 @@ logger = logging.getLogger(__name__)
 class AgentTaskManager(InMemoryTaskManager):
     """Agent Task Manager, handles task routing and response packing."""
 
-    def __init__(self, agent: ImageGenerationAgent):
+    def __init__(
+        self, agent: ImageGenerationAgent, image_base_url: str | None = None
+    ):
+        """Images are returned by URI under `image_base_url`, served by
+        handle_image, or inline as base64 without it.
+        """
         super().__init__()
         self.agent = agent
+        self.image_base_url = (
+            image_base_url.rstrip('/') if image_base_url else None
+        )
 
     async def _stream_generator(
         self, request: SendTaskRequest
@@ -94,7 +105,7 @@ class AgentTaskManager(InMemoryTaskManager):
         task_send_params: TaskSendParams = request.params
         query = self._get_user_query(task_send_params)
         try:
-            result = self.agent.invoke(query, task_send_params.sessionId)
+            result = await self.agent.ainvoke(query, task_send_params.sessionId)
         except Exception as e:
             logger.error('Error invoking agent: %s', e)
             raise ValueError(f'Error invoking agent: {e}') from e
@@ -105,9 +116,7 @@ class AgentTaskManager(InMemoryTaskManager):
         if not data.error:
             parts = [
                 FilePart(
-                    file=FileContent(
-                        bytes=data.bytes, mimeType=data.mime_type, name=data.id
-                    )
+                    file=self._file_content(task_send_params.sessionId, data)
                 )
             ]
         else:
@@ -121,6 +130,34 @@ class AgentTaskManager(InMemoryTaskManager):
         )
         return SendTaskResponse(id=request.id, result=task)
 
+    def _file_content(self, session_id: str, data: Imagedata) -> FileContent:
+        if self.image_base_url:
+            return FileContent(
+                uri=f'{self.image_base_url}/images/{session_id}/{data.id}',
+                mimeType=data.mime_type,
+                name=data.id,
+            )
+        return FileContent(
+            bytes=base64.b64encode(data.data).decode('utf-8'),
+            mimeType=data.mime_type,
+            name=data.id,
+        )
+
+    async def handle_image(self, request: Request) -> Response:
+        """Serve a generated image by its session and id."""
+        data = self.agent.get_image_data(
+            session_id=request.path_params['session_id'],
+            image_key=request.path_params['image_id'],
+        )
+        if data.error:
+            return Response(status_code=404)
+        # Image ids are never reused, so their content never changes.
+        return Response(
+            content=data.data,
+            media_type=data.mime_type,
+            headers={'Cache-Control': 'private, max-age=31536000, immutable'},
+        )
+
     def _get_user_query(self, task_send_params: TaskSendParams) -> str:
         part = task_send_params.message.parts[0]
         if not isinstance(part, TextPart):
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+
+from image_store import ImageStore
+
+
+class ImageStoreTest(unittest.TestCase):
+    """Tests for the bounded ImageStore."""
+
+    def test_images_are_kept_by_session(self) -> None:
+        """Test images are looked up by session and id."""
+        store = ImageStore()
+        store.put('s1', 'i1', b'one', 'image/png', 'one.png')
+        store.put('s1', 'i2', b'two', 'image/png')
+        image = store.get('s1', 'i1')
+        self.assertEqual(
+            (image.id, image.name, image.mime_type, image.data),
+            ('i1', 'one.png', 'image/png', b'one'),
+        )
+        self.assertEqual(store.latest('s1').id, 'i2')
+        self.assertIsNone(store.get('s2', 'i1'))
+        self.assertIsNone(store.latest('s2'))
+
+    def test_session_budget_evicts_oldest_but_keeps_latest(self) -> None:
+        """Test a session over its budget keeps its latest image."""
+        store = ImageStore(max_session_bytes=5)
+        store.put('s1', 'i1', b'abc')
+        store.put('s1', 'i2', b'abc')
+        self.assertIsNone(store.get('s1', 'i1'))
+        store.put('s1', 'i3', b'too large')
+        self.assertIsNone(store.get('s1', 'i2'))
+        self.assertEqual(store.latest('s1').data, b'too large')
+
+    def test_total_budget_is_strict(self) -> None:
+        """Test the total budget evicts latest images of other sessions."""
+        store = ImageStore(max_total_bytes=8)
+        for session_id in ['s1', 's2', 's3']:
+            store.put(session_id, 'i1', b'abcd')
+        self.assertIsNone(store.latest('s1'))
+        self.assertEqual(store.latest('s2').data, b'abcd')
+        self.assertEqual(store.latest('s3').data, b'abcd')
+        self.assertEqual(store._total_bytes, 8)
+
+    def test_total_budget_evicts_least_recently_used(self) -> None:
+        """Test reading an image keeps it over images read less recently."""
+        store = ImageStore(max_total_bytes=8)
+        store.put('s1', 'i1', b'abcd')
+        store.put('s2', 'i1', b'abcd')
+        store.get('s1', 'i1')
+        store.put('s3', 'i1', b'abcd')
+        self.assertIsNotNone(store.get('s1', 'i1'))
+        self.assertIsNone(store.get('s2', 'i1'))
+
+    def test_image_larger_than_the_store_is_not_kept(self) -> None:
+        """Test an image over the total budget is dropped on its own."""
+        store = ImageStore(max_total_bytes=4)
+        store.put('s1', 'i1', b'abc')
+        store.put('s2', 'i1', b'too large')
+        self.assertIsNone(store.latest('s2'))
+        self.assertEqual(store._total_bytes, 0)
+
+    def test_replacing_an_image_updates_the_budget(self) -> None:
+        """Test putting an existing id replaces the image."""
+        store = ImageStore()
+        store.put('s1', 'i1', b'abc')
+        store.put('s1', 'i1', b'abcdef')
+        self.assertEqual(store.get('s1', 'i1').data, b'abcdef')
+        self.assertEqual(store._total_bytes, 6)
+
+
+class DiskImageStoreTest(unittest.TestCase):
+    """Tests for the ImageStore keeping images in a directory."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_images_survive_restarts(self) -> None:
+        """Test a new store loads the images and their order of use."""
+        store = ImageStore(directory=self.tmp.name)
+        store.put('s/1', 'i1', b'one', 'image/png', 'one.png')
+        store.put('s/1', 'i2', b'')
+        self.assertIsNone(store._entries[('s/1', 'i1')].data)
+        store = ImageStore(directory=self.tmp.name)
+        image = store.get('s/1', 'i1')
+        self.assertEqual((image.data, image.name), (b'one', 'one.png'))
+        self.assertEqual(store.latest('s/1').data, b'')
+
+    def test_evicted_images_are_deleted(self) -> None:
+        """Test evicted images no longer take disk space."""
+        store = ImageStore(max_total_bytes=4, directory=self.tmp.name)
+        store.put('s1', 'i1', b'abcd')
+        store.put('s2', 'i1', b'abcd')
+        self.assertEqual(os.listdir(self.tmp.name + '/s1'), [])
+
+    def test_missing_file_is_a_miss(self) -> None:
+        """Test an image whose file was removed is not returned."""
+        store = ImageStore(directory=self.tmp.name)
+        store.put('s1', 'i1', b'abcd')
+        os.remove(os.path.join(self.tmp.name, 's1', 'i1'))
+        self.assertIsNone(store.get('s1', 'i1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
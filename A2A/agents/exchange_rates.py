@@ -0,0 +1,159 @@
+"""Exchange rate lookups shared by the currency agents.
+
+Rates come from the Frankfurter API. Every lookup fetches the rates of all
+currencies against the base currency at once, and later lookups for any pair
+with the same base and date are answered from that snapshot. Snapshots of
+past dates never change and are kept until evicted by size, while snapshots
+of the latest rates expire after a TTL. Concurrent lookups of the same
+snapshot share a single request.
+
+The upstream can be replaced, e.g. by a local stub in tests, either by
+passing it to ExchangeRateService or by pointing FRANKFURTER_URL at another
+server.
+"""
+
+import asyncio
+import collections
+import datetime
+import os
+import time
+
+from typing import Any, Protocol
+
+import httpx
+
+
+class RateUpstream(Protocol):
+    async def fetch(self, date: str, base: str) -> dict[str, Any]:
+        """Return the rates of every currency against `base` on `date`.
+
+        The result has the shape of a Frankfurter response, with `amount`,
+        `base`, `date` and `rates` keys.
+        """
+        ...
+
+
+class FrankfurterUpstream:
+    """Fetches rates from the Frankfurter API over a pooled client."""
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        timeout: float = 10.0,
+    ):
+        self._base_url = (
+            base_url
+            or os.getenv('FRANKFURTER_URL', 'https://api.frankfurter.app')
+        ).rstrip('/')
+        self._timeout = timeout
+        self._client: httpx.AsyncClient | None = None
+
+    async def fetch(self, date: str, base: str) -> dict[str, Any]:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self._timeout)
+        response = await self._client.get(
+            f'{self._base_url}/{date}', params={'from': base}
+        )
+        response.raise_for_status()
+        data = response.json()
+        if 'rates' not in data:
+            raise ValueError('Invalid API response format.')
+        return data
+
+    async def aclose(self):
+        if self._client:
+            await self._client.aclose()
+
+
+class ExchangeRateService:
+    """Cached exchange rate lookups, see the module docstring."""
+
+    def __init__(
+        self,
+        upstream: RateUpstream | None = None,
+        latest_ttl: float = 600.0,
+        max_snapshots: int = 1024,
+    ):
+        self._upstream = upstream or FrankfurterUpstream()
+        self._latest_ttl = latest_ttl
+        self._max_snapshots = max_snapshots
+        # (date, base) to the snapshot and when it expires, None for never.
+        # Least recently used first.
+        self._snapshots: collections.OrderedDict[
+            tuple[str, str], tuple[dict[str, Any], float | None]
+        ] = collections.OrderedDict()
+        self._inflight: dict[tuple[str, str], asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get_rates(
+        self,
+        currency_from: str = 'USD',
+        currency_to: str = 'EUR',
+        date: str = 'latest',
+    ) -> dict[str, Any]:
+        """Rates from `currency_from` to the comma separated `currency_to`.
+
+        Returns a Frankfurter style response with only the requested rates.
+        Currencies missing from the snapshot are left out of `rates`.
+        """
+        base = currency_from.strip().upper()
+        targets = [x.strip().upper() for x in currency_to.split(',')]
+        snapshot = await self._get_snapshot(date.strip() or 'latest', base)
+        rates = {
+            target: 1.0 if target == base else snapshot['rates'][target]
+            for target in targets
+            if target == base or target in snapshot['rates']
+        }
+        return {**snapshot, 'rates': rates}
+
+    async def _get_snapshot(self, date: str, base: str) -> dict[str, Any]:
+        key = (date, base)
+        cached = self._snapshots.get(key)
+        if cached:
+            snapshot, expires_at = cached
+            if expires_at is None or expires_at > time.monotonic():
+                self.hits += 1
+                self._snapshots.move_to_end(key)
+                return snapshot
+            del self._snapshots[key]
+        task = self._inflight.get(key)
+        if not task:
+            # Callers joining a request in flight are neither hits nor misses.
+            self.misses += 1
+            task = asyncio.ensure_future(self._fetch(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so a cancelled caller does not cancel the shared request.
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: tuple[str, str]) -> dict[str, Any]:
+        date, base = key
+        snapshot = await self._upstream.fetch(date, base)
+        expires_at = (
+            None if _is_past(date) else time.monotonic() + self._latest_ttl
+        )
+        self._snapshots[key] = (snapshot, expires_at)
+        while len(self._snapshots) > self._max_snapshots:
+            self._snapshots.popitem(last=False)
+        return snapshot
+
+
+def _is_past(date: str) -> bool:
+    """Whether `date` is a day before today, whose rates are final."""
+    try:
+        day = datetime.date.fromisoformat(date)
+    except ValueError:
+        return False
+    return day < datetime.datetime.now(datetime.UTC).date()
+
+
+_service: ExchangeRateService | None = None
+
+
+def get_exchange_rate_service() -> ExchangeRateService:
+    """The service shared by every tool call in the process."""
+    global _service
+    if _service is None:
+        _service = ExchangeRateService()
+    return _service
@@ -12,6 +12,12 @@ from common.types import (
     MissingAPIKeyError,
 )
 from dotenv import load_dotenv
+from storage import (
+    BufferedSessionService,
+    InMemoryRequestIdStore,
+    SqliteRequestIdStore,
+    SqliteSessionService,
+)
 from task_manager import AgentTaskManager
 
 
@@ -21,10 +27,38 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def create_agent(database: str | None, ttl: float) -> ReimbursementAgent:
+    if not database:
+        return ReimbursementAgent(
+            request_id_store=InMemoryRequestIdStore(ttl=ttl)
+        )
+    logger.info(f'Keeping sessions and request ids in {database}')
+    return ReimbursementAgent(
+        session_service=BufferedSessionService(
+            SqliteSessionService(database, ttl=ttl)
+        ),
+        request_id_store=SqliteRequestIdStore(database, ttl=ttl),
+    )
+
+
 @click.command()
 @click.option('--host', default='localhost')
 @click.option('--port', default=10002)
-def main(host, port):
+@click.option(
+    '--database',
+    envvar='REIMBURSEMENT_DB',
+    default=None,
+    help=(
+        'SQLite file keeping the sessions and request ids, shared by the '
+        'replicas using it. In memory if not set.'
+    ),
+)
+@click.option(
+    '--ttl-hours',
+    default=7 * 24,
+    help='Hours sessions and request ids are kept for since last used.',
+)
+def main(host, port, database, ttl_hours):
     try:
         # Check for API key only if Vertex AI is not configured
         if not os.getenv('GOOGLE_GENAI_USE_VERTEXAI') == 'TRUE':
@@ -55,7 +89,9 @@ def main(host, port):
         )
         server = A2AServer(
             agent_card=agent_card,
-            task_manager=AgentTaskManager(agent=ReimbursementAgent()),
+            task_manager=AgentTaskManager(
+                agent=create_agent(database, ttl_hours * 60 * 60)
+            ),
             host=host,
             port=port,
         )
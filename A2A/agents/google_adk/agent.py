@@ -1,48 +1,20 @@
 import json
 import random
 
+from collections.abc import Awaitable, Callable
 from typing import Any, Optional
 
+from agents.blocking import get_blocking_executor
 from google.adk.agents.llm_agent import LlmAgent
 from google.adk.artifacts import InMemoryArtifactService
 from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
+from google.adk.sessions import BaseSessionService, InMemorySessionService
 from google.adk.tools.tool_context import ToolContext
+from storage import InMemoryRequestIdStore, RequestIdStore
 from task_manager import AgentWithTaskManager
 
 
-# Local cache of created request_ids for demo purposes.
-request_ids = set()
-
-
-def create_request_form(
-    date: Optional[str] = None,
-    amount: Optional[str] = None,
-    purpose: Optional[str] = None,
-) -> dict[str, Any]:
-    """Create a request form for the employee to fill out.
-
-    Args:
-        date (str): The date of the request. Can be an empty string.
-        amount (str): The requested amount. Can be an empty string.
-        purpose (str): The purpose of the request. Can be an empty string.
-
-    Returns:
-        dict[str, Any]: A dictionary containing the request form data.
-    """
-    request_id = 'request_id_' + str(random.randint(1000000, 9999999))
-    request_ids.add(request_id)
-    return {
-        'request_id': request_id,
-        'date': '<transaction date>' if not date else date,
-        'amount': '<transaction dollar amount>' if not amount else amount,
-        'purpose': '<business justification/purpose of the transaction>'
-        if not purpose
-        else purpose,
-    }
-
-
 def return_form(
     form_request: dict[str, Any],
     tool_context: ToolContext,
@@ -99,14 +71,55 @@ def return_form(
     return json.dumps(form_dict)
 
 
-def reimburse(request_id: str) -> dict[str, Any]:
-    """Reimburse the amount of money to the employee for a given request_id."""
-    if request_id not in request_ids:
+def request_tools(
+    request_ids: RequestIdStore,
+) -> list[Callable[..., Awaitable[Any]]]:
+    """The tools creating and reimbursing requests, with ids in `request_ids`.
+
+    The store is bound by closure, as ADK calls tools as plain functions,
+    so each agent validates the ids against its own store. It is used on
+    the blocking-call executor, as SQLite blocks while another replica
+    writes.
+    """
+
+    async def create_request_form(
+        date: Optional[str] = None,
+        amount: Optional[str] = None,
+        purpose: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """Create a request form for the employee to fill out.
+
+        Args:
+            date (str): The date of the request. Can be an empty string.
+            amount (str): The requested amount. Can be an empty string.
+            purpose (str): The purpose of the request. Can be an empty string.
+
+        Returns:
+            dict[str, Any]: A dictionary containing the request form data.
+        """
+        request_id = 'request_id_' + str(random.randint(1000000, 9999999))
+        await get_blocking_executor().run(request_ids.add, request_id)
         return {
             'request_id': request_id,
-            'status': 'Error: Invalid request_id.',
+            'date': '<transaction date>' if not date else date,
+            'amount': '<transaction dollar amount>' if not amount else amount,
+            'purpose': '<business justification/purpose of the transaction>'
+            if not purpose
+            else purpose,
         }
-    return {'request_id': request_id, 'status': 'approved'}
+
+    async def reimburse(request_id: str) -> dict[str, Any]:
+        """Reimburse the amount of money to the employee for a given request_id."""
+        if not await get_blocking_executor().run(
+            request_ids.__contains__, request_id
+        ):
+            return {
+                'request_id': request_id,
+                'status': 'Error: Invalid request_id.',
+            }
+        return {'request_id': request_id, 'status': 'approved'}
+
+    return [create_request_form, reimburse]
 
 
 class ReimbursementAgent(AgentWithTaskManager):
@@ -114,14 +127,30 @@ class ReimbursementAgent(AgentWithTaskManager):
 
     SUPPORTED_CONTENT_TYPES = ['text', 'text/plain']
 
-    def __init__(self):
+    def __init__(
+        self,
+        session_service: BaseSessionService | None = None,
+        request_id_store: RequestIdStore | None = None,
+    ):
+        """Initialize the agent, keeping its state in memory by default.
+
+        Args:
+            session_service (BaseSessionService): The service storing the sessions.
+            request_id_store (RequestIdStore): The store of the ids of the request forms created.
+        """
+        super().__init__()
+        self._request_ids = (
+            request_id_store
+            if request_id_store is not None
+            else InMemoryRequestIdStore()
+        )
         self._agent = self._build_agent()
         self._user_id = 'remote_agent'
         self._runner = Runner(
             app_name=self._agent.name,
             agent=self._agent,
             artifact_service=InMemoryArtifactService(),
-            session_service=InMemorySessionService(),
+            session_service=session_service or InMemorySessionService(),
             memory_service=InMemoryMemoryService(),
         )
 
@@ -160,8 +189,7 @@ class ReimbursementAgent(AgentWithTaskManager):
 
     """,
             tools=[
-                create_request_form,
-                reimburse,
+                *request_tools(self._request_ids),
                 return_form,
             ],
         )
@@ -0,0 +1,301 @@
+"""Storage of the reimbursement agent, which replicas can share.
+
+The in-memory stores keep the state of a single process, while the SQLite
+ones keep it in a database file any number of processes can use at once,
+so any replica can carry on a session or validate a request id.
+"""
+
+import collections
+import contextlib
+import dataclasses
+import logging
+import sqlite3
+import threading
+import time
+
+from abc import ABC, abstractmethod
+from typing import Any
+
+from agents.blocking import get_blocking_executor
+from google.adk.events import Event
+from google.adk.sessions import (
+    BaseSessionService,
+    DatabaseSessionService,
+    Session,
+)
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    # Readers and a writer of other processes do not block each other.
+    connection.execute('PRAGMA journal_mode=WAL')
+    return connection
+
+
+class RequestIdStore(ABC):
+    """The ids of the request forms created, forgotten after a ttl."""
+
+    @abstractmethod
+    def add(self, request_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def __contains__(self, request_id: str) -> bool:
+        pass
+
+
+class InMemoryRequestIdStore(RequestIdStore):
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # Request id to when it was added, oldest first.
+        self._added: collections.OrderedDict[str, float] = (
+            collections.OrderedDict()
+        )
+
+    def add(self, request_id: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._added.pop(request_id, None)
+            self._added[request_id] = now
+            while next(iter(self._added.values())) < now - self._ttl:
+                self._added.popitem(last=False)
+
+    def __contains__(self, request_id: str) -> bool:
+        with self._lock:
+            added = self._added.get(request_id)
+        return added is not None and added >= time.time() - self._ttl
+
+
+class SqliteRequestIdStore(RequestIdStore):
+    """Request ids in a SQLite database, expired ones deleted periodically."""
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = DEFAULT_TTL,
+        cleanup_interval: float = 10 * 60,
+    ):
+        self._path = path
+        self._ttl = ttl
+        self._cleanup_interval = cleanup_interval
+        self._next_cleanup = 0.0
+        # sqlite3 connections can only be used by the thread creating them.
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS request_ids ('
+            'request_id TEXT PRIMARY KEY, created_at REAL NOT NULL)'
+        )
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS request_ids_by_created_at '
+            'ON request_ids (created_at)'
+        )
+
+    def add(self, request_id: str) -> None:
+        self._connection().execute(
+            'INSERT OR REPLACE INTO request_ids VALUES (?, ?)',
+            (request_id, time.time()),
+        )
+        if time.monotonic() >= self._next_cleanup:
+            self.cleanup()
+
+    def __contains__(self, request_id: str) -> bool:
+        row = (
+            self._connection()
+            .execute(
+                'SELECT 1 FROM request_ids '
+                'WHERE request_id = ? AND created_at >= ?',
+                (request_id, time.time() - self._ttl),
+            )
+            .fetchone()
+        )
+        return row is not None
+
+    def cleanup(self) -> int:
+        """Delete the expired request ids, returning how many there were."""
+        self._next_cleanup = time.monotonic() + self._cleanup_interval
+        deleted = (
+            self._connection()
+            .execute(
+                'DELETE FROM request_ids WHERE created_at < ?',
+                (time.time() - self._ttl,),
+            )
+            .rowcount
+        )
+        if deleted:
+            logger.info(f'Deleted {deleted} expired request ids')
+        return deleted
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = _connect(self._path)
+        return connection
+
+
+class SqliteSessionService(DatabaseSessionService):
+    """ADK's database session service over a SQLite file.
+
+    Sessions not updated for `ttl` seconds are deleted with their events
+    periodically, and the events are indexed by session, which ADK looks
+    them up by.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = DEFAULT_TTL,
+        cleanup_interval: float = 10 * 60,
+    ):
+        self._path = path
+        self._ttl = ttl
+        self._cleanup_interval = cleanup_interval
+        self._next_cleanup = 0.0
+        _connect(path).close()
+        super().__init__(f'sqlite:///{path}?timeout=30')
+        with contextlib.closing(_connect(path)) as connection:
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS events_by_session '
+                'ON events (session_id, timestamp)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS sessions_by_update_time '
+                'ON sessions (update_time)'
+            )
+
+    def create_session(self, **kwargs: Any) -> Session:
+        if time.monotonic() >= self._next_cleanup:
+            self.cleanup()
+        return super().create_session(**kwargs)
+
+    def cleanup(self) -> int:
+        """Delete the expired sessions, returning how many there were."""
+        self._next_cleanup = time.monotonic() + self._cleanup_interval
+        # Times are stored in UTC by SQLite, as text comparable to datetime.
+        cutoff = f'-{int(self._ttl)} seconds'
+        with contextlib.closing(_connect(self._path)) as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute(
+                    'DELETE FROM events '
+                    'WHERE (app_name, user_id, session_id) IN ('
+                    'SELECT app_name, user_id, id FROM sessions '
+                    "WHERE update_time < datetime('now', ?))",
+                    (cutoff,),
+                )
+                deleted = connection.execute(
+                    'DELETE FROM sessions '
+                    "WHERE update_time < datetime('now', ?)",
+                    (cutoff,),
+                ).rowcount
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        if deleted:
+            logger.info(f'Deleted {deleted} expired sessions')
+        return deleted
+
+
+@dataclasses.dataclass
+class _LoadedSession:
+    # The session the runner sees and the one of the database, which ADK
+    # appends events to on its own.
+    session: Session
+    stored: Session
+    unsaved: list[Event] = dataclasses.field(default_factory=list)
+
+
+class BufferedSessionService(BaseSessionService):
+    """A database session service the runner can use on the event loop.
+
+    Runners call their session service synchronously from the event loop,
+    where a database blocks for as long as its busy timeout. The sessions of
+    the runs in progress are instead loaded beforehand on the blocking-call
+    executor and served from memory, and the events the runner appends to
+    them are kept until saved, also on the executor.
+    """
+
+    def __init__(self, database: DatabaseSessionService):
+        self._database = database
+        self._loaded: dict[tuple[str, str, str], _LoadedSession] = {}
+
+    async def load(
+        self, app_name: str, user_id: str, session_id: str
+    ) -> Session:
+        """Load a session for a run, creating it if new."""
+        stored = await get_blocking_executor().run(
+            self._get_or_create, app_name, user_id, session_id
+        )
+        loaded = _LoadedSession(stored.model_copy(deep=True), stored)
+        self._loaded[app_name, user_id, session_id] = loaded
+        return loaded.session
+
+    async def save(self, session: Session) -> None:
+        """Write the events appended to a loaded session since last saved."""
+        loaded = self._loaded.get(_key(session))
+        if not loaded or not loaded.unsaved:
+            return
+        events, loaded.unsaved = loaded.unsaved, []
+        await get_blocking_executor().run(self._write, loaded.stored, events)
+
+    def unload(self, session: Session) -> None:
+        """Forget a loaded session once its run is over."""
+        self._loaded.pop(_key(session), None)
+
+    def create_session(self, **kwargs: Any) -> Session:
+        return self._database.create_session(**kwargs)
+
+    def get_session(self, **kwargs: Any) -> Session | None:
+        loaded = self._loaded.get(
+            (kwargs['app_name'], kwargs['user_id'], kwargs['session_id'])
+        )
+        if loaded:
+            return loaded.session
+        return self._database.get_session(**kwargs)
+
+    def list_sessions(self, **kwargs: Any):
+        return self._database.list_sessions(**kwargs)
+
+    def delete_session(self, **kwargs: Any) -> None:
+        self._database.delete_session(**kwargs)
+
+    def list_events(self, **kwargs: Any):
+        return self._database.list_events(**kwargs)
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        loaded = self._loaded.get(_key(session))
+        if not loaded or loaded.session is not session:
+            return self._database.append_event(session, event)
+        if not event.partial:
+            loaded.unsaved.append(event)
+        return super().append_event(session, event)
+
+    def _get_or_create(
+        self, app_name: str, user_id: str, session_id: str
+    ) -> Session:
+        session = self._database.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        if session is None:
+            session = self._database.create_session(
+                app_name=app_name,
+                user_id=user_id,
+                state={},
+                session_id=session_id,
+            )
+        return session
+
+    def _write(self, stored: Session, events: list[Event]) -> None:
+        for event in events:
+            self._database.append_event(stored, event)
+
+
+def _key(session: Session) -> tuple[str, str, str]:
+    return session.app_name, session.user_id, session.id
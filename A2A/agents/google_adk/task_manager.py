@@ -1,8 +1,11 @@
+import asyncio
+import contextlib
 import json
 import logging
+import weakref
 
 from abc import ABC, abstractmethod
-from collections.abc import AsyncIterable
+from collections.abc import AsyncIterable, AsyncIterator
 from typing import Any
 
 from common.server import utils
@@ -24,98 +27,156 @@ from common.types import (
     TaskStatusUpdateEvent,
     TextPart,
 )
+from google.adk.events import Event
 from google.genai import types
+from storage import BufferedSessionService
 
 
 logger = logging.getLogger(__name__)
 
+# Seconds a run waits for the previous run of its session to finish.
+SESSION_LOCK_TIMEOUT = 300.0
+
 
 # TODO: Move this class (or these classes) to a common directory
 class AgentWithTaskManager(ABC):
+    def __init__(self):
+        # A lock per session id, dropped once no request holds it.
+        self._session_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+
     @abstractmethod
     def get_processing_message(self) -> str:
         pass
 
-    def invoke(self, query, session_id) -> str:
-        session = self._runner.session_service.get_session(
-            app_name=self._agent.name,
-            user_id=self._user_id,
-            session_id=session_id,
-        )
-        content = types.Content(
-            role='user', parts=[types.Part.from_text(text=query)]
-        )
-        if session is None:
-            session = self._runner.session_service.create_session(
+    def _session_lock(self, session_id: str) -> asyncio.Lock:
+        """The lock serializing the runs of a session.
+
+        Runs of the same session would otherwise interleave their events in
+        its history, while runs of different sessions go concurrently.
+        """
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._session_locks[session_id] = lock
+        return lock
+
+    @contextlib.asynccontextmanager
+    async def _session_run(self, session_id: str) -> AsyncIterator[None]:
+        """Hold the lock of a session for the duration of a run.
+
+        A run waits at most SESSION_LOCK_TIMEOUT seconds for the lock, so a
+        stream that is never consumed to the end cannot block the session
+        for good.
+        """
+        lock = self._session_lock(session_id)
+        try:
+            await asyncio.wait_for(lock.acquire(), SESSION_LOCK_TIMEOUT)
+        except TimeoutError:
+            raise TimeoutError(
+                f'Session {session_id} is busy with another request'
+            ) from None
+        try:
+            yield
+        finally:
+            lock.release()
+
+    async def _run(self, query: str, session_id: str) -> AsyncIterator[Event]:
+        """The events of a run of the agent, creating the session if new.
+
+        A buffered session service is loaded and saved on the blocking-call
+        executor, so the runner never waits on its database on the event
+        loop. Other services are used as the runner uses them.
+        """
+        service = self._runner.session_service
+        buffered = isinstance(service, BufferedSessionService)
+        if buffered:
+            session = await service.load(
+                self._agent.name, self._user_id, session_id
+            )
+        else:
+            session = service.get_session(
+                app_name=self._agent.name,
+                user_id=self._user_id,
+                session_id=session_id,
+            ) or service.create_session(
                 app_name=self._agent.name,
                 user_id=self._user_id,
                 state={},
                 session_id=session_id,
             )
-        events = list(
-            self._runner.run(
+        try:
+            async for event in self._runner.run_async(
                 user_id=self._user_id,
                 session_id=session.id,
-                new_message=content,
-            )
-        )
-        if not events or not events[-1].content or not events[-1].content.parts:
+                new_message=types.Content(
+                    role='user', parts=[types.Part.from_text(text=query)]
+                ),
+            ):
+                if buffered:
+                    await service.save(session)
+                yield event
+        finally:
+            if buffered:
+                try:
+                    await service.save(session)
+                finally:
+                    service.unload(session)
+
+    async def invoke(self, query, session_id) -> str:
+        async with self._session_run(session_id):
+            last_event = None
+            async for event in self._run(query, session_id):
+                last_event = event
+        if (
+            not last_event
+            or not last_event.content
+            or not last_event.content.parts
+        ):
             return ''
-        return '\n'.join([p.text for p in events[-1].content.parts if p.text])
+        return '\n'.join([p.text for p in last_event.content.parts if p.text])
 
     async def stream(self, query, session_id) -> AsyncIterable[dict[str, Any]]:
-        session = self._runner.session_service.get_session(
-            app_name=self._agent.name,
-            user_id=self._user_id,
-            session_id=session_id,
-        )
-        content = types.Content(
-            role='user', parts=[types.Part.from_text(text=query)]
-        )
-        if session is None:
-            session = self._runner.session_service.create_session(
-                app_name=self._agent.name,
-                user_id=self._user_id,
-                state={},
-                session_id=session_id,
-            )
-        async for event in self._runner.run_async(
-            user_id=self._user_id, session_id=session.id, new_message=content
+        async with (
+            self._session_run(session_id),
+            contextlib.aclosing(self._run(query, session_id)) as events,
         ):
-            if event.is_final_response():
-                response = ''
-                if (
-                    event.content
-                    and event.content.parts
-                    and event.content.parts[0].text
-                ):
-                    response = '\n'.join(
-                        [p.text for p in event.content.parts if p.text]
-                    )
-                elif (
-                    event.content
-                    and event.content.parts
-                    and any(
-                        [
-                            True
+            async for event in events:
+                if event.is_final_response():
+                    response = ''
+                    if (
+                        event.content
+                        and event.content.parts
+                        and event.content.parts[0].text
+                    ):
+                        response = '\n'.join(
+                            [p.text for p in event.content.parts if p.text]
+                        )
+                    elif (
+                        event.content
+                        and event.content.parts
+                        and any(
+                            [
+                                True
+                                for p in event.content.parts
+                                if p.function_response
+                            ]
+                        )
+                    ):
+                        response = next(
+                            p.function_response.model_dump()
                             for p in event.content.parts
-                            if p.function_response
-                        ]
-                    )
-                ):
-                    response = next(
-                        p.function_response.model_dump()
-                        for p in event.content.parts
-                    )
-                yield {
-                    'is_task_complete': True,
-                    'content': response,
-                }
-            else:
-                yield {
-                    'is_task_complete': False,
-                    'updates': self.get_processing_message(),
-                }
+                        )
+                    yield {
+                        'is_task_complete': True,
+                        'content': response,
+                    }
+                else:
+                    yield {
+                        'is_task_complete': False,
+                        'updates': self.get_processing_message(),
+                    }
 
 
 class AgentTaskManager(InMemoryTaskManager):
@@ -129,32 +190,38 @@ class AgentTaskManager(InMemoryTaskManager):
         task_send_params: TaskSendParams = request.params
         query = self._get_user_query(task_send_params)
         try:
-            async for item in self.agent.stream(
-                query, task_send_params.sessionId
-            ):
-                is_task_complete = item['is_task_complete']
-                artifacts = None
-                if not is_task_complete:
-                    task_state = TaskState.WORKING
-                    parts = [{'type': 'text', 'text': item['updates']}]
-                else:
-                    if isinstance(item['content'], dict):
-                        if (
-                            'response' in item['content']
-                            and 'result' in item['content']['response']
-                        ):
-                            data = json.loads(
-                                item['content']['response']['result']
-                            )
-                            task_state = TaskState.INPUT_REQUIRED
+            # Closed explicitly, so the session is released as soon as the
+            # request fails or is cancelled rather than when the stream is
+            # collected.
+            async with contextlib.aclosing(
+                self.agent.stream(query, task_send_params.sessionId)
+            ) as stream:
+                async for item in stream:
+                    is_task_complete = item['is_task_complete']
+                    artifacts = None
+                    if not is_task_complete:
+                        task_state = TaskState.WORKING
+                        parts = [{'type': 'text', 'text': item['updates']}]
+                    else:
+                        if isinstance(item['content'], dict):
+                            if (
+                                'response' in item['content']
+                                and 'result' in item['content']['response']
+                            ):
+                                data = json.loads(
+                                    item['content']['response']['result']
+                                )
+                                task_state = TaskState.INPUT_REQUIRED
+                            else:
+                                data = item['content']
+                                task_state = TaskState.COMPLETED
+                            parts = [{'type': 'data', 'data': data}]
                         else:
-                            data = item['content']
                             task_state = TaskState.COMPLETED
-                        parts = [{'type': 'data', 'data': data}]
-                    else:
-                        task_state = TaskState.COMPLETED
-                        parts = [{'type': 'text', 'text': item['content']}]
-                    artifacts = [Artifact(parts=parts, index=0, append=False)]
+                            parts = [{'type': 'text', 'text': item['content']}]
+                        artifacts = [
+                            Artifact(parts=parts, index=0, append=False)
+                        ]
             message = Message(role='agent', parts=parts)
             task_status = TaskStatus(state=task_state, message=message)
             await self._update_store(
@@ -251,7 +318,7 @@ class AgentTaskManager(InMemoryTaskManager):
         task_send_params: TaskSendParams = request.params
         query = self._get_user_query(task_send_params)
         try:
-            result = self.agent.invoke(query, task_send_params.sessionId)
+            result = await self.agent.invoke(query, task_send_params.sessionId)
         except Exception as e:
             logger.error(f'Error invoking agent: {e}')
             raise ValueError(f'Error invoking agent: {e}')
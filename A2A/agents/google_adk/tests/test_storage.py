@@ -0,0 +1,343 @@
+import contextlib
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from unittest import mock
+
+import storage
+
+from google.adk.agents import BaseAgent
+from google.adk.events import Event
+from google.adk.runners import Runner
+from google.genai import types
+from storage import (
+    BufferedSessionService,
+    InMemoryRequestIdStore,
+    SqliteRequestIdStore,
+    SqliteSessionService,
+)
+
+
+def user_event(text: str) -> Event:
+    return Event(
+        author='user',
+        content=types.Content(
+            role='user', parts=[types.Part.from_text(text=text)]
+        ),
+    )
+
+
+class ClockTestCase(unittest.TestCase):
+    """Runs the storage module on a clock the test sets."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.now = 1_000_000.0
+        patcher = mock.patch.object(
+            storage,
+            'time',
+            mock.Mock(time=lambda: self.now, monotonic=lambda: self.now),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'reimbursement.db')
+
+
+class InMemoryRequestIdStoreTest(ClockTestCase):
+    """Tests for InMemoryRequestIdStore."""
+
+    def test_ids_expire_after_ttl(self) -> None:
+        """Test ids are known until ttl seconds after they were added."""
+        store = InMemoryRequestIdStore(ttl=60)
+        store.add('r1')
+        self.assertIn('r1', store)
+        self.assertNotIn('r2', store)
+        self.now += 60
+        self.assertIn('r1', store)
+        self.now += 1
+        self.assertNotIn('r1', store)
+
+    def test_adding_again_renews_an_id(self) -> None:
+        """Test an id added again is kept for a new ttl."""
+        store = InMemoryRequestIdStore(ttl=60)
+        store.add('r1')
+        self.now += 50
+        store.add('r1')
+        self.now += 50
+        self.assertIn('r1', store)
+
+    def test_expired_ids_are_dropped_on_add(self) -> None:
+        """Test adding an id forgets the expired ones."""
+        store = InMemoryRequestIdStore(ttl=60)
+        store.add('r1')
+        store.add('r2')
+        self.now += 61
+        store.add('r3')
+        self.assertEqual(list(store._added), ['r3'])
+
+
+class SqliteRequestIdStoreTest(ClockTestCase):
+    """Tests for SqliteRequestIdStore."""
+
+    def test_ids_are_shared_by_stores_of_the_file(self) -> None:
+        """Test an id added by one replica is known to the others."""
+        SqliteRequestIdStore(self.path).add('r1')
+        other = SqliteRequestIdStore(self.path)
+        self.assertIn('r1', other)
+        self.assertNotIn('r2', other)
+
+    def test_ids_expire_after_ttl(self) -> None:
+        """Test ids older than the ttl are not known, before any cleanup."""
+        store = SqliteRequestIdStore(self.path, ttl=60)
+        store.add('r1')
+        self.now += 60
+        self.assertIn('r1', store)
+        self.now += 1
+        self.assertNotIn('r1', store)
+
+    def test_cleanup_deletes_expired_ids(self) -> None:
+        """Test cleanup deletes and counts the expired ids only."""
+        store = SqliteRequestIdStore(self.path, ttl=60)
+        store.add('r1')
+        self.now += 30
+        store.add('r2')
+        self.now += 31
+        self.assertEqual(store.cleanup(), 1)
+        self.assertEqual(store.cleanup(), 0)
+        self.assertIn('r2', store)
+
+    def test_add_cleans_up_periodically(self) -> None:
+        """Test adding ids deletes the expired ones every interval."""
+        store = SqliteRequestIdStore(self.path, ttl=60, cleanup_interval=100)
+        with mock.patch.object(
+            store, 'cleanup', wraps=store.cleanup
+        ) as cleanup:
+            store.add('r1')
+            self.now += 99
+            store.add('r2')
+            self.assertEqual(cleanup.call_count, 1)
+            self.now += 1
+            store.add('r3')
+            self.assertEqual(cleanup.call_count, 2)
+
+    def test_threads_use_connections_of_their_own(self) -> None:
+        """Test the store can be used from any thread."""
+        store = SqliteRequestIdStore(self.path)
+        results = []
+
+        def add_and_check(request_id: str) -> None:
+            store.add(request_id)
+            results.append(request_id in store)
+
+        threads = [
+            threading.Thread(target=add_and_check, args=(f'r{i}',))
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [True] * 4)
+        self.assertTrue(all(f'r{i}' in store for i in range(4)))
+
+
+class SqliteSessionServiceTest(ClockTestCase):
+    """Tests for SqliteSessionService."""
+
+    def create_session(self, service: SqliteSessionService, session_id: str):
+        return service.create_session(
+            app_name='app', user_id='user', state={}, session_id=session_id
+        )
+
+    def get_session(self, service: SqliteSessionService, session_id: str):
+        return service.get_session(
+            app_name='app', user_id='user', session_id=session_id
+        )
+
+    def age_sessions(self, seconds: int) -> None:
+        """Move the last update of every session back in time."""
+        with contextlib.closing(sqlite3.connect(self.path)) as connection:
+            connection.execute(
+                'UPDATE sessions SET update_time = datetime(update_time, ?)',
+                (f'-{seconds} seconds',),
+            )
+            connection.commit()
+
+    def test_sessions_are_shared_by_services_of_the_file(self) -> None:
+        """Test a session and its events are seen by the other replicas."""
+        service = SqliteSessionService(self.path)
+        session = self.create_session(service, 's1')
+        service.append_event(session, user_event('hello'))
+        restored = self.get_session(SqliteSessionService(self.path), 's1')
+        self.assertEqual(
+            [e.content.parts[0].text for e in restored.events], ['hello']
+        )
+        self.assertIsNone(self.get_session(service, 's2'))
+
+    def test_creates_the_lookup_indexes(self) -> None:
+        """Test events are indexed by session and sessions by update time."""
+        SqliteSessionService(self.path)
+        with contextlib.closing(sqlite3.connect(self.path)) as connection:
+            indexes = {
+                row[0]
+                for row in connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'index'"
+                )
+            }
+            journal_mode = connection.execute('PRAGMA journal_mode').fetchone()
+        self.assertLessEqual(
+            {'events_by_session', 'sessions_by_update_time'}, indexes
+        )
+        self.assertEqual(journal_mode, ('wal',))
+
+    def test_cleanup_deletes_expired_sessions_and_events(self) -> None:
+        """Test cleanup deletes the sessions not updated within the ttl."""
+        service = SqliteSessionService(self.path, ttl=3600)
+        old = self.create_session(service, 'old')
+        service.append_event(old, user_event('hello'))
+        self.age_sessions(7200)
+        self.create_session(service, 'new')
+        self.assertEqual(service.cleanup(), 1)
+        self.assertIsNone(self.get_session(service, 'old'))
+        self.assertIsNotNone(self.get_session(service, 'new'))
+        with contextlib.closing(sqlite3.connect(self.path)) as connection:
+            events = connection.execute(
+                "SELECT COUNT(*) FROM events WHERE session_id = 'old'"
+            ).fetchone()
+        self.assertEqual(events, (0,))
+
+    def test_create_session_cleans_up_periodically(self) -> None:
+        """Test creating sessions deletes the expired ones every interval."""
+        service = SqliteSessionService(
+            self.path, ttl=3600, cleanup_interval=100
+        )
+        self.create_session(service, 's1')
+        self.age_sessions(7200)
+        self.now += 99
+        self.create_session(service, 's2')
+        self.assertIsNotNone(self.get_session(service, 's1'))
+        self.now += 1
+        self.create_session(service, 's3')
+        self.assertIsNone(self.get_session(service, 's1'))
+        self.assertIsNotNone(self.get_session(service, 's2'))
+
+
+class Echo(BaseAgent):
+    """Answers with the number of events the session had."""
+
+    async def _run_async_impl(self, ctx):
+        count = len(ctx.session.events)
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            content=types.Content(
+                role='model', parts=[types.Part.from_text(text=str(count))]
+            ),
+        )
+
+
+class BufferedSessionServiceTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for BufferedSessionService."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.database = SqliteSessionService(
+            os.path.join(directory.name, 'reimbursement.db')
+        )
+        self.service = BufferedSessionService(self.database)
+        self.runner = Runner(
+            app_name='app',
+            agent=Echo(name='echo'),
+            session_service=self.service,
+        )
+        # The database calls and the threads they were made on.
+        self.threads = []
+        for name in ['get_session', 'create_session', 'append_event']:
+            method = getattr(self.database, name)
+            patcher = mock.patch.object(
+                self.database, name, side_effect=self.on_thread(method)
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def on_thread(self, method):
+        def call(*args, **kwargs):
+            self.threads.append(threading.current_thread().name)
+            return method(*args, **kwargs)
+
+        return call
+
+    async def run_agent(self, session, text: str) -> list[Event]:
+        events = []
+        async for event in self.runner.run_async(
+            user_id='user',
+            session_id=session.id,
+            new_message=user_event(text).content,
+        ):
+            await self.service.save(session)
+            events.append(event)
+        return events
+
+    def stored_events(self, session_id: str) -> list[str]:
+        session = self.database.get_session(
+            app_name='app', user_id='user', session_id=session_id
+        )
+        return [e.content.parts[0].text for e in session.events]
+
+    async def test_runs_use_the_database_off_the_event_loop(self) -> None:
+        """Test a run's session is loaded and saved on executor threads."""
+        session = await self.service.load('app', 'user', 's1')
+        events = await self.run_agent(session, 'hello')
+        self.service.unload(session)
+        self.assertEqual(events[-1].content.parts[0].text, '1')
+        self.assertTrue(self.threads)
+        self.assertNotIn(threading.current_thread().name, self.threads)
+        self.assertEqual(self.stored_events('s1'), ['hello', '1'])
+
+    async def test_events_are_kept_until_saved(self) -> None:
+        """Test appended events reach the database when saved."""
+        session = await self.service.load('app', 'user', 's1')
+        self.service.append_event(session, user_event('hello'))
+        self.assertEqual(self.stored_events('s1'), [])
+        self.assertEqual(len(session.events), 1)
+        await self.service.save(session)
+        self.assertEqual(self.stored_events('s1'), ['hello'])
+
+    async def test_sessions_carry_on_after_unload(self) -> None:
+        """Test a session loaded again sees the events of earlier runs."""
+        session = await self.service.load('app', 'user', 's1')
+        await self.run_agent(session, 'hello')
+        self.service.unload(session)
+        session = await self.service.load('app', 'user', 's1')
+        events = await self.run_agent(session, 'again')
+        self.service.unload(session)
+        self.assertEqual(events[-1].content.parts[0].text, '3')
+        self.assertEqual(self.stored_events('s1'), ['hello', '1', 'again', '3'])
+
+    async def test_unloaded_sessions_go_to_the_database(self) -> None:
+        """Test sessions not loaded are read and written directly."""
+        session = self.database.create_session(
+            app_name='app', user_id='user', state={}, session_id='s1'
+        )
+        self.service.append_event(session, user_event('hello'))
+        self.assertEqual(self.stored_events('s1'), ['hello'])
+        self.assertEqual(
+            self.service.get_session(
+                app_name='app', user_id='user', session_id='s1'
+            )
+            .events[0]
+            .content.parts[0]
+            .text,
+            'hello',
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ from typing import Any, Literal
 
 import httpx
 
+from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import AIMessage, ToolMessage
 from langchain_core.tools import tool
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -11,12 +12,14 @@ from pydantic import BaseModel
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent
 
+from agents.exchange_rates import get_exchange_rate_service
+
 
 memory = MemorySaver()
 
 
 @tool
-def get_exchange_rate(
+async def get_exchange_rate(
     currency_from: str = 'USD',
     currency_to: str = 'EUR',
     currency_date: str = 'latest',
@@ -32,20 +35,16 @@ def get_exchange_rate(
         A dictionary containing the exchange rate data, or an error message if the request fails.
     """
     try:
-        response = httpx.get(
-            f'https://api.frankfurter.app/{currency_date}',
-            params={'from': currency_from, 'to': currency_to},
+        data = await get_exchange_rate_service().get_rates(
+            currency_from, currency_to, currency_date
         )
-        response.raise_for_status()
-
-        data = response.json()
-        if 'rates' not in data:
-            return {'error': 'Invalid API response format.'}
-        return data
     except httpx.HTTPError as e:
         return {'error': f'API request failed: {e}'}
     except ValueError:
         return {'error': 'Invalid JSON response from API.'}
+    if not data['rates']:
+        return {'error': f'No exchange rate found for {currency_to}.'}
+    return data
 
 
 class ResponseFormat(BaseModel):
@@ -67,8 +66,8 @@ class CurrencyAgent:
         'Set response status to completed if the request is complete.'
     )
 
-    def __init__(self):
-        self.model = ChatGoogleGenerativeAI(model='gemini-2.0-flash')
+    def __init__(self, model: BaseChatModel | None = None):
+        self.model = model or ChatGoogleGenerativeAI(model='gemini-2.0-flash')
         self.tools = [get_exchange_rate]
 
         self.graph = create_react_agent(
@@ -79,16 +78,18 @@ class CurrencyAgent:
             response_format=ResponseFormat,
         )
 
-    def invoke(self, query, sessionId) -> str:
+    async def ainvoke(self, query, sessionId) -> dict[str, Any]:
         config = {'configurable': {'thread_id': sessionId}}
-        self.graph.invoke({'messages': [('user', query)]}, config)
-        return self.get_agent_response(config)
+        await self.graph.ainvoke({'messages': [('user', query)]}, config)
+        return await self.get_agent_response(config)
 
     async def stream(self, query, sessionId) -> AsyncIterable[dict[str, Any]]:
         inputs = {'messages': [('user', query)]}
         config = {'configurable': {'thread_id': sessionId}}
 
-        for item in self.graph.stream(inputs, config, stream_mode='values'):
+        async for item in self.graph.astream(
+            inputs, config, stream_mode='values'
+        ):
             message = item['messages'][-1]
             if (
                 isinstance(message, AIMessage)
@@ -107,10 +108,10 @@ class CurrencyAgent:
                     'content': 'Processing the exchange rates..',
                 }
 
-        yield self.get_agent_response(config)
+        yield await self.get_agent_response(config)
 
-    def get_agent_response(self, config):
-        current_state = self.graph.get_state(config)
+    async def get_agent_response(self, config):
+        current_state = await self.graph.aget_state(config)
         structured_response = current_state.values.get('structured_response')
         if structured_response and isinstance(
             structured_response, ResponseFormat
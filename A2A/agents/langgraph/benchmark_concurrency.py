@@ -0,0 +1,143 @@
+"""Concurrency benchmark for the CurrencyAgent execution paths.
+
+Runs N conversations in parallel against a stubbed LLM that takes a fixed
+latency per call, comparing:
+
+- blocking: the synchronous graph.invoke called on the event loop, as the
+  task manager used to do, which serializes every conversation.
+- thread pool: graph.invoke offloaded to a thread pool, the task manager's
+  fallback for agents that only have a blocking API.
+- async: CurrencyAgent.ainvoke awaited on the event loop.
+
+run:
+  cd A2A && uv run python -m agents.langgraph.benchmark_concurrency
+"""
+
+import asyncio
+import time
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from agents.langgraph.agent import CurrencyAgent, ResponseFormat
+
+
+LATENCY_SECONDS = 0.05
+CONCURRENCY = [1, 8, 32]
+
+
+class StubChatModel(BaseChatModel):
+    """Answers every call after a fixed latency, without any tool call."""
+
+    latency: float = LATENCY_SECONDS
+
+    @property
+    def _llm_type(self) -> str:
+        return 'stub'
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result()
+
+    def _result(self) -> ChatResult:
+        message = AIMessage(content='1 USD is 0.92 EUR')
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def with_structured_output(self, schema, **kwargs):
+        response = ResponseFormat(status='completed', message='0.92 EUR')
+
+        def respond(_):
+            time.sleep(self.latency)
+            return response
+
+        async def arespond(_):
+            await asyncio.sleep(self.latency)
+            return response
+
+        return RunnableLambda(respond, afunc=arespond)
+
+
+def inputs(session_id: str) -> tuple[dict, dict]:
+    return (
+        {'messages': [('user', 'How much is 1 USD in EUR?')]},
+        {'configurable': {'thread_id': session_id}},
+    )
+
+
+async def run_blocking(agent: CurrencyAgent, n: int):
+    async def invoke():
+        agent.graph.invoke(*inputs(str(uuid.uuid4())))
+
+    await asyncio.gather(*[invoke() for _ in range(n)])
+
+
+async def run_thread_pool(agent: CurrencyAgent, n: int):
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor() as executor:
+        await asyncio.gather(
+            *[
+                loop.run_in_executor(
+                    executor,
+                    lambda: agent.graph.invoke(*inputs(str(uuid.uuid4()))),
+                )
+                for _ in range(n)
+            ]
+        )
+
+
+async def run_async(agent: CurrencyAgent, n: int):
+    await asyncio.gather(
+        *[
+            agent.ainvoke('How much is 1 USD in EUR?', str(uuid.uuid4()))
+            for _ in range(n)
+        ]
+    )
+
+
+async def main():
+    agent = CurrencyAgent(model=StubChatModel())
+    runs = [
+        ('blocking', run_blocking),
+        ('thread pool', run_thread_pool),
+        ('async', run_async),
+    ]
+    print(f'{"path":>12} {"tasks":>6} {"seconds":>8} {"tasks/s":>8}')
+    for name, run in runs:
+        for n in CONCURRENCY:
+            started = time.perf_counter()
+            await run(agent, n)
+            seconds = time.perf_counter() - started
+            print(f'{name:>12} {n:>6} {seconds:>8.3f} {n / seconds:>8.1f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -157,7 +157,7 @@ class AgentTaskManager(InMemoryTaskManager):
         task_send_params: TaskSendParams = request.params
         query = self._get_user_query(task_send_params)
         try:
-            agent_response = self.agent.invoke(
+            agent_response = await self.agent.ainvoke(
                 query, task_send_params.sessionId
             )
         except Exception as e:
@@ -0,0 +1,156 @@
+import unittest
+import uuid
+
+from typing import Any
+from unittest import mock
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from agents.langgraph import agent
+from agents.langgraph.agent import CurrencyAgent, ResponseFormat
+
+
+class StubChatModel(BaseChatModel):
+    """Calls get_exchange_rate once, then answers with the given response."""
+
+    response: ResponseFormat
+
+    @property
+    def _llm_type(self) -> str:
+        return 'stub'
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise AssertionError('the agent must call the model asynchronously')
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if isinstance(messages[-1], ToolMessage):
+            message = AIMessage(content=messages[-1].content)
+        else:
+            message = AIMessage(
+                content='',
+                tool_calls=[
+                    {
+                        'name': 'get_exchange_rate',
+                        'args': {'currency_from': 'USD', 'currency_to': 'EUR'},
+                        'id': 'call-1',
+                    }
+                ],
+            )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def with_structured_output(self, schema, **kwargs):
+        async def respond(_):
+            return self.response
+
+        return RunnableLambda(lambda _: self.response, afunc=respond)
+
+
+class FakeExchangeRateService:
+    """Answers every request with one rate, counting the requests."""
+
+    def __init__(self):
+        self.requests = []
+
+    async def get_rates(self, currency_from, currency_to, currency_date):
+        self.requests.append((currency_from, currency_to, currency_date))
+        return {'base': currency_from, 'rates': {currency_to: 0.92}}
+
+
+class CurrencyAgentTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for CurrencyAgent."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.service = FakeExchangeRateService()
+        patcher = mock.patch.object(
+            agent, 'get_exchange_rate_service', return_value=self.service
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.session_id = uuid.uuid4().hex
+
+    def currency_agent(self, status: str, message: str) -> CurrencyAgent:
+        return CurrencyAgent(
+            StubChatModel(
+                response=ResponseFormat(status=status, message=message)
+            )
+        )
+
+    async def test_ainvoke_returns_the_structured_response(self) -> None:
+        """Test ainvoke runs the tool and returns the final answer."""
+        currency_agent = self.currency_agent('completed', '1 USD is 0.92 EUR')
+        response = await currency_agent.ainvoke('USD to EUR?', self.session_id)
+        self.assertEqual(
+            response,
+            {
+                'is_task_complete': True,
+                'require_user_input': False,
+                'content': '1 USD is 0.92 EUR',
+            },
+        )
+        self.assertEqual(self.service.requests, [('USD', 'EUR', 'latest')])
+
+    async def test_ainvoke_asks_for_input(self) -> None:
+        """Test an input_required answer asks the user for more input."""
+        currency_agent = self.currency_agent('input_required', 'Which date?')
+        response = await currency_agent.ainvoke('USD to EUR?', self.session_id)
+        self.assertEqual(
+            response,
+            {
+                'is_task_complete': False,
+                'require_user_input': True,
+                'content': 'Which date?',
+            },
+        )
+
+    async def test_stream_reports_progress_then_the_answer(self) -> None:
+        """Test stream yields the tool call, its result, then the answer."""
+        currency_agent = self.currency_agent('completed', '1 USD is 0.92 EUR')
+        items = [
+            item
+            async for item in currency_agent.stream(
+                'USD to EUR?', self.session_id
+            )
+        ]
+        self.assertEqual(
+            [item['content'] for item in items],
+            [
+                'Looking up the exchange rates...',
+                'Processing the exchange rates..',
+                '1 USD is 0.92 EUR',
+            ],
+        )
+        self.assertEqual(
+            [item['is_task_complete'] for item in items], [False, False, True]
+        )
+        self.assertFalse(any(item['require_user_input'] for item in items))
+
+    async def test_sessions_keep_their_history(self) -> None:
+        """Test a second query of a session sees the first one."""
+        currency_agent = self.currency_agent('completed', '0.92 EUR')
+        await currency_agent.ainvoke('USD to EUR?', self.session_id)
+        await currency_agent.ainvoke('And now?', self.session_id)
+        state = await currency_agent.graph.aget_state(
+            {'configurable': {'thread_id': self.session_id}}
+        )
+        queries = [
+            m.content for m in state.values['messages'] if m.type == 'human'
+        ]
+        self.assertEqual(queries, ['USD to EUR?', 'And now?'])
+
+
+if __name__ == '__main__':
+    unittest.main()
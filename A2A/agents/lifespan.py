@@ -0,0 +1,44 @@
+"""Release the resources of a sample when its server shuts down.
+
+Samples keep long lived resources, like HTTP sessions or tool
+subprocesses, for the lifetime of the server. They are closed in the
+lifespan of its Starlette app, after the server stopped taking requests.
+"""
+
+import contextlib
+import inspect
+import logging
+
+from collections.abc import Awaitable, Callable
+
+from starlette.applications import Starlette
+
+
+logger = logging.getLogger(__name__)
+
+
+def close_on_shutdown(
+    app: Starlette, *close: Callable[[], Awaitable[None] | None]
+) -> None:
+    """Call the `close` functions, sync or async, when `app` shuts down.
+
+    They are called in order, after the lifespan the app already has, and
+    one failing does not keep the others from running.
+    """
+    lifespan = app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def closing(app: Starlette):
+        async with lifespan(app) as state:
+            try:
+                yield state
+            finally:
+                for func in close:
+                    try:
+                        result = func()
+                        if inspect.isawaitable(result):
+                            await result
+                    except Exception as e:
+                        logger.error(f'Failed to close on shutdown: {e}')
+
+    app.router.lifespan_context = closing
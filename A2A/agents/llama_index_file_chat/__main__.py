@@ -4,6 +4,8 @@ import os
 import click
 
 from agents.llama_index_file_chat.agent import ParseAndChat
+from agents.llama_index_file_chat.context_store import InMemoryContextStore
+from agents.llama_index_file_chat.documents import DocumentCache
 from agents.llama_index_file_chat.task_manager import LlamaIndexTaskManager
 from common.server import A2AServer
 from common.types import (
@@ -25,7 +27,54 @@ logger = logging.getLogger(__name__)
 @click.command()
 @click.option('--host', 'host', default='localhost')
 @click.option('--port', 'port', default=10010)
-def main(host, port):
+@click.option(
+    '--max-sessions',
+    'max_sessions',
+    default=1000,
+    help='Session contexts kept in memory.',
+)
+@click.option(
+    '--max-context-mb',
+    'max_context_mb',
+    default=256,
+    help='Megabytes of session contexts kept in memory.',
+)
+@click.option(
+    '--context-ttl',
+    'context_ttl',
+    default=24 * 60 * 60,
+    help='Seconds an unused session context is kept.',
+)
+@click.option(
+    '--context-spill-dir',
+    'context_spill_dir',
+    default=None,
+    help='Directory evicted session contexts are compressed to.',
+)
+@click.option(
+    '--document-spill-dir',
+    'document_spill_dir',
+    default=None,
+    help='Directory evicted parsed documents are compressed to, a '
+    'temporary one by default.',
+)
+@click.option(
+    '--retrieval-top-k',
+    'retrieval_top_k',
+    default=None,
+    type=int,
+    help='Send only this many chunks of large documents, found with BM25.',
+)
+def main(
+    host,
+    port,
+    max_sessions,
+    max_context_mb,
+    context_ttl,
+    context_spill_dir,
+    document_spill_dir,
+    retrieval_top_k,
+):
     """Starts the Currency Agent server."""
     try:
         if not os.getenv('GOOGLE_API_KEY'):
@@ -63,8 +112,17 @@ def main(host, port):
         server = A2AServer(
             agent_card=agent_card,
             task_manager=LlamaIndexTaskManager(
-                agent=ParseAndChat(),
+                agent=ParseAndChat(
+                    documents=DocumentCache(spill_dir=document_spill_dir),
+                    retrieval_top_k=retrieval_top_k,
+                ),
                 notification_sender_auth=notification_sender_auth,
+                ctx_states=InMemoryContextStore(
+                    max_sessions=max_sessions,
+                    max_bytes=max_context_mb * 1024 * 1024,
+                    ttl=context_ttl,
+                    spill_dir=context_spill_dir,
+                ),
             ),
             host=host,
             port=port,
@@ -3,8 +3,7 @@ import os
 
 from typing import Any
 
-from llama_cloud_services.parse import LlamaParse
-from llama_index.core.llms import ChatMessage
+from llama_index.core.llms import LLM, ChatMessage
 from llama_index.core.workflow import (
     Context,
     Event,
@@ -16,6 +15,12 @@ from llama_index.core.workflow import (
 from llama_index.llms.google_genai import GoogleGenAI
 from pydantic import BaseModel, Field
 
+from agents.llama_index_file_chat.documents import (
+    DocumentCache,
+    DocumentParser,
+    LlamaParseParser,
+)
+
 
 ## Workflow Events
 
@@ -76,17 +81,33 @@ class ParseAndChat(Workflow):
         self,
         timeout: float | None = None,
         verbose: bool = False,
+        parser: DocumentParser | None = None,
+        documents: DocumentCache | None = None,
+        llm: LLM | None = None,
+        retrieval_top_k: int | None = None,
+        retrieval_min_lines: int = 400,
         **workflow_kwargs: Any,
     ):
+        """Chat about an attached document.
+
+        By default the whole document goes into the system prompt. With
+        `retrieval_top_k` set, documents of at least `retrieval_min_lines`
+        lines are searched with BM25 for each message instead, and only the
+        best `retrieval_top_k` chunks are sent, with their line numbers.
+        """
         super().__init__(timeout=timeout, verbose=verbose, **workflow_kwargs)
-        self._sllm = GoogleGenAI(
+        llm = llm or GoogleGenAI(
             model='gemini-2.0-flash', api_key=os.getenv('GOOGLE_API_KEY')
-        ).as_structured_llm(ChatResponse)
-        self._parser = LlamaParse(api_key=os.getenv('LLAMA_CLOUD_API_KEY'))
+        )
+        self._sllm = llm.as_structured_llm(ChatResponse)
+        self._retrieval_top_k = retrieval_top_k
+        self._retrieval_min_lines = retrieval_min_lines
+        self._parser = parser or LlamaParseParser()
+        self._documents = documents or DocumentCache()
         self._system_prompt_template = """\
 You are a helpful assistant that can answer questions about a document, provide citations, and engage in a conversation.
 
-Here is the document with line numbers:
+Here is {document_description}:
 <document_text>
 {document_text}
 </document_text>
@@ -111,24 +132,13 @@ When citing content from the document:
     @step
     async def parse(self, ctx: Context, ev: ParseEvent) -> ChatEvent:
         ctx.write_event_to_stream(LogEvent(msg='Parsing document...'))
-        results = await self._parser.aparse(
-            base64.b64decode(ev.attachment),
-            extra_info={'file_name': ev.file_name},
+        document = await self._documents.parse(
+            self._parser, base64.b64decode(ev.attachment), ev.file_name
         )
         ctx.write_event_to_stream(LogEvent(msg='Document parsed successfully.'))
 
-        documents = await results.aget_markdown_documents(split_by_page=False)
-
-        # since we only have one document and are not splitting by page, we can just use the first one
-        document = documents[0]
-
-        # split the document into lines and add line numbers
-        # this will be used for citations
-        document_text = ''
-        for idx, line in enumerate(document.text.split('\n')):
-            document_text += f"<line idx='{idx}'>{line}</line>\n"
-
-        await ctx.set('document_text', document_text)
+        # the session only keeps the id, the document is stored once
+        await ctx.set('document_id', document.id)
         return ChatEvent(msg=ev.msg)
 
     @step
@@ -141,16 +151,38 @@ When citing content from the document:
             )
         )
 
-        document_text = await ctx.get('document_text', default='')
-        if document_text:
+        document_id = await ctx.get('document_id', default=None)
+        document = self._documents.get(document_id) if document_id else None
+        if document_id and not document:
+            ctx.write_event_to_stream(
+                LogEvent(
+                    msg='The document is no longer cached, please attach it again.'
+                )
+            )
+        if document:
             ctx.write_event_to_stream(
                 LogEvent(msg='Inserting system prompt...')
             )
+            if (
+                self._retrieval_top_k
+                and len(document.lines) >= self._retrieval_min_lines
+            ):
+                document_description = (
+                    'the parts of the document most relevant to the latest '
+                    'message, with line numbers'
+                )
+                document_text = document.excerpts(
+                    event.msg, self._retrieval_top_k
+                )
+            else:
+                document_description = 'the document with line numbers'
+                document_text = document.text
             input_messages = [
                 ChatMessage(
                     role='system',
                     content=self._system_prompt_template.format(
-                        document_text=document_text
+                        document_description=document_description,
+                        document_text=document_text,
                     ),
                 ),
                 *current_messages,
@@ -169,30 +201,13 @@ When citing content from the document:
         )
         await ctx.set('messages', current_messages)
 
-        # parse out the citations from the document text
+        # look up the cited lines in the document
         citations = {}
-        if document_text:
+        if document:
             for citation in response_obj.citations:
-                line_numbers = citation.line_numbers
-                for line_number in line_numbers:
-                    start_idx = document_text.find(
-                        f"<line idx='{line_number}'>"
-                    )
-                    end_idx = document_text.find(
-                        f"<line idx='{line_number + 1}'>"
-                    )
-                    citation_text = (
-                        document_text[
-                            start_idx
-                            + len(f"<line idx='{line_number}'>") : end_idx
-                        ]
-                        .replace('</line>', '')
-                        .strip()
-                    )
-
-                    if citation.citation_number not in citations:
-                        citations[citation.citation_number] = []
-                    citations[citation.citation_number].append(citation_text)
+                citations.setdefault(citation.citation_number, []).extend(
+                    document.line(x) for x in citation.line_numbers
+                )
 
         return ChatResponseEvent(
             response=response_obj.response, citations=citations
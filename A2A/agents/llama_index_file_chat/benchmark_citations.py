@@ -0,0 +1,61 @@
+"""Benchmark of citation lookups on a large document.
+
+Compares finding each cited line in the line-numbered document text, as
+ParseAndChat.chat used to do, with looking it up in the lines of the parsed
+document.
+
+run:
+  cd A2A && uv run python -m agents.llama_index_file_chat.benchmark_citations
+"""
+
+import random
+import time
+
+from agents.llama_index_file_chat.documents import ParsedDocument
+
+
+LINES = 10_000
+CITATIONS = [100, 500]
+LINES_PER_CITATION = 3
+ROUNDS = 5
+
+
+def find_line(document_text: str, line_number: int) -> str:
+    start_idx = document_text.find(f"<line idx='{line_number}'>")
+    end_idx = document_text.find(f"<line idx='{line_number + 1}'>")
+    return (
+        document_text[start_idx + len(f"<line idx='{line_number}'>") : end_idx]
+        .replace('</line>', '')
+        .strip()
+    )
+
+
+def main():
+    markdown = '\n'.join(
+        f'Line {i} of the document, with some text to search through.'
+        for i in range(LINES)
+    )
+    document = ParsedDocument.from_markdown('benchmark', None, markdown)
+    # The numbered text the model sees, which the old lookup searched.
+    text = document.text
+    rng = random.Random(0)
+    print(f'{"lookup":>8} {"citations":>10} {"ms/response":>12}')
+    for n in CITATIONS:
+        cited = [rng.randrange(LINES) for _ in range(n * LINES_PER_CITATION)]
+        assert [find_line(text, x) for x in cited] == [
+            document.line(x) for x in cited
+        ]
+        for name, lookup in [
+            ('find', lambda x: find_line(text, x)),
+            ('index', document.line),
+        ]:
+            started = time.perf_counter()
+            for _ in range(ROUNDS):
+                for line_number in cited:
+                    lookup(line_number)
+            ms = (time.perf_counter() - started) / ROUNDS * 1000
+            print(f'{name:>8} {n:>10} {ms:>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
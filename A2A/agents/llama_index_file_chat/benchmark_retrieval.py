@@ -0,0 +1,150 @@
+"""Latency and prompt size of full document and retrieval chat modes.
+
+Runs ParseAndChat over a synthetic document with a stub parser and a stub
+LLM whose latency grows with the prompt, like a real model's prefill. The
+stub cites the first line in its prompt mentioning the topic asked about,
+to check that citations still resolve to the right lines when only
+excerpts are sent.
+
+run:
+  cd A2A && uv run python -m agents.llama_index_file_chat.benchmark_retrieval
+"""
+
+import asyncio
+import base64
+import json
+import re
+import time
+
+from typing import Any
+
+from llama_index.core.llms import (
+    CompletionResponse,
+    CompletionResponseGen,
+    CustomLLM,
+    LLMMetadata,
+)
+from llama_index.core.workflow import Context
+
+from agents.llama_index_file_chat.agent import (
+    ChatResponseEvent,
+    InputEvent,
+    ParseAndChat,
+)
+
+
+LINE_COUNTS = [200, 2_000, 10_000]
+TOPICS = ['attention', 'encoder', 'decoder', 'dropout', 'optimizer']
+TURNS = 5
+TOP_K = 8
+BASE_LATENCY_SECONDS = 0.02
+LATENCY_PER_1K_TOKENS = 0.01
+
+
+class StubParser:
+    def __init__(self, markdown: str):
+        self._markdown = markdown
+
+    async def parse(self, data: bytes, file_name: str | None) -> str:
+        return self._markdown
+
+
+class StubLLM(CustomLLM):
+    topic: str = ''
+    prompt_chars: list[int] = []
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name='stub')
+
+    def complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        time.sleep(self._latency(prompt))
+        return self._response(prompt)
+
+    async def acomplete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        await asyncio.sleep(self._latency(prompt))
+        return self._response(prompt)
+
+    def stream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseGen:
+        raise NotImplementedError
+
+    def _latency(self, prompt: str) -> float:
+        self.prompt_chars.append(len(prompt))
+        tokens = len(prompt) / 4
+        return BASE_LATENCY_SECONDS + tokens / 1000 * LATENCY_PER_1K_TOKENS
+
+    def _response(self, prompt: str) -> CompletionResponse:
+        match = re.search(rf"<line idx='(\d+)'>[^<]*\b{self.topic}\b", prompt)
+        citations = (
+            [{'citation_number': 1, 'line_numbers': [int(match.group(1))]}]
+            if match
+            else []
+        )
+        return CompletionResponse(
+            text=json.dumps(
+                {'response': f'About {self.topic} [1].', 'citations': citations}
+            )
+        )
+
+
+def make_document(lines: int) -> str:
+    return '\n'.join(
+        f'Section {i}: notes on the {TOPICS[i * 7 % len(TOPICS)]} of model '
+        f'variant {i}, with results {i * 31 % 97} and remarks.'
+        if i % 50 == 0
+        else f'Line {i} describes experiment {i % 13} in general terms.'
+        for i in range(lines)
+    )
+
+
+async def run(lines: int, retrieval_top_k: int | None) -> tuple[float, float]:
+    """Average seconds and prompt characters per turn, checking citations."""
+    llm = StubLLM()
+    agent = ParseAndChat(
+        timeout=None,
+        parser=StubParser(make_document(lines)),
+        llm=llm,
+        retrieval_top_k=retrieval_top_k,
+        retrieval_min_lines=0,
+    )
+    ctx = Context(agent)
+    attachment = base64.b64encode(f'document {lines}'.encode()).decode()
+    started = time.perf_counter()
+    for turn in range(TURNS):
+        llm.topic = TOPICS[turn % len(TOPICS)]
+        response: ChatResponseEvent = await agent.run(
+            start_event=InputEvent(
+                msg=f'What do the notes say about the {llm.topic}?',
+                attachment=attachment if turn == 0 else None,
+                file_name='document.md',
+            ),
+            ctx=ctx,
+        )
+        for texts in response.citations.values():
+            assert all(llm.topic in x for x in texts), texts
+    seconds = (time.perf_counter() - started) / TURNS
+    return seconds, sum(llm.prompt_chars) / len(llm.prompt_chars)
+
+
+async def main():
+    print(
+        f'{"lines":>7} {"mode":>10} {"ms/turn":>9} {"prompt chars":>13} '
+        f'{"~tokens":>8}'
+    )
+    for lines in LINE_COUNTS:
+        for mode, top_k in [('full', None), ('retrieval', TOP_K)]:
+            seconds, chars = await run(lines, top_k)
+            print(
+                f'{lines:>7} {mode:>10} {seconds * 1000:>9.1f} '
+                f'{chars:>13.0f} {chars / 4:>8.0f}'
+            )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
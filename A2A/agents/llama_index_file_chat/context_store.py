@@ -0,0 +1,203 @@
+import abc
+import collections
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import time
+import zlib
+
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class ContextStoreMetrics:
+    hits: int = 0
+    misses: int = 0
+    resident_sessions: int = 0
+    resident_bytes: int = 0
+    spilled_sessions: int = 0
+    spilled_bytes: int = 0
+    evicted: int = 0
+    expired: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ContextStore(abc.ABC):
+    """Stores the serialized workflow context of each session."""
+
+    @abc.abstractmethod
+    def get(self, session_id: str) -> dict[str, Any] | None:
+        """The saved context state of a session, None if there is none."""
+
+    @abc.abstractmethod
+    def put(self, session_id: str, state: dict[str, Any]):
+        pass
+
+    @abc.abstractmethod
+    def delete(self, session_id: str):
+        pass
+
+    @abc.abstractmethod
+    def metrics(self) -> ContextStoreMetrics:
+        pass
+
+
+@dataclasses.dataclass
+class _Spilled:
+    path: str
+    size: int
+    accessed_at: float
+
+
+class InMemoryContextStore(ContextStore):
+    """Keeps context states in memory, bounded by count, bytes and age.
+
+    States are kept as JSON and only decoded when a session resumes. Once
+    there are more than `max_sessions` states or they take more than
+    `max_bytes`, the least recently used ones are evicted, to `spill_dir`
+    compressed if it is set, from where they are loaded back on their next
+    use. Spilled states are bounded by `max_spill_bytes` compressed. States
+    not used for `ttl` seconds expire, in memory and on disk alike.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: float = 24 * 60 * 60,
+        spill_dir: str | None = None,
+        max_spill_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self._max_sessions = max_sessions
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._spill_dir = spill_dir
+        self._max_spill_bytes = max_spill_bytes
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        # Session id to its JSON encoded state and last use, least recently
+        # used first.
+        self._states: collections.OrderedDict[str, tuple[bytes, float]] = (
+            collections.OrderedDict()
+        )
+        self._spilled: collections.OrderedDict[str, _Spilled] = (
+            collections.OrderedDict()
+        )
+        self._metrics = ContextStoreMetrics()
+
+    def get(self, session_id: str) -> dict[str, Any] | None:
+        now = time.monotonic()
+        self._expire(now)
+        if session_id in self._states:
+            data, _ = self._states.pop(session_id)
+        elif session_id in self._spilled:
+            spilled = self._spilled.pop(session_id)
+            self._metrics.spilled_bytes -= spilled.size
+            try:
+                with open(spilled.path, 'rb') as f:
+                    data = zlib.decompress(f.read())
+            except (OSError, zlib.error) as e:
+                logger.warning(f'Failed to load context of {session_id}: {e}')
+                self._metrics.misses += 1
+                return None
+            finally:
+                _remove(spilled.path)
+            self._metrics.resident_bytes += len(data)
+        else:
+            self._metrics.misses += 1
+            return None
+        self._metrics.hits += 1
+        self._states[session_id] = (data, now)
+        self._evict()
+        return json.loads(data)
+
+    def put(self, session_id: str, state: dict[str, Any]):
+        self.delete(session_id)
+        data = json.dumps(state).encode()
+        self._states[session_id] = (data, time.monotonic())
+        self._metrics.resident_bytes += len(data)
+        self._evict()
+
+    def delete(self, session_id: str):
+        if session_id in self._states:
+            data, _ = self._states.pop(session_id)
+            self._metrics.resident_bytes -= len(data)
+        if session_id in self._spilled:
+            self._drop_spilled(session_id)
+
+    def metrics(self) -> ContextStoreMetrics:
+        self._expire(time.monotonic())
+        return dataclasses.replace(
+            self._metrics,
+            resident_sessions=len(self._states),
+            spilled_sessions=len(self._spilled),
+        )
+
+    def _evict(self):
+        while self._states and (
+            len(self._states) > self._max_sessions
+            or self._metrics.resident_bytes > self._max_bytes
+        ):
+            session_id, (data, accessed_at) = self._states.popitem(last=False)
+            self._metrics.resident_bytes -= len(data)
+            if not self._spill(session_id, data, accessed_at):
+                self._metrics.evicted += 1
+        while self._metrics.spilled_bytes > self._max_spill_bytes:
+            self._drop_spilled(next(iter(self._spilled)))
+            self._metrics.evicted += 1
+
+    def _spill(self, session_id: str, data: bytes, accessed_at: float) -> bool:
+        if not self._spill_dir:
+            return False
+        name = hashlib.sha256(session_id.encode()).hexdigest()
+        path = os.path.join(self._spill_dir, f'{name}.json.z')
+        compressed = zlib.compress(data)
+        try:
+            with open(path, 'wb') as f:
+                f.write(compressed)
+        except OSError as e:
+            logger.warning(f'Failed to spill context of {session_id}: {e}')
+            return False
+        self._spilled[session_id] = _Spilled(
+            path=path, size=len(compressed), accessed_at=accessed_at
+        )
+        self._metrics.spilled_bytes += len(compressed)
+        return True
+
+    def _drop_spilled(self, session_id: str):
+        spilled = self._spilled.pop(session_id)
+        self._metrics.spilled_bytes -= spilled.size
+        _remove(spilled.path)
+
+    def _expire(self, now: float):
+        deadline = now - self._ttl
+        # Both are ordered by last use, as states are spilled in LRU order.
+        while self._spilled:
+            session_id, spilled = next(iter(self._spilled.items()))
+            if spilled.accessed_at > deadline:
+                break
+            self._drop_spilled(session_id)
+            self._metrics.expired += 1
+        while self._states:
+            session_id, (data, accessed_at) = next(iter(self._states.items()))
+            if accessed_at > deadline:
+                break
+            del self._states[session_id]
+            self._metrics.resident_bytes -= len(data)
+            self._metrics.expired += 1
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
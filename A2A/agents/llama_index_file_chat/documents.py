@@ -0,0 +1,213 @@
+import collections
+import dataclasses
+import hashlib
+import logging
+import os
+import tempfile
+import zlib
+
+from typing import Protocol
+
+from llama_cloud_services.parse import LlamaParse
+
+from agents.retrieval import BM25Index, merge_ranges
+
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentParser(Protocol):
+    async def parse(self, data: bytes, file_name: str | None) -> str:
+        """Parse a file into markdown."""
+        ...
+
+
+class LlamaParseParser:
+    """Parses files with LlamaParse."""
+
+    def __init__(self, api_key: str | None = None):
+        self._parser = LlamaParse(
+            api_key=api_key or os.getenv('LLAMA_CLOUD_API_KEY')
+        )
+
+    async def parse(self, data: bytes, file_name: str | None) -> str:
+        results = await self._parser.aparse(
+            data, extra_info={'file_name': file_name}
+        )
+        documents = await results.aget_markdown_documents(split_by_page=False)
+        # since we only have one document and are not splitting by page, we can just use the first one
+        return documents[0].text
+
+
+@dataclasses.dataclass
+class ParsedDocument:
+    id: str
+    file_name: str | None
+    # The lines by line number, to look up cited lines without a search.
+    lines: list[str]
+    # Built on the first retrieval, then shared by every session.
+    index: BM25Index | None = dataclasses.field(default=None, repr=False)
+
+    @classmethod
+    def from_markdown(
+        cls, id: str, file_name: str | None, markdown: str
+    ) -> 'ParsedDocument':
+        return cls(id=id, file_name=file_name, lines=markdown.split('\n'))
+
+    @property
+    def markdown(self) -> str:
+        return '\n'.join(self.lines)
+
+    @property
+    def text(self) -> str:
+        """The document with line numbers, used for citations."""
+        return _numbered(self.lines, range(len(self.lines)))
+
+    @property
+    def size(self) -> int:
+        return sum(len(x) for x in self.lines)
+
+    def line(self, line_number: int) -> str:
+        """The text of a line, empty if there is no such line."""
+        if 0 <= line_number < len(self.lines):
+            return self.lines[line_number].strip()
+        return ''
+
+    def excerpts(self, query: str, top_k: int) -> str:
+        """The lines most relevant to the query, with their line numbers."""
+        if self.index is None:
+            self.index = BM25Index(self.lines)
+        # without any match, the opening of the document is the best guess
+        ranges = merge_ranges(
+            self.index.search(query, top_k) or self.index.chunks[:top_k]
+        )
+        return '...\n'.join(
+            _numbered(self.lines, range(start, end)) for start, end in ranges
+        )
+
+
+def _numbered(lines: list[str], indexes: range) -> str:
+    return ''.join(
+        f"<line idx='{idx}'>{lines[idx]}</line>\n" for idx in indexes
+    )
+
+
+@dataclasses.dataclass
+class _Spilled:
+    path: str
+    file_name: str | None
+    size: int
+
+
+class DocumentCache:
+    """Parsed documents keyed by the hash of the file content.
+
+    Sessions only keep the id of their document, so a file is parsed once
+    and stored once however many sessions attach it. The least recently used
+    documents are evicted once they take more than `max_bytes`, to
+    `spill_dir` compressed, a temporary directory unless set, from where they
+    are loaded back when a session next uses them. Spilled documents are
+    bounded by `max_spill_bytes` compressed, past which the least recently
+    used are dropped and have to be attached again.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 512 * 1024 * 1024,
+        spill_dir: str | None = None,
+        max_spill_bytes: int = 4 * 1024 * 1024 * 1024,
+    ):
+        self._max_bytes = max_bytes
+        self._spill_dir = spill_dir
+        self._max_spill_bytes = max_spill_bytes
+        self._documents: collections.OrderedDict[str, ParsedDocument] = (
+            collections.OrderedDict()
+        )
+        self._spilled: collections.OrderedDict[str, _Spilled] = (
+            collections.OrderedDict()
+        )
+        self._bytes = 0
+        self._spilled_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def document_id(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    async def parse(
+        self, parser: DocumentParser, data: bytes, file_name: str | None
+    ) -> ParsedDocument:
+        """The parsed document of a file, parsed only if it is not cached."""
+        document_id = self.document_id(data)
+        document = self.get(document_id)
+        if document:
+            self.hits += 1
+            return document
+        self.misses += 1
+        markdown = await parser.parse(data, file_name)
+        document = ParsedDocument.from_markdown(
+            document_id, file_name, markdown
+        )
+        self._add(document)
+        return document
+
+    def get(self, document_id: str) -> ParsedDocument | None:
+        document = self._documents.get(document_id)
+        if document:
+            self._documents.move_to_end(document_id)
+        elif document_id in self._spilled:
+            document = self._load(document_id)
+            if document:
+                self._add(document)
+        return document
+
+    def _add(self, document: ParsedDocument):
+        if document.id in self._documents:
+            return
+        self._documents[document.id] = document
+        self._bytes += document.size
+        while self._bytes > self._max_bytes and len(self._documents) > 1:
+            _, evicted = self._documents.popitem(last=False)
+            self._bytes -= evicted.size
+            self._spill(evicted)
+        while self._spilled_bytes > self._max_spill_bytes:
+            self._drop_spilled(next(iter(self._spilled)))
+
+    def _spill(self, document: ParsedDocument):
+        if not self._spill_dir:
+            self._spill_dir = tempfile.mkdtemp(prefix='parsed-documents-')
+        path = os.path.join(self._spill_dir, f'{document.id}.md.z')
+        compressed = zlib.compress(document.markdown.encode())
+        try:
+            with open(path, 'wb') as f:
+                f.write(compressed)
+        except OSError as e:
+            logger.warning(f'Failed to spill document {document.id}: {e}')
+            return
+        self._spilled[document.id] = _Spilled(
+            path=path, file_name=document.file_name, size=len(compressed)
+        )
+        self._spilled_bytes += len(compressed)
+
+    def _load(self, document_id: str) -> ParsedDocument | None:
+        spilled = self._spilled[document_id]
+        try:
+            with open(spilled.path, 'rb') as f:
+                markdown = zlib.decompress(f.read()).decode()
+        except (OSError, zlib.error) as e:
+            logger.warning(f'Failed to load document {document_id}: {e}')
+            return None
+        finally:
+            self._drop_spilled(document_id)
+        return ParsedDocument.from_markdown(
+            document_id, spilled.file_name, markdown
+        )
+
+    def _drop_spilled(self, document_id: str):
+        spilled = self._spilled.pop(document_id)
+        self._spilled_bytes -= spilled.size
+        try:
+            os.remove(spilled.path)
+        except FileNotFoundError:
+            pass
@@ -3,7 +3,6 @@ import logging
 import traceback
 
 from collections.abc import AsyncIterable
-from typing import Any
 
 from agents.llama_index_file_chat.agent import (
     ChatResponseEvent,
@@ -11,6 +10,10 @@ from agents.llama_index_file_chat.agent import (
     LogEvent,
     ParseAndChat,
 )
+from agents.llama_index_file_chat.context_store import (
+    ContextStore,
+    InMemoryContextStore,
+)
 from common.server import utils
 from common.server.task_manager import InMemoryTaskManager
 from common.types import (
@@ -56,13 +59,13 @@ class LlamaIndexTaskManager(InMemoryTaskManager):
         self,
         agent: ParseAndChat,
         notification_sender_auth: PushNotificationSenderAuth,
+        ctx_states: ContextStore | None = None,
     ):
         super().__init__()
         self.agent = agent
         self.notification_sender_auth = notification_sender_auth
-        # Store context state by session ID
-        # Ideally, you would use a database or other kv store the context state
-        self.ctx_states: dict[str, dict[str, Any]] = {}
+        # Store context state by session ID, bounded and evicted by the store
+        self.ctx_states = ctx_states or InMemoryContextStore()
 
     async def _run_streaming_agent(self, request: SendTaskStreamingRequest):
         task_send_params: TaskSendParams = request.params
@@ -75,9 +78,13 @@ class LlamaIndexTaskManager(InMemoryTaskManager):
             handler = None
 
             # Check if we have a saved context state for this session
-            print(f'Len of tasks: {len(self.tasks)}', flush=True)
-            print(f'Len of ctx_states: {len(self.ctx_states)}', flush=True)
-            saved_ctx_state = self.ctx_states.get(session_id, None)
+            logger.info(f'Len of tasks: {len(self.tasks)}')
+            ctx_metrics = self.ctx_states.metrics()
+            logger.info(
+                f'Context store: {ctx_metrics}, '
+                f'hit rate {ctx_metrics.hit_rate:.0%}'
+            )
+            saved_ctx_state = self.ctx_states.get(session_id)
 
             if saved_ctx_state is not None:
                 # Resume with existing context
@@ -132,7 +139,7 @@ class LlamaIndexTaskManager(InMemoryTaskManager):
                     metadata = {str(k): v for k, v in metadata.items()}
 
                 # save the context state to resume the current session
-                self.ctx_states[session_id] = handler.ctx.to_dict()
+                self.ctx_states.put(session_id, handler.ctx.to_dict())
 
                 artifact = Artifact(
                     parts=parts, index=0, append=False, metadata=metadata
@@ -170,8 +177,7 @@ class LlamaIndexTaskManager(InMemoryTaskManager):
             )
 
             # Clean up context in case of error
-            if session_id in self.ctx_states:
-                del self.ctx_states[session_id]
+            self.ctx_states.delete(session_id)
 
     def _validate_request(
         self, request: SendTaskRequest | SendTaskStreamingRequest
@@ -235,7 +241,7 @@ class LlamaIndexTaskManager(InMemoryTaskManager):
         try:
             # Check if we have a saved context for this session
             ctx = None
-            saved_ctx_state = self.ctx_states.get(session_id, None)
+            saved_ctx_state = self.ctx_states.get(session_id)
 
             if saved_ctx_state:
                 # Resume existing conversation
@@ -284,8 +290,7 @@ class LlamaIndexTaskManager(InMemoryTaskManager):
             logger.error(traceback.format_exc())
 
             # Clean up context in case of error
-            if session_id in self.ctx_states:
-                del self.ctx_states[session_id]
+            self.ctx_states.delete(session_id)
 
             # Return error response
             parts = [{'type': 'text', 'text': f'Error: {e!s}'}]
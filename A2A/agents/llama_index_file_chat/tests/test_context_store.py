@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from agents.llama_index_file_chat.context_store import InMemoryContextStore
+
+
+class InMemoryContextStoreTest(unittest.TestCase):
+    """Tests for the bounded InMemoryContextStore."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.now = 1000.0
+        patcher = mock.patch(
+            'agents.llama_index_file_chat.context_store.time.monotonic',
+            lambda: self.now,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_get_returns_a_copy_of_the_state(self) -> None:
+        """Test states are returned decoded and missing ones as None."""
+        store = InMemoryContextStore()
+        state = {'document_id': 'd1'}
+        store.put('s1', state)
+        state['document_id'] = 'd2'
+        self.assertEqual(store.get('s1'), {'document_id': 'd1'})
+        self.assertIsNone(store.get('s2'))
+        metrics = store.metrics()
+        self.assertEqual((metrics.hits, metrics.misses), (1, 1))
+        self.assertEqual(metrics.hit_rate, 0.5)
+
+    def test_least_recently_used_session_is_evicted(self) -> None:
+        """Test sessions beyond max_sessions are evicted in LRU order."""
+        store = InMemoryContextStore(max_sessions=2)
+        store.put('s1', {'n': 1})
+        store.put('s2', {'n': 2})
+        store.get('s1')
+        store.put('s3', {'n': 3})
+        self.assertIsNone(store.get('s2'))
+        self.assertEqual(store.get('s1'), {'n': 1})
+        self.assertEqual(store.get('s3'), {'n': 3})
+        self.assertEqual(store.metrics().evicted, 1)
+
+    def test_states_are_bounded_by_bytes(self) -> None:
+        """Test states are evicted once they take more than max_bytes."""
+        store = InMemoryContextStore(max_bytes=100)
+        store.put('s1', {'text': 'a' * 60})
+        store.put('s2', {'text': 'b' * 60})
+        metrics = store.metrics()
+        self.assertEqual(metrics.resident_sessions, 1)
+        self.assertLessEqual(metrics.resident_bytes, 100)
+        self.assertIsNone(store.get('s1'))
+
+    def test_evicted_state_is_spilled_and_loaded_back(self) -> None:
+        """Test evicted states are spilled to disk and loaded on next use."""
+        store = InMemoryContextStore(max_sessions=1, spill_dir=self.tmp.name)
+        store.put('s1', {'n': 1})
+        store.put('s2', {'n': 2})
+        metrics = store.metrics()
+        self.assertEqual(metrics.spilled_sessions, 1)
+        self.assertEqual(len(os.listdir(self.tmp.name)), 1)
+        self.assertEqual(store.get('s1'), {'n': 1})
+        self.assertEqual(store.metrics().evicted, 0)
+        # Loading s1 spilled s2 in its place.
+        self.assertEqual(len(os.listdir(self.tmp.name)), 1)
+        self.assertEqual(store.get('s2'), {'n': 2})
+
+    def test_spilled_states_are_bounded(self) -> None:
+        """Test spilled states beyond max_spill_bytes are dropped."""
+        store = InMemoryContextStore(
+            max_sessions=1, spill_dir=self.tmp.name, max_spill_bytes=1
+        )
+        store.put('s1', {'n': 1})
+        store.put('s2', {'n': 2})
+        self.assertEqual(store.metrics().spilled_sessions, 0)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+        self.assertIsNone(store.get('s1'))
+
+    def test_unreadable_spill_is_a_miss(self) -> None:
+        """Test a spilled state whose file is gone is treated as missing."""
+        store = InMemoryContextStore(max_sessions=1, spill_dir=self.tmp.name)
+        store.put('s1', {'n': 1})
+        store.put('s2', {'n': 2})
+        for name in os.listdir(self.tmp.name):
+            os.remove(os.path.join(self.tmp.name, name))
+        self.assertIsNone(store.get('s1'))
+        self.assertEqual(store.metrics().spilled_bytes, 0)
+
+    def test_states_expire_after_ttl(self) -> None:
+        """Test states not used for ttl seconds expire in memory and disk."""
+        store = InMemoryContextStore(
+            max_sessions=1, ttl=60, spill_dir=self.tmp.name
+        )
+        store.put('s1', {'n': 1})
+        store.put('s2', {'n': 2})
+        self.now += 30
+        store.get('s2')
+        self.now += 45
+        metrics = store.metrics()
+        self.assertEqual(metrics.expired, 1)
+        self.assertEqual(metrics.spilled_sessions, 0)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+        self.assertEqual(store.get('s2'), {'n': 2})
+
+    def test_delete_removes_resident_and_spilled_states(self) -> None:
+        """Test delete forgets a session wherever it is kept."""
+        store = InMemoryContextStore(max_sessions=1, spill_dir=self.tmp.name)
+        store.put('s1', {'n': 1})
+        store.put('s2', {'n': 2})
+        store.delete('s1')
+        store.delete('s2')
+        metrics = store.metrics()
+        self.assertEqual(metrics.resident_bytes, 0)
+        self.assertEqual(metrics.spilled_bytes, 0)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
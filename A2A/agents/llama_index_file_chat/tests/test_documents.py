@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+
+from agents.llama_index_file_chat.documents import DocumentCache, ParsedDocument
+
+
+class FakeParser:
+    """Returns the file content as markdown, counting the calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def parse(self, data: bytes, file_name: str | None) -> str:
+        self.calls += 1
+        return data.decode()
+
+
+class ParsedDocumentTest(unittest.TestCase):
+    """Tests for ParsedDocument."""
+
+    def test_text_is_numbered_by_line(self) -> None:
+        """Test the text numbers every line from zero."""
+        document = ParsedDocument.from_markdown('d1', None, 'a\nb')
+        self.assertEqual(
+            document.text, "<line idx='0'>a</line>\n<line idx='1'>b</line>\n"
+        )
+        self.assertEqual(document.markdown, 'a\nb')
+        self.assertEqual(document.size, 2)
+
+    def test_line_looks_up_by_index(self) -> None:
+        """Test lines are looked up by number and missing ones are empty."""
+        document = ParsedDocument.from_markdown('d1', None, ' a \nb')
+        self.assertEqual(document.line(0), 'a')
+        self.assertEqual(document.line(2), '')
+        self.assertEqual(document.line(-1), '')
+
+    def test_excerpts_number_the_matching_lines(self) -> None:
+        """Test excerpts keep the line numbers of the matching lines."""
+        lines = [f'filler line {i}' for i in range(100)]
+        lines[70] = 'the transformer architecture'
+        document = ParsedDocument.from_markdown('d1', None, '\n'.join(lines))
+        excerpts = document.excerpts('transformer', 1)
+        self.assertIn(
+            "<line idx='70'>the transformer architecture</line>", excerpts
+        )
+        self.assertNotIn("<line idx='0'>", excerpts)
+        self.assertIs(document.index, document.index)
+
+
+class DocumentCacheTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for the content addressed DocumentCache."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.parser = FakeParser()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    async def test_same_content_is_parsed_once(self) -> None:
+        """Test a file is parsed once whatever its name."""
+        cache = DocumentCache()
+        first = await cache.parse(self.parser, b'a\nb', 'a.md')
+        second = await cache.parse(self.parser, b'a\nb', 'b.md')
+        self.assertIs(first, second)
+        self.assertEqual(self.parser.calls, 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(first.id, DocumentCache.document_id(b'a\nb'))
+
+    async def test_evicted_document_is_loaded_back(self) -> None:
+        """Test evicted documents are spilled and loaded without parsing."""
+        cache = DocumentCache(max_bytes=5, spill_dir=self.tmp.name)
+        first = await cache.parse(self.parser, b'first', 'a.md')
+        await cache.parse(self.parser, b'second', 'b.md')
+        self.assertEqual(len(os.listdir(self.tmp.name)), 1)
+        document = cache.get(first.id)
+        self.assertEqual(document.lines, ['first'])
+        self.assertEqual(document.file_name, 'a.md')
+        self.assertEqual(self.parser.calls, 2)
+        # Loading the first document spilled the second in its place.
+        self.assertEqual(len(os.listdir(self.tmp.name)), 1)
+
+    async def test_spill_defaults_to_a_temporary_directory(self) -> None:
+        """Test documents are spilled without a spill_dir too."""
+        cache = DocumentCache(max_bytes=5)
+        first = await cache.parse(self.parser, b'first', None)
+        await cache.parse(self.parser, b'second', None)
+        self.assertEqual(cache.get(first.id).lines, ['first'])
+
+    async def test_spilled_documents_are_bounded(self) -> None:
+        """Test spilled documents past max_spill_bytes are dropped."""
+        cache = DocumentCache(
+            max_bytes=5, spill_dir=self.tmp.name, max_spill_bytes=1
+        )
+        first = await cache.parse(self.parser, b'first', None)
+        await cache.parse(self.parser, b'second', None)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+        self.assertIsNone(cache.get(first.id))
+
+    async def test_unreadable_spill_is_a_miss(self) -> None:
+        """Test a spilled document whose file is gone is missing."""
+        cache = DocumentCache(max_bytes=5, spill_dir=self.tmp.name)
+        first = await cache.parse(self.parser, b'first', None)
+        await cache.parse(self.parser, b'second', None)
+        for name in os.listdir(self.tmp.name):
+            os.remove(os.path.join(self.tmp.name, name))
+        self.assertIsNone(cache.get(first.id))
+        self.assertIsNone(cache.get(first.id))
+
+
+if __name__ == '__main__':
+    unittest.main()
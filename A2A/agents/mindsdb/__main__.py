@@ -3,6 +3,7 @@ import logging
 import click
 
 from agent import MindsDBAgent
+from agents.lifespan import close_on_shutdown
 from common.server import A2AServer
 from common.types import (
     AgentCapabilities,
@@ -20,7 +21,17 @@ logger = logging.getLogger(__name__)
 @click.command()
 @click.option('--host', default='localhost')
 @click.option('--port', default=10006)
-def main(host, port):
+@click.option(
+    '--flush-ms',
+    default=50,
+    help='Longest time the answer is buffered before it is streamed.',
+)
+@click.option(
+    '--flush-chars',
+    default=512,
+    help='Characters of the answer buffered before they are streamed.',
+)
+def main(host, port, flush_ms, flush_chars):
     try:
         capabilities = AgentCapabilities(streaming=True)
         skill = AgentSkill(
@@ -43,12 +54,19 @@ def main(host, port):
             capabilities=capabilities,
             skills=[skill],
         )
+        agent = MindsDBAgent()
         server = A2AServer(
             agent_card=agent_card,
-            task_manager=AgentTaskManager(agent=MindsDBAgent()),
+            task_manager=AgentTaskManager(
+                agent=agent,
+                flush_interval=flush_ms / 1000,
+                flush_chars=flush_chars,
+            ),
             host=host,
             port=port,
         )
+        # The HTTP session of the agent is shared by the requests.
+        close_on_shutdown(server.app, agent.close)
         server.start()
     except MissingAPIKeyError as e:
         logger.error(f'Error: {e}')
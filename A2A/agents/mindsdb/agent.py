@@ -34,6 +34,14 @@ class MindsDBAgent:
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {self.api_key}',
         }
+        # Shared by all requests so their connections are kept alive and
+        # reused, created on first use as it needs the running event loop.
+        self._session: aiohttp.ClientSession | None = None
+
+    async def close(self):
+        if self._session:
+            await self._session.close()
+            self._session = None
 
     def invoke(self, query, session_id) -> str:
         return {'content': 'Use stream method to get the results!'}
@@ -48,58 +56,59 @@ class MindsDBAgent:
             'stream': True,
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.API_URL, headers=self.headers, json=payload
-            ) as response:
-                async for line in response.content:
-                    if line:
-                        # Skip empty lines
-                        line = line.decode('utf-8').strip()
-                        if not line or not line.startswith('data: '):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        async with self._session.post(
+            self.API_URL, headers=self.headers, json=payload
+        ) as response:
+            async for line in response.content:
+                if line:
+                    # Skip empty lines
+                    line = line.decode('utf-8').strip()
+                    if not line or not line.startswith('data: '):
+                        continue
+
+                    # Parse the JSON data
+                    json_str = line[6:]  # Remove "data: " prefix
+                    try:
+                        data = json.loads(json_str)
+                    except json.JSONDecodeError:
+                        continue
+                    if 'choices' in data:
+                        choice = data['choices'][0]
+                        delta = choice.get('delta', {})
+                        content = delta.get('content')
+                        role = delta.get('role', '')
+                        parts = [{'type': 'text', 'text': content or ''}]
+                        if choice.get('finish_reason') == 'stop':
+                            yield {'is_task_complete': True, 'parts': parts}
                             continue
 
-                        # Parse the JSON data
-                        json_str = line[6:]  # Remove "data: " prefix
-                        try:
-                            data = json.loads(json_str)
-                        except json.JSONDecodeError:
-                            continue
-                        if 'choices' in data:
-                            choice = data['choices'][0]
-                            delta = choice.get('delta', {})
-                            content = delta.get('content')
-                            role = delta.get('role', '')
-                            parts = [{'type': 'text', 'text': content}]
-                            if choice.get('finish_reason') == 'stop':
-                                yield {'is_task_complete': True, 'parts': parts}
-                                continue
-
-                            subtype = 'analysis'
-                            tool_calls = delta.get('tool_calls', [])
-
-                            if role == 'assistant':
-                                subtype = 'acknowledge'
-
-                            if tool_calls:
-                                tool_call = tool_calls[0]
-                                function = tool_call.get('function', {})
-                                function_name = str(function.get('name'))
-                                arguments = function.get('arguments', {})
-
-                                if function_name == 'sql_db_query':
-                                    subtype = 'execute_query'
-
-                                    parts.append(
-                                        {'type': 'text', 'text': str(arguments)}
-                                    )
-
-                            yield {
-                                'is_task_complete': False,
-                                'parts': parts,
-                                'metadata': {
-                                    'type': 'reasoning',
-                                    'subtype': subtype,
-                                },
-                            }
-                            continue
+                        subtype = 'analysis'
+                        tool_calls = delta.get('tool_calls', [])
+
+                        if role == 'assistant':
+                            subtype = 'acknowledge'
+
+                        if tool_calls:
+                            tool_call = tool_calls[0]
+                            function = tool_call.get('function', {})
+                            function_name = str(function.get('name'))
+                            arguments = function.get('arguments', {})
+
+                            if function_name == 'sql_db_query':
+                                subtype = 'execute_query'
+
+                                parts.append(
+                                    {'type': 'text', 'text': str(arguments)}
+                                )
+
+                        yield {
+                            'is_task_complete': False,
+                            'parts': parts,
+                            'metadata': {
+                                'type': 'reasoning',
+                                'subtype': subtype,
+                            },
+                        }
+                        continue
@@ -1,6 +1,8 @@
+import asyncio
 import logging
 
 from collections.abc import AsyncIterable
+from typing import Any
 
 from agent import MindsDBAgent
 from common.server import utils
@@ -28,23 +30,53 @@ logger = logging.getLogger(__name__)
 
 
 class AgentTaskManager(InMemoryTaskManager):
-    def __init__(self, agent: MindsDBAgent):
+    """Streams the agent's answer in artifact chunks.
+
+    The text deltas of the answer are coalesced for up to `flush_interval`
+    seconds or `flush_chars` characters and sent as appended chunks of the
+    answer artifact, which is stored whole once complete.
+    """
+
+    def __init__(
+        self,
+        agent: MindsDBAgent,
+        flush_interval: float = 0.05,
+        flush_chars: int = 512,
+    ):
         super().__init__()
         self.agent = agent
+        self.flush_interval = flush_interval
+        self.flush_chars = flush_chars
 
     async def _stream_generator(
         self, request: SendTaskStreamingRequest
     ) -> AsyncIterable[SendTaskStreamingResponse] | JSONRPCResponse:
         task_send_params: TaskSendParams = request.params
         query = self._get_user_query(task_send_params)
+        # The text of the answer, sent in chunks and stored whole at the end.
+        answer: list[str] = []
         try:
-            async for item in self.agent.stream(
-                query, task_send_params.sessionId
+            async for item in self._coalesce(
+                self.agent.stream(query, task_send_params.sessionId)
             ):
                 is_task_complete = item['is_task_complete']
                 parts = item['parts']
 
-                if not is_task_complete:
+                if not is_task_complete and 'delta' in item:
+                    yield SendTaskStreamingResponse(
+                        id=request.id,
+                        result=TaskArtifactUpdateEvent(
+                            id=task_send_params.id,
+                            artifact=Artifact(
+                                parts=parts,
+                                index=0,
+                                append=bool(answer),
+                                lastChunk=False,
+                            ),
+                        ),
+                    )
+                    answer.append(item['delta'])
+                elif not is_task_complete:
                     task_state = TaskState.WORKING
                     metadata = item['metadata']
                     message = Message(
@@ -65,15 +97,28 @@ class AgentTaskManager(InMemoryTaskManager):
                 else:
                     # task_state = TaskState.INPUT_REQUIRED
                     task_state = TaskState.COMPLETED
-                    artifact = Artifact(parts=parts, index=0, append=False)
-                    task_status = TaskStatus(state=task_state)
+                    last = ''.join(x['text'] for x in parts)
+                    # The last chunk carries what the stop delta added, and
+                    # the stored artifact the whole answer.
                     yield SendTaskStreamingResponse(
                         id=request.id,
                         result=TaskArtifactUpdateEvent(
                             id=task_send_params.id,
-                            artifact=artifact,
+                            artifact=Artifact(
+                                parts=[{'type': 'text', 'text': last}],
+                                index=0,
+                                append=bool(answer),
+                                lastChunk=True,
+                            ),
                         ),
                     )
+                    answer.append(last)
+                    artifact = Artifact(
+                        parts=[{'type': 'text', 'text': ''.join(answer)}],
+                        index=0,
+                        append=False,
+                    )
+                    task_status = TaskStatus(state=task_state)
                     await self._update_store(
                         task_send_params.id, task_status, [artifact]
                     )
@@ -97,6 +142,86 @@ class AgentTaskManager(InMemoryTaskManager):
                 ),
             )
 
+    async def _coalesce(
+        self, items: AsyncIterable[dict[str, Any]]
+    ) -> AsyncIterable[dict[str, Any]]:
+        """Merge the text deltas of the agent's stream.
+
+        Deltas are merged into an item with the text in `delta`, which is
+        yielded once `flush_chars` characters are buffered, `flush_interval`
+        seconds passed since the first buffered delta, or another kind of
+        item arrives. Other items are passed through in order.
+        """
+        loop = asyncio.get_running_loop()
+        # Filled by a task of its own, so the buffer is flushed on time
+        # while the agent waits for its next delta.
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def pump():
+            try:
+                async for item in items:
+                    await queue.put(item)
+                await queue.put(None)
+            except Exception as e:
+                await queue.put(e)
+
+        def flush() -> dict[str, Any]:
+            delta = ''.join(buffer)
+            buffer.clear()
+            return {
+                'is_task_complete': False,
+                'parts': [{'type': 'text', 'text': delta}],
+                'delta': delta,
+            }
+
+        buffer: list[str] = []
+        size = 0
+        deadline = None
+        pump_task = asyncio.create_task(pump())
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(
+                        queue.get(),
+                        None if deadline is None else deadline - loop.time(),
+                    )
+                except TimeoutError:
+                    yield flush()
+                    size, deadline = 0, None
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                text = self._text_delta(item)
+                if text is not None:
+                    if text:
+                        buffer.append(text)
+                        size += len(text)
+                        if deadline is None:
+                            deadline = loop.time() + self.flush_interval
+                    if size >= self.flush_chars:
+                        yield flush()
+                        size, deadline = 0, None
+                    continue
+                if buffer:
+                    yield flush()
+                    size, deadline = 0, None
+                if item is None:
+                    break
+                yield item
+        finally:
+            pump_task.cancel()
+
+    def _text_delta(self, item: dict[str, Any] | None) -> str | None:
+        """The text of a delta of the answer, None for other items."""
+        if (
+            item is None
+            or item['is_task_complete']
+            or item['metadata'].get('subtype') != 'analysis'
+            or len(item['parts']) != 1
+        ):
+            return None
+        return item['parts'][0]['text']
+
     def _validate_request(
         self, request: SendTaskRequest | SendTaskStreamingRequest
     ) -> None:
@@ -0,0 +1,191 @@
+import asyncio
+import unittest
+
+from typing import Any
+
+from common.types import (
+    Message,
+    SendTaskStreamingRequest,
+    TaskArtifactUpdateEvent,
+    TaskSendParams,
+    TaskState,
+    TaskStatusUpdateEvent,
+    TextPart,
+)
+from task_manager import AgentTaskManager
+
+
+def delta(text: str) -> dict[str, Any]:
+    return {
+        'is_task_complete': False,
+        'parts': [{'type': 'text', 'text': text}],
+        'metadata': {'type': 'reasoning', 'subtype': 'analysis'},
+    }
+
+
+def sql_query(sql: str) -> dict[str, Any]:
+    return {
+        'is_task_complete': False,
+        'parts': [
+            {'type': 'text', 'text': ''},
+            {'type': 'text', 'text': sql},
+        ],
+        'metadata': {'type': 'reasoning', 'subtype': 'execute_query'},
+    }
+
+
+def stop(text: str) -> dict[str, Any]:
+    return {
+        'is_task_complete': True,
+        'parts': [{'type': 'text', 'text': text}],
+    }
+
+
+class FakeAgent:
+    """Streams scripted items, waiting on an event where the script has one."""
+
+    def __init__(self, script: list[dict[str, Any] | asyncio.Event]):
+        self.script = script
+
+    async def stream(self, query: str, session_id: str):
+        for item in self.script:
+            if isinstance(item, asyncio.Event):
+                await item.wait()
+            else:
+                yield item
+
+
+class CoalesceTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for the delta batching of AgentTaskManager."""
+
+    async def collect(self, manager: AgentTaskManager) -> list[dict]:
+        return [
+            item
+            async for item in manager._coalesce(manager.agent.stream('q', 's'))
+        ]
+
+    async def test_flushes_after_flush_interval(self) -> None:
+        """Test buffered deltas are sent once the interval passes."""
+        gate = asyncio.Event()
+        manager = AgentTaskManager(
+            FakeAgent([delta('a'), delta('b'), gate, delta('c'), stop('')]),
+            flush_interval=0.01,
+            flush_chars=1000,
+        )
+        items = manager._coalesce(manager.agent.stream('q', 's'))
+        # The agent waits on the gate, so only the timer can flush.
+        first = await asyncio.wait_for(anext(items), 1)
+        self.assertEqual(first['delta'], 'ab')
+        gate.set()
+        rest = [item async for item in items]
+        self.assertEqual(rest[0]['delta'], 'c')
+        self.assertTrue(rest[1]['is_task_complete'])
+
+    async def test_flushes_at_flush_chars(self) -> None:
+        """Test deltas are sent once flush_chars characters are buffered."""
+        manager = AgentTaskManager(
+            FakeAgent([delta('ab'), delta('cd'), delta('e'), stop('')]),
+            flush_interval=60,
+            flush_chars=4,
+        )
+        items = await self.collect(manager)
+        self.assertEqual([x.get('delta') for x in items], ['abcd', 'e', None])
+        self.assertEqual(items[0]['parts'], [{'type': 'text', 'text': 'abcd'}])
+
+    async def test_other_items_pass_through_in_order(self) -> None:
+        """Test non-delta items flush the buffer and are sent unchanged."""
+        sql = sql_query('SELECT 1')
+        manager = AgentTaskManager(
+            FakeAgent([delta('a'), sql, delta('b'), stop('!')]),
+            flush_interval=60,
+            flush_chars=1000,
+        )
+        items = await self.collect(manager)
+        self.assertEqual(items[0]['delta'], 'a')
+        self.assertIs(items[1], sql)
+        self.assertEqual(items[2]['delta'], 'b')
+        self.assertEqual(items[3], stop('!'))
+
+    async def test_errors_of_the_agent_are_raised(self) -> None:
+        """Test an error of the agent's stream reaches the consumer."""
+
+        class FailingAgent:
+            async def stream(self, query: str, session_id: str):
+                yield delta('a')
+                raise OSError('connection reset')
+
+        manager = AgentTaskManager(FailingAgent(), flush_interval=60)
+        with self.assertRaisesRegex(OSError, 'connection reset'):
+            await self.collect(manager)
+
+
+class StreamGeneratorTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for the streamed answer artifact of AgentTaskManager."""
+
+    async def stream(
+        self, script: list[dict[str, Any]], **kwargs: Any
+    ) -> tuple[AgentTaskManager, list]:
+        manager = AgentTaskManager(FakeAgent(script), **kwargs)
+        request = SendTaskStreamingRequest(
+            id='r1',
+            params=TaskSendParams(
+                id='t1',
+                sessionId='s1',
+                message=Message(role='user', parts=[TextPart(text='q')]),
+            ),
+        )
+        await manager.upsert_task(request.params)
+        responses = [x async for x in manager._stream_generator(request)]
+        return manager, [x.result for x in responses]
+
+    async def test_answer_is_appended_and_stored_whole(self) -> None:
+        """Test chunks append to one artifact, stored complete at the end."""
+        manager, events = await self.stream(
+            [
+                delta('Hel'),
+                delta('lo'),
+                sql_query('SELECT 1'),
+                delta(' you'),
+                stop('!'),
+            ],
+            flush_interval=60,
+            flush_chars=3,
+        )
+        chunks = [
+            x.artifact for x in events if isinstance(x, TaskArtifactUpdateEvent)
+        ]
+        self.assertEqual(
+            [(c.parts[0].text, c.append, c.lastChunk) for c in chunks],
+            [
+                ('Hel', False, False),
+                ('lo', True, False),
+                (' you', True, False),
+                ('!', True, True),
+            ],
+        )
+        self.assertTrue(all(c.index == 0 for c in chunks))
+        statuses = [x for x in events if isinstance(x, TaskStatusUpdateEvent)]
+        self.assertEqual(statuses[0].status.state, TaskState.WORKING)
+        self.assertEqual(statuses[0].status.message.parts[1].text, 'SELECT 1')
+        self.assertTrue(statuses[-1].final)
+        self.assertEqual(statuses[-1].status.state, TaskState.COMPLETED)
+        task = manager.tasks['t1']
+        self.assertEqual(task.status.state, TaskState.COMPLETED)
+        self.assertEqual(len(task.artifacts), 1)
+        self.assertEqual(task.artifacts[0].parts[0].text, 'Hello you!')
+
+    async def test_answer_of_the_stop_delta_only(self) -> None:
+        """Test an answer without deltas is a single first and last chunk."""
+        manager, events = await self.stream([stop('Done')])
+        (chunk,) = [
+            x.artifact for x in events if isinstance(x, TaskArtifactUpdateEvent)
+        ]
+        self.assertEqual(
+            (chunk.parts[0].text, chunk.append, chunk.lastChunk),
+            ('Done', False, True),
+        )
+        self.assertEqual(manager.tasks['t1'].artifacts[0].parts[0].text, 'Done')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""BM25 search over long texts, shared by the agents that answer from them."""
+
+import collections
+import math
+import re
+
+
+_TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """BM25 index over the lines of a document, split into chunks.
+
+    Each chunk covers `chunk_lines` consecutive lines and the next chunk
+    starts `chunk_lines - overlap` lines later, so a passage cut at a chunk
+    boundary is still whole in one of them. Search returns the line ranges
+    of the best chunks, so excerpts keep their original line numbers.
+    """
+
+    def __init__(
+        self,
+        lines: list[str],
+        chunk_lines: int = 20,
+        overlap: int = 5,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self._k1 = k1
+        self._b = b
+        step = max(chunk_lines - overlap, 1)
+        # (first line, end line) of each chunk, the end excluded.
+        self.chunks: list[tuple[int, int]] = [
+            (start, min(start + chunk_lines, len(lines)))
+            for start in range(0, max(len(lines) - overlap, 1), step)
+        ]
+        self._term_freqs: list[collections.Counter[str]] = []
+        self._lengths: list[int] = []
+        # Term to the chunks containing it, to only score those.
+        self._postings: dict[str, list[int]] = collections.defaultdict(list)
+        for chunk_id, (start, end) in enumerate(self.chunks):
+            tokens = tokenize(' '.join(lines[start:end]))
+            term_freqs = collections.Counter(tokens)
+            self._term_freqs.append(term_freqs)
+            self._lengths.append(len(tokens))
+            for term in term_freqs:
+                self._postings[term].append(chunk_id)
+        self._average_length = (
+            sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        )
+        n = len(self.chunks)
+        self._idf = {
+            term: math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            for term, ids in self._postings.items()
+        }
+
+    def search(self, query: str, top_k: int = 8) -> list[tuple[int, int]]:
+        """Line ranges of the `top_k` chunks that best match the query."""
+        scores: dict[int, float] = collections.defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for chunk_id in self._postings[term]:
+                freq = self._term_freqs[chunk_id][term]
+                norm = self._k1 * (
+                    1
+                    - self._b
+                    + self._b
+                    * self._lengths[chunk_id]
+                    / (self._average_length or 1)
+                )
+                scores[chunk_id] += idf * freq * (self._k1 + 1) / (freq + norm)
+        best = sorted(scores, key=lambda x: scores[x], reverse=True)[:top_k]
+        return [self.chunks[x] for x in best]
+
+
+def merge_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Sort line ranges and join the ones that overlap or touch."""
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
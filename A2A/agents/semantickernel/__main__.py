@@ -18,7 +18,12 @@ load_dotenv()
 @click.command()
 @click.option('--host', default='localhost')
 @click.option('--port', default=10020)
-def main(host, port):
+@click.option(
+    '--max-sessions',
+    default=1000,
+    help='Conversations kept in memory, the least recently used dropped first.',
+)
+def main(host, port, max_sessions):
     """Starts the Semantic Kernel Agent server using A2A."""
     # Build the agent card
     capabilities = AgentCapabilities(streaming=True, pushNotifications=True)
@@ -56,7 +61,8 @@ def main(host, port):
 
     # Create the server
     task_manager = TaskManager(
-        notification_sender_auth=notification_sender_auth
+        notification_sender_auth=notification_sender_auth,
+        max_sessions=max_sessions,
     )
     server = A2AServer(
         agent_card=agent_card, task_manager=task_manager, host=host, port=port
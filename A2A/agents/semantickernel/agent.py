@@ -2,13 +2,14 @@ import logging
 import os
 
 from collections.abc import AsyncIterable
-from typing import TYPE_CHECKING, Annotated, Any, Literal
-
-import httpx
+from typing import Annotated, Any, Literal
 
 from dotenv import load_dotenv
-from pydantic import BaseModel
-from semantic_kernel.agents import ChatCompletionAgent, ChatHistoryAgentThread
+from pydantic import BaseModel, ValidationError
+from semantic_kernel.agents import ChatCompletionAgent
+from semantic_kernel.connectors.ai.chat_completion_client_base import (
+    ChatCompletionClientBase,
+)
 from semantic_kernel.connectors.ai.open_ai import (
     OpenAIChatCompletion,
     OpenAIChatPromptExecutionSettings,
@@ -16,15 +17,15 @@ from semantic_kernel.connectors.ai.open_ai import (
 from semantic_kernel.contents import (
     FunctionCallContent,
     FunctionResultContent,
-    StreamingChatMessageContent,
     StreamingTextContent,
 )
 from semantic_kernel.functions import kernel_function
 from semantic_kernel.functions.kernel_arguments import KernelArguments
 
+from agents.exchange_rates import get_exchange_rate_service
+from agents.semantickernel.streaming import JsonFieldStream
+from agents.semantickernel.threads import ThreadRegistry
 
-if TYPE_CHECKING:
-    from semantic_kernel.contents import ChatMessageContent
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +43,7 @@ class CurrencyPlugin:
     @kernel_function(
         description='Retrieves exchange rate between currency_from and currency_to using Frankfurter API'
     )
-    def get_exchange_rate(
+    async def get_exchange_rate(
         self,
         currency_from: Annotated[
             str, 'Currency code to convert from, e.g. USD'
@@ -53,16 +54,12 @@ class CurrencyPlugin:
         date: Annotated[str, "Date or 'latest'"] = 'latest',
     ) -> str:
         try:
-            response = httpx.get(
-                f'https://api.frankfurter.app/{date}',
-                params={'from': currency_from, 'to': currency_to},
-                timeout=10.0,
+            data = await get_exchange_rate_service().get_rates(
+                currency_from, currency_to, date
             )
-            response.raise_for_status()
-            data = response.json()
-            if 'rates' not in data or currency_to not in data['rates']:
+            rate = data['rates'].get(currency_to.strip().upper())
+            if rate is None:
                 return f'Could not retrieve rate for {currency_from} to {currency_to}'
-            rate = data['rates'][currency_to]
             return f'1 {currency_from} = {rate} {currency_to}'
         except Exception as e:
             return f'Currency API call failed: {e!s}'
@@ -89,22 +86,35 @@ class SemanticKernelTravelAgent:
     """Wraps Semantic Kernel-based agents to handle Travel related tasks."""
 
     agent: ChatCompletionAgent
-    thread: ChatHistoryAgentThread = None
+    threads: ThreadRegistry
     SUPPORTED_CONTENT_TYPES = ['text', 'text/plain']
 
-    def __init__(self):
-        api_key = os.getenv('OPENAI_API_KEY', None)
-        if not api_key:
-            raise ValueError('OPENAI_API_KEY environment variable not set.')
+    def __init__(
+        self,
+        service: ChatCompletionClientBase | None = None,
+        max_threads: int = 1000,
+    ):
+        """Initialize the agents.
+
+        Args:
+            service (ChatCompletionClientBase | None): The chat completion service of the agents, OpenAI by default.
+            max_threads (int): The number of session threads kept before the least recently used are dropped.
+        """
+        if service is None:
+            api_key = os.getenv('OPENAI_API_KEY', None)
+            if not api_key:
+                raise ValueError('OPENAI_API_KEY environment variable not set.')
 
-        model_id = os.getenv('OPENAI_CHAT_MODEL_ID', 'gpt-4.1')
+            service = OpenAIChatCompletion(
+                api_key=api_key,
+                ai_model_id=os.getenv('OPENAI_CHAT_MODEL_ID', 'gpt-4.1'),
+            )
+
+        self.threads = ThreadRegistry(max_threads=max_threads)
 
         # Define a CurrencyExchangeAgent to handle currency-related tasks
         currency_exchange_agent = ChatCompletionAgent(
-            service=OpenAIChatCompletion(
-                api_key=api_key,
-                ai_model_id=model_id,
-            ),
+            service=service,
             name='CurrencyExchangeAgent',
             instructions=(
                 'You specialize in handling currency-related requests from travelers. '
@@ -117,10 +127,7 @@ class SemanticKernelTravelAgent:
 
         # Define an ActivityPlannerAgent to handle activity-related tasks
         activity_planner_agent = ChatCompletionAgent(
-            service=OpenAIChatCompletion(
-                api_key=api_key,
-                ai_model_id=model_id,
-            ),
+            service=service,
             name='ActivityPlannerAgent',
             instructions=(
                 'You specialize in planning and recommending activities for travelers. '
@@ -133,10 +140,7 @@ class SemanticKernelTravelAgent:
 
         # Define the main TravelManagerAgent to delegate tasks to the appropriate agents
         self.agent = ChatCompletionAgent(
-            service=OpenAIChatCompletion(
-                api_key=api_key,
-                ai_model_id=model_id,
-            ),
+            service=service,
             name='TravelManagerAgent',
             instructions=(
                 "Your role is to carefully analyze the traveler's request and forward it to the appropriate agent based on the "
@@ -167,14 +171,13 @@ class SemanticKernelTravelAgent:
         Returns:
             dict: A dictionary containing the content, task completion status, and user input requirement.
         """
-        await self._ensure_thread_exists(session_id)
-
-        # Use SK's get_response for a single shot
-        response = await self.agent.get_response(
-            messages=user_input,
-            thread=self.thread,
-        )
-        return self._get_agent_response(response.content)
+        async with self.threads.thread(session_id) as thread:
+            # Use SK's get_response for a single shot
+            response = await self.agent.get_response(
+                messages=user_input,
+                thread=thread,
+            )
+        return self._get_agent_response(response.message.content)
 
     async def stream(
         self, user_input: str, session_id: str
@@ -187,67 +190,80 @@ class SemanticKernelTravelAgent:
 
         Yields:
             dict: A dictionary containing the content, task completion status, and user input requirement.
+                The text of a completed response is also yielded as it arrives, in dictionaries with `is_partial` set.
         """
-        await self._ensure_thread_exists(session_id)
-
-        chunks: list[StreamingChatMessageContent] = []
+        response = JsonFieldStream()
 
         # For the sample, to avoid too many messages, only show one "in-progress" message for each task
         tool_call_in_progress = False
         message_in_progress = False
-        async for response_chunk in self.agent.invoke_stream(
-            messages=user_input,
-            thread=self.thread,
-        ):
-            if any(
-                isinstance(item, (FunctionCallContent, FunctionResultContent))
-                for item in response_chunk.items
+        async with self.threads.thread(session_id) as thread:
+            async for response_chunk in self.agent.invoke_stream(
+                messages=user_input,
+                thread=thread,
             ):
-                if not tool_call_in_progress:
-                    yield {
-                        'is_task_complete': False,
-                        'require_user_input': False,
-                        'content': 'Processing the trip plan (with plugins)...',
-                    }
-                    tool_call_in_progress = True
-            elif any(
-                isinstance(item, StreamingTextContent)
-                for item in response_chunk.items
-            ):
-                if not message_in_progress:
-                    yield {
-                        'is_task_complete': False,
-                        'require_user_input': False,
-                        'content': 'Building the trip plan...',
-                    }
-                    message_in_progress = True
-
-                chunks.append(response_chunk.message)
-
-        full_message = sum(chunks[1:], chunks[0])
-        yield self._get_agent_response(full_message)
-
-    def _get_agent_response(
-        self, message: 'ChatMessageContent'
-    ) -> dict[str, Any]:
+                if any(
+                    isinstance(
+                        item, (FunctionCallContent, FunctionResultContent)
+                    )
+                    for item in response_chunk.items
+                ):
+                    if not tool_call_in_progress:
+                        yield {
+                            'is_task_complete': False,
+                            'require_user_input': False,
+                            'content': 'Processing the trip plan (with plugins)...',
+                        }
+                        tool_call_in_progress = True
+                elif any(
+                    isinstance(item, StreamingTextContent)
+                    for item in response_chunk.items
+                ):
+                    if not message_in_progress:
+                        yield {
+                            'is_task_complete': False,
+                            'require_user_input': False,
+                            'content': 'Building the trip plan...',
+                        }
+                        message_in_progress = True
+
+                    deltas = response.feed(response_chunk.message.content or '')
+                    # Only answers are streamed, as questions back to the
+                    # user are sent as a status message once complete.
+                    if (
+                        deltas.get('message')
+                        and response.fields.get('status') == 'completed'
+                    ):
+                        yield {
+                            'is_task_complete': False,
+                            'require_user_input': False,
+                            'is_partial': True,
+                            'content': deltas['message'],
+                        }
+
+        yield self._get_agent_response(response.text)
+
+    def _get_agent_response(self, content: str) -> dict[str, Any]:
         """Extracts the structured response from the agent's message content.
 
         Args:
-            message (ChatMessageContent): The message content from the agent.
+            content (str): The content of the agent's message.
 
         Returns:
             dict: A dictionary containing the content, task completion status, and user input requirement.
         """
-        structured_response = ResponseFormat.model_validate_json(
-            message.content
-        )
-
         default_response = {
             'is_task_complete': False,
             'require_user_input': True,
             'content': 'We are unable to process your request at the moment. Please try again.',
         }
 
+        try:
+            structured_response = ResponseFormat.model_validate_json(content)
+        except ValidationError as e:
+            logger.warning(f'Invalid response from the agent: {e}')
+            return default_response
+
         if isinstance(structured_response, ResponseFormat):
             response_map = {
                 'input_required': {
@@ -270,17 +286,5 @@ class SemanticKernelTravelAgent:
 
         return default_response
 
-    async def _ensure_thread_exists(self, session_id: str) -> None:
-        """Ensure the thread exists for the given session ID.
-
-        Args:
-            session_id (str): Unique identifier for the session.
-        """
-        # Replace check with self.thread.id when
-        # https://github.com/microsoft/semantic-kernel/issues/11535 is fixed
-        if self.thread is None or self.thread._thread_id != session_id:
-            await self.thread.delete() if self.thread else None
-            self.thread = ChatHistoryAgentThread(thread_id=session_id)
-
 
 # endregion
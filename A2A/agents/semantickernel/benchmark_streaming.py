@@ -0,0 +1,104 @@
+"""Cost of collecting a streamed response, and when clients see its text.
+
+- aggregate: the time to collect responses of growing numbers of chunks,
+  adding up the StreamingChatMessageContent chunks as the agent used to do,
+  and decoding them with a JsonFieldStream.
+- stream: SemanticKernelTravelAgent.stream over a stub chat completion
+  service streaming a response a chunk at a time, and when its first text
+  and the final response are yielded.
+
+run:
+  cd A2A && uv run python -m agents.semantickernel.benchmark_streaming
+"""
+
+import asyncio
+import json
+import time
+
+from collections.abc import AsyncGenerator
+from typing import Any
+
+from semantic_kernel.connectors.ai.chat_completion_client_base import (
+    ChatCompletionClientBase,
+)
+from semantic_kernel.contents import (
+    AuthorRole,
+    ChatHistory,
+    StreamingChatMessageContent,
+)
+
+from agents.semantickernel.agent import SemanticKernelTravelAgent
+from agents.semantickernel.streaming import JsonFieldStream
+
+
+CHUNK_COUNTS = [500, 2_000, 8_000]
+STREAM_CHUNKS = 200
+CHUNK_SECONDS = 0.005
+
+
+def response(chunks: int) -> list[str]:
+    """A structured response split in `chunks` pieces of a few characters."""
+    message = ' '.join(f'word{i}' for i in range(chunks))
+    text = json.dumps({'status': 'completed', 'message': message})
+    size = -(-len(text) // chunks)
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def chunk(text: str) -> StreamingChatMessageContent:
+    return StreamingChatMessageContent(
+        role=AuthorRole.ASSISTANT, choice_index=0, content=text
+    )
+
+
+class StubChatCompletion(ChatCompletionClientBase):
+    async def _inner_get_streaming_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: Any,
+        function_invoke_attempt: int = 0,
+    ) -> AsyncGenerator[list[StreamingChatMessageContent], Any]:
+        for text in response(STREAM_CHUNKS):
+            await asyncio.sleep(CHUNK_SECONDS)
+            yield [chunk(text)]
+
+
+def aggregate():
+    print(f'{"chunks":>7} {"sum ms":>9} {"decode ms":>10}')
+    for count in CHUNK_COUNTS:
+        chunks = [chunk(x) for x in response(count)]
+        started = time.perf_counter()
+        message = sum(chunks[1:], chunks[0])
+        summed = time.perf_counter() - started
+        started = time.perf_counter()
+        stream = JsonFieldStream()
+        for x in chunks:
+            stream.feed(x.content)
+        text = stream.text
+        decoded = time.perf_counter() - started
+        assert text == message.content
+        print(f'{count:>7} {summed * 1000:>9.1f} {decoded * 1000:>10.1f}')
+
+
+async def stream():
+    agent = SemanticKernelTravelAgent(
+        service=StubChatCompletion(ai_model_id='stub')
+    )
+    started = time.perf_counter()
+    first_text = None
+    text = []
+    async for partial in agent.stream('Plan a day in Seoul.', 'session'):
+        if partial.get('is_partial'):
+            first_text = first_text or time.perf_counter() - started
+            text.append(partial['content'])
+    final = time.perf_counter() - started
+    assert ''.join(text) == partial['content'], 'streamed text differs'
+    print(
+        f'{STREAM_CHUNKS} chunks every {CHUNK_SECONDS * 1000:.0f} ms: '
+        f'first text at {first_text * 1000:.0f} ms, '
+        f'final response at {final * 1000:.0f} ms'
+    )
+
+
+if __name__ == '__main__':
+    aggregate()
+    asyncio.run(stream())
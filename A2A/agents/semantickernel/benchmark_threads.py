@@ -0,0 +1,170 @@
+"""Load test of the travel agent with interleaved sessions.
+
+Runs SemanticKernelTravelAgent over a stub chat completion service that
+answers after a fixed delay with the number of user turns it sees, so a
+reply tells whether the session's history was kept. Every session sends its
+turns one after another while all sessions run at once, alternating between
+invoke and stream:
+
+- shared: one thread replaced whenever another session's request arrives,
+  as the agent used to do.
+- registry: a thread per session from the ThreadRegistry, with more
+  sessions than it keeps in the last run.
+
+run:
+  cd A2A && uv run python -m agents.semantickernel.benchmark_threads
+"""
+
+import asyncio
+import contextlib
+import json
+import time
+
+from collections.abc import AsyncGenerator, AsyncIterator
+from typing import Any
+
+from semantic_kernel.agents import ChatHistoryAgentThread
+from semantic_kernel.connectors.ai.chat_completion_client_base import (
+    ChatCompletionClientBase,
+)
+from semantic_kernel.contents import (
+    AuthorRole,
+    ChatHistory,
+    ChatMessageContent,
+    StreamingChatMessageContent,
+)
+
+from agents.semantickernel.agent import SemanticKernelTravelAgent
+from agents.semantickernel.threads import ThreadRegistry
+
+
+SESSIONS = 200
+TURNS = 4
+LATENCY_SECONDS = 0.05
+STREAM_CHUNKS = 8
+
+
+class StubChatCompletion(ChatCompletionClientBase):
+    async def _inner_get_chat_message_contents(
+        self, chat_history: ChatHistory, settings: Any
+    ) -> list[ChatMessageContent]:
+        await asyncio.sleep(LATENCY_SECONDS)
+        return [
+            ChatMessageContent(
+                role=AuthorRole.ASSISTANT, content=self._reply(chat_history)
+            )
+        ]
+
+    async def _inner_get_streaming_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: Any,
+        function_invoke_attempt: int = 0,
+    ) -> AsyncGenerator[list[StreamingChatMessageContent], Any]:
+        await asyncio.sleep(LATENCY_SECONDS)
+        reply = self._reply(chat_history)
+        size = -(-len(reply) // STREAM_CHUNKS)
+        for start in range(0, len(reply), size):
+            yield [
+                StreamingChatMessageContent(
+                    role=AuthorRole.ASSISTANT,
+                    choice_index=0,
+                    content=reply[start : start + size],
+                )
+            ]
+
+    def _reply(self, chat_history: ChatHistory) -> str:
+        turns = [
+            x.content
+            for x in chat_history.messages
+            if x.role == AuthorRole.USER
+        ]
+        return json.dumps(
+            {'status': 'completed', 'message': f'{len(turns)} {turns[-1]}'}
+        )
+
+
+class SharedThread:
+    """The single thread the agent used to keep for all sessions."""
+
+    def __init__(self):
+        self._thread: ChatHistoryAgentThread | None = None
+        self._session_id: str | None = None
+
+    @contextlib.asynccontextmanager
+    async def thread(
+        self, session_id: str
+    ) -> AsyncIterator[ChatHistoryAgentThread]:
+        if self._thread is None or self._session_id != session_id:
+            if self._thread:
+                await self._thread.delete()
+            self._thread = ChatHistoryAgentThread(thread_id=session_id)
+            self._session_id = session_id
+        yield self._thread
+
+
+async def session(
+    agent: SemanticKernelTravelAgent, session_id: str
+) -> tuple[int, int]:
+    """Send the turns of a session.
+
+    Returns the number of turns answered with the session's history and the
+    number that failed.
+    """
+    kept = failed = 0
+    for turn in range(1, TURNS + 1):
+        query = f'session {session_id} turn {turn}'
+        try:
+            if turn % 2:
+                response = await agent.invoke(query, session_id)
+            else:
+                async for response in agent.stream(query, session_id):
+                    pass
+        except Exception:
+            failed += 1
+            continue
+        kept += response['content'] == f'{turn} {query}'
+    return kept, failed
+
+
+async def run(agent: SemanticKernelTravelAgent) -> tuple[float, int, int]:
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *[session(agent, f's{i}') for i in range(SESSIONS)]
+    )
+    return (
+        time.perf_counter() - started,
+        sum(x for x, _ in results),
+        sum(x for _, x in results),
+    )
+
+
+async def main():
+    agent = SemanticKernelTravelAgent(
+        service=StubChatCompletion(ai_model_id='stub')
+    )
+    print(
+        f'{SESSIONS} sessions x {TURNS} turns = {SESSIONS * TURNS}, '
+        f'{LATENCY_SECONDS * 1000:.0f} ms per model call'
+    )
+    print(
+        f'{"mode":>9} {"max threads":>12} {"seconds":>8} '
+        f'{"with history":>13} {"failed":>7}'
+    )
+    for name, threads, max_threads in [
+        ('shared', SharedThread(), 1),
+        ('registry', ThreadRegistry(max_threads=SESSIONS), SESSIONS),
+        ('registry', ThreadRegistry(max_threads=SESSIONS // 4), SESSIONS // 4),
+    ]:
+        agent.threads = threads
+        seconds, kept, failed = await run(agent)
+        print(
+            f'{name:>9} {max_threads:>12} {seconds:>8.2f} '
+            f'{kept:>13} {failed:>7}'
+        )
+        if isinstance(threads, ThreadRegistry):
+            print(f'  {threads.metrics()}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+"""Incremental decoding of a structured response streamed by the model."""
+
+import json
+import re
+
+
+_STRING_RUN = re.compile(r'[^"\\]+')
+_WHITESPACE = re.compile(r'\s*')
+_HIGH_SURROGATES = ('d8', 'd9', 'da', 'db')
+
+
+class JsonFieldStream:
+    """The string fields of a streamed JSON object, decoded as they arrive.
+
+    Chunks are fed as the model streams them, and each call returns the
+    text its chunk added to each field, so a field can be forwarded while
+    it is still being written. Each chunk is scanned once and the raw text
+    is only joined at the end, so a response costs linear time however
+    many chunks it comes in. Anything but a flat object of strings stops
+    the decoding, and the raw text is still collected for parsing it as a
+    whole.
+    """
+
+    def __init__(self):
+        self.fields: dict[str, str] = {}
+        self._chunks: list[str] = []
+        self._state = 'start'
+        # Unscanned text, a partial escape sequence at most.
+        self._pending = ''
+        self._key = ''
+        self._in_key = False
+
+    @property
+    def text(self) -> str:
+        """The raw text streamed so far."""
+        if len(self._chunks) > 1:
+            self._chunks = [''.join(self._chunks)]
+        return self._chunks[0] if self._chunks else ''
+
+    def feed(self, chunk: str) -> dict[str, str]:
+        """Add a chunk, returning the text it added to each field."""
+        if not chunk:
+            return {}
+        self._chunks.append(chunk)
+        if self._state == 'invalid':
+            return {}
+        text = self._pending + chunk
+        self._pending = ''
+        deltas: dict[str, str] = {}
+        position = 0
+        while position < len(text) and self._state != 'invalid':
+            if self._state == 'string':
+                position = self._scan_string(text, position, deltas)
+                continue
+            position = _WHITESPACE.match(text, position).end()
+            if position == len(text):
+                break
+            char = text[position]
+            position += 1
+            if self._state == 'start':
+                self._state = 'key' if char == '{' else 'invalid'
+            elif self._state == 'key' and char == '"':
+                self._key = ''
+                self._in_key = True
+                self._state = 'string'
+            elif self._state == 'key' and char == '}' and not self.fields:
+                self._state = 'end'
+            elif self._state == 'colon' and char == ':':
+                self._state = 'value'
+            elif self._state == 'value' and char == '"':
+                self._in_key = False
+                self.fields[self._key] = ''
+                self._state = 'string'
+            elif self._state == 'next' and char == ',':
+                self._state = 'key'
+            elif self._state == 'next' and char == '}':
+                self._state = 'end'
+            else:
+                self._state = 'invalid'
+        return deltas
+
+    def _scan_string(
+        self, text: str, position: int, deltas: dict[str, str]
+    ) -> int:
+        """Decode string contents from `position`, returning where it ended."""
+        decoded = []
+        while position < len(text):
+            run = _STRING_RUN.match(text, position)
+            if run:
+                decoded.append(run.group())
+                position = run.end()
+                continue
+            if text[position] == '"':
+                position += 1
+                self._state = 'next' if not self._in_key else 'colon'
+                break
+            escape = self._escape(text, position)
+            if escape is None:
+                # Wait for the rest of the escape sequence.
+                self._pending = text[position:]
+                position = len(text)
+                break
+            value, position = escape
+            decoded.append(value)
+        value = ''.join(decoded)
+        if self._in_key:
+            self._key += value
+        elif value:
+            self.fields[self._key] += value
+            deltas[self._key] = deltas.get(self._key, '') + value
+        return position
+
+    def _escape(self, text: str, position: int) -> tuple[str, int] | None:
+        """The escape sequence at `position`, None if it is incomplete."""
+        length = 2
+        if text[position + 1 : position + 2] == 'u':
+            length = 6
+            # A high surrogate is decoded with the low one following it.
+            if text[position + 2 : position + 4].lower() in _HIGH_SURROGATES:
+                length = 12
+        if (
+            length == 12
+            and len(text) - position >= 8
+            and text[position + 6 : position + 8] != '\\u'
+        ):
+            length = 6
+        if len(text) - position < length:
+            return None
+        sequence = text[position : position + length]
+        try:
+            return json.loads(f'"{sequence}"'), position + length
+        except ValueError:
+            self._state = 'invalid'
+            return '', len(text)
@@ -29,10 +29,14 @@ logger = logging.getLogger(__name__)
 class TaskManager(InMemoryTaskManager):
     """A TaskManager used for the Semantic Kernel Agent sample."""
 
-    def __init__(self, notification_sender_auth: PushNotificationSenderAuth):
+    def __init__(
+        self,
+        notification_sender_auth: PushNotificationSenderAuth,
+        max_sessions: int = 1000,
+    ):
         """Initialize the TaskManager with a notification sender."""
         super().__init__()
-        self.agent = SemanticKernelTravelAgent()
+        self.agent = SemanticKernelTravelAgent(max_threads=max_sessions)
         self.notification_sender_auth = notification_sender_auth
 
     async def on_send_task(self, request: SendTaskRequest) -> SendTaskResponse:
@@ -107,6 +111,8 @@ class TaskManager(InMemoryTaskManager):
         """
         try:
             query = request.params.message.parts[0].text
+            # Whether the answer was sent in chunks as it was generated.
+            streamed = False
             async for partial in self.agent.stream(
                 query, request.params.sessionId
             ):
@@ -115,6 +121,24 @@ class TaskManager(InMemoryTaskManager):
                 text_content = partial['content']
                 artifact = None
 
+                if partial.get('is_partial'):
+                    # Only sent to the client, the task is stored with the
+                    # whole answer once complete.
+                    await self.enqueue_events_for_sse(
+                        request.params.id,
+                        TaskArtifactUpdateEvent(
+                            id=request.params.id,
+                            artifact=Artifact(
+                                parts=[{'type': 'text', 'text': text_content}],
+                                index=0,
+                                append=streamed,
+                                lastChunk=False,
+                            ),
+                        ),
+                    )
+                    streamed = True
+                    continue
+
                 new_status = TaskStatus(state=TaskState.WORKING)
                 # By default, don't end the stream
                 final = False
@@ -143,7 +167,28 @@ class TaskManager(InMemoryTaskManager):
                         parts=[{'type': 'text', 'text': text_content}],
                     )
 
-                if artifact:
+                if streamed and final:
+                    # The client has the answer, only end its chunks. If the
+                    # response turned out not to be a valid answer, the
+                    # streamed text is replaced by the final message.
+                    await self.enqueue_events_for_sse(
+                        request.params.id,
+                        TaskArtifactUpdateEvent(
+                            id=request.params.id,
+                            artifact=Artifact(
+                                parts=[
+                                    {
+                                        'type': 'text',
+                                        'text': '' if is_done else text_content,
+                                    }
+                                ],
+                                index=0,
+                                append=is_done,
+                                lastChunk=True,
+                            ),
+                        ),
+                    )
+                elif artifact:
                     task_artifact_update_event = TaskArtifactUpdateEvent(
                         id=request.params.id, artifact=artifact
                     )
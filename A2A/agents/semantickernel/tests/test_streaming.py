@@ -0,0 +1,89 @@
+import json
+import unittest
+
+from agents.semantickernel.streaming import JsonFieldStream
+
+
+def feed_all(chunks: list[str]) -> tuple[JsonFieldStream, dict[str, str]]:
+    """Feed chunks, returning the stream and the deltas joined by field."""
+    stream = JsonFieldStream()
+    joined: dict[str, str] = {}
+    for chunk in chunks:
+        for key, delta in stream.feed(chunk).items():
+            joined[key] = joined.get(key, '') + delta
+    return stream, joined
+
+
+class JsonFieldStreamTest(unittest.TestCase):
+    """Tests for the incremental JsonFieldStream decoder."""
+
+    def test_fields_are_decoded_as_they_arrive(self) -> None:
+        """Test each chunk returns only the text it added to each field."""
+        stream = JsonFieldStream()
+        self.assertEqual(stream.feed('{"status": "comp'), {'status': 'comp'})
+        self.assertEqual(
+            stream.feed('leted", "message": "Hel'),
+            {'status': 'leted', 'message': 'Hel'},
+        )
+        self.assertEqual(stream.feed('lo"}'), {'message': 'lo'})
+        self.assertEqual(
+            stream.fields, {'status': 'completed', 'message': 'Hello'}
+        )
+        self.assertEqual(
+            stream.text, '{"status": "completed", "message": "Hello"}'
+        )
+
+    def test_any_split_decodes_the_same(self) -> None:
+        """Test every way to split a response yields the same fields."""
+        response = json.dumps(
+            {'status': 'completed', 'message': 'Tab\there "quoted" \\ 😀 é'}
+        )
+        for size in range(1, 8):
+            chunks = [
+                response[i : i + size] for i in range(0, len(response), size)
+            ]
+            stream, joined = feed_all(chunks)
+            self.assertEqual(stream.fields, json.loads(response), size)
+            self.assertEqual(joined, json.loads(response), size)
+            self.assertEqual(stream.text, response)
+
+    def test_escaped_surrogate_pairs_are_joined(self) -> None:
+        """Test a pair split across chunks decodes to one character."""
+        stream, joined = feed_all(['{"message": "\\ud83d', '\\ude00"}'])
+        self.assertEqual(stream.fields['message'], '😀')
+        self.assertEqual(joined['message'], '😀')
+
+    def test_lone_high_surrogate_is_kept(self) -> None:
+        """Test a high surrogate not followed by a low one still decodes."""
+        stream, _ = feed_all(['{"message": "\\ud83dab"}'])
+        self.assertEqual(stream.fields['message'], '\ud83dab')
+
+    def test_non_string_values_stop_decoding(self) -> None:
+        """Test anything but a flat object of strings stops the decoding."""
+        stream, joined = feed_all(['{"message": "a", "count": 1, "b": "c"}'])
+        self.assertEqual(stream.fields, {'message': 'a'})
+        self.assertEqual(joined, {'message': 'a'})
+        self.assertEqual(stream.feed('"more"'), {})
+        self.assertTrue(stream.text.endswith('"more"'))
+
+    def test_text_outside_an_object_is_not_decoded(self) -> None:
+        """Test a response that is not an object only collects the text."""
+        stream, joined = feed_all(['Sorry, ', '{"message": "a"}'])
+        self.assertEqual(stream.fields, {})
+        self.assertEqual(joined, {})
+        self.assertEqual(stream.text, 'Sorry, {"message": "a"}')
+
+    def test_invalid_escape_stops_decoding(self) -> None:
+        """Test an invalid escape sequence stops the decoding."""
+        stream, _ = feed_all(['{"message": "a\\q", "b": "c"}'])
+        self.assertEqual(stream.fields, {'message': 'a'})
+
+    def test_empty_object_and_chunks(self) -> None:
+        """Test empty objects and chunks decode to nothing."""
+        stream, joined = feed_all(['', ' { } ', ''])
+        self.assertEqual((stream.fields, joined), ({}, {}))
+        self.assertEqual(JsonFieldStream().text, '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+from agents.semantickernel.threads import ThreadRegistry
+
+
+class ThreadRegistryTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for the bounded ThreadRegistry."""
+
+    async def test_session_keeps_its_thread(self) -> None:
+        """Test requests of a session share a thread and others do not."""
+        registry = ThreadRegistry()
+        async with registry.thread('s1') as first:
+            pass
+        async with registry.thread('s1') as second:
+            self.assertIs(second, first)
+        async with registry.thread('s2') as other:
+            self.assertIsNot(other, first)
+        metrics = registry.metrics()
+        self.assertEqual(
+            (metrics.created, metrics.reused, metrics.threads), (2, 1, 2)
+        )
+
+    async def test_requests_of_a_session_run_one_at_a_time(self) -> None:
+        """Test turns of a session do not interleave, other sessions do."""
+        registry = ThreadRegistry()
+        events = []
+
+        async def request(session_id: str, name: str):
+            async with registry.thread(session_id):
+                events.append(f'{name} start')
+                await asyncio.sleep(0.01)
+                events.append(f'{name} end')
+
+        await asyncio.gather(
+            request('s1', 'a'), request('s1', 'b'), request('s2', 'c')
+        )
+        self.assertLess(events.index('a end'), events.index('b start'))
+        self.assertLess(events.index('c start'), events.index('a end'))
+
+    async def test_least_recently_used_thread_is_evicted(self) -> None:
+        """Test threads beyond `max_threads` are dropped in LRU order."""
+        registry = ThreadRegistry(max_threads=2)
+        async with registry.thread('s1') as first:
+            pass
+        async with registry.thread('s2'):
+            pass
+        async with registry.thread('s1'):
+            pass
+        async with registry.thread('s3'):
+            pass
+        self.assertEqual(registry.metrics().evicted, 1)
+        async with registry.thread('s1') as thread:
+            self.assertIs(thread, first)
+        self.assertEqual(registry.metrics().created, 3)
+
+    async def test_threads_in_use_are_not_evicted(self) -> None:
+        """Test a thread held by a request survives eviction."""
+        registry = ThreadRegistry(max_threads=1)
+        async with registry.thread('s1') as first:
+            async with registry.thread('s2'):
+                pass
+            self.assertEqual(registry.metrics().threads, 1)
+        async with registry.thread('s1') as thread:
+            self.assertIs(thread, first)
+
+    async def test_failed_request_releases_the_thread(self) -> None:
+        """Test a request raising still lets the next one in."""
+        registry = ThreadRegistry(max_threads=1)
+        with self.assertRaises(RuntimeError):
+            async with registry.thread('s1'):
+                raise RuntimeError('model failed')
+        async with asyncio.timeout(1):
+            async with registry.thread('s1'):
+                pass
+        async with registry.thread('s2'):
+            pass
+        self.assertEqual(registry.metrics().evicted, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Conversation threads of the sessions served by the travel agent."""
+
+import asyncio
+import collections
+import contextlib
+import dataclasses
+import logging
+
+from collections.abc import AsyncIterator
+
+from semantic_kernel.agents import ChatHistoryAgentThread
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class ThreadRegistryMetrics:
+    created: int = 0
+    reused: int = 0
+    evicted: int = 0
+    threads: int = 0
+
+
+@dataclasses.dataclass
+class _Entry:
+    thread: ChatHistoryAgentThread
+    # Serializes the requests of a session, so turns do not interleave.
+    lock: asyncio.Lock = dataclasses.field(default_factory=asyncio.Lock)
+    # Requests holding or waiting for the thread, which is never evicted
+    # while there are any.
+    users: int = 0
+
+
+class ThreadRegistry:
+    """A thread per session, the least recently used evicted first.
+
+    Requests of the same session run one at a time on its thread, while
+    requests of different sessions run concurrently. Once there are more
+    than `max_threads` threads the least recently used idle ones are
+    dropped, losing their history.
+    """
+
+    def __init__(self, max_threads: int = 1000):
+        self._max_threads = max_threads
+        # Session id to its entry, least recently used first.
+        self._threads: collections.OrderedDict[str, _Entry] = (
+            collections.OrderedDict()
+        )
+        self._metrics = ThreadRegistryMetrics()
+
+    @contextlib.asynccontextmanager
+    async def thread(
+        self, session_id: str
+    ) -> AsyncIterator[ChatHistoryAgentThread]:
+        """Hold the thread of a session for the duration of a request."""
+        entry = self._threads.get(session_id)
+        if entry:
+            self._threads.move_to_end(session_id)
+            self._metrics.reused += 1
+        else:
+            entry = _Entry(thread=ChatHistoryAgentThread(thread_id=session_id))
+            self._threads[session_id] = entry
+            self._metrics.created += 1
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield entry.thread
+        finally:
+            entry.users -= 1
+            self._evict()
+
+    def metrics(self) -> ThreadRegistryMetrics:
+        return dataclasses.replace(self._metrics, threads=len(self._threads))
+
+    def _evict(self):
+        if len(self._threads) <= self._max_threads:
+            return
+        for session_id, entry in list(self._threads.items()):
+            if len(self._threads) <= self._max_threads:
+                break
+            if not entry.users:
+                del self._threads[session_id]
+                self._metrics.evicted += 1
+                logger.debug(f'Evicted the thread of session {session_id}')
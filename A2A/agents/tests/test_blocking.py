@@ -0,0 +1,167 @@
+import asyncio
+import contextvars
+import os
+import threading
+import unittest
+
+from unittest import mock
+
+from agents import blocking
+from agents.blocking import BlockingCallExecutor, ServerBusyError
+
+
+_request_id: contextvars.ContextVar[str] = contextvars.ContextVar('request_id')
+
+
+class Gate:
+    """A blocking call that holds its thread until released."""
+
+    def __init__(self):
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def __call__(self, value: str = '') -> str:
+        self.started.release()
+        self.release.wait(5)
+        return value
+
+    async def wait_started(self, count: int = 1) -> None:
+        for _ in range(count):
+            await asyncio.to_thread(self.started.acquire, True, 5)
+
+
+class BlockingCallExecutorTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for BlockingCallExecutor."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.gate = Gate()
+        # Released first, so no thread is left blocked when a test fails.
+        self.addCleanup(self.gate.release.set)
+
+    def executor(self, **kwargs) -> BlockingCallExecutor:
+        executor = BlockingCallExecutor(**kwargs)
+        self.addCleanup(executor.shutdown)
+        return executor
+
+    async def test_runs_off_the_event_loop(self) -> None:
+        """Test calls run on a pool thread with their arguments."""
+        executor = self.executor()
+        name = await executor.run(
+            lambda prefix, suffix='': (
+                prefix + threading.current_thread().name + suffix
+            ),
+            'thread ',
+            suffix='!',
+        )
+        self.assertTrue(name.startswith('thread blocking-call'))
+        self.assertTrue(name.endswith('!'))
+        self.assertEqual(executor.metrics().completed, 1)
+
+    async def test_propagates_the_context(self) -> None:
+        """Test calls see the context variables of the caller."""
+        executor = self.executor()
+        _request_id.set('r1')
+        self.assertEqual(await executor.run(_request_id.get), 'r1')
+
+    async def test_raises_errors_of_the_call(self) -> None:
+        """Test exceptions of the call reach the caller and free the slot."""
+        executor = self.executor(max_workers=1)
+
+        def fail():
+            raise ValueError('boom')
+
+        with self.assertRaisesRegex(ValueError, 'boom'):
+            await executor.run(fail)
+        self.assertEqual(await executor.run(lambda: 'ok'), 'ok')
+        metrics = executor.metrics()
+        self.assertEqual((metrics.running, metrics.completed), (0, 2))
+
+    async def test_calls_wait_for_a_free_worker(self) -> None:
+        """Test calls beyond max_workers wait, then run in turn."""
+        executor = self.executor(max_workers=2, max_waiting=4)
+        first = asyncio.create_task(executor.run(self.gate, 'a'))
+        second = asyncio.create_task(executor.run(self.gate, 'b'))
+        await self.gate.wait_started(2)
+        third = asyncio.create_task(executor.run(lambda: 'c'))
+        await asyncio.sleep(0)
+        metrics = executor.metrics()
+        self.assertEqual((metrics.running, metrics.waiting), (2, 1))
+        self.assertFalse(third.done())
+        self.gate.release.set()
+        self.assertEqual(
+            await asyncio.gather(first, second, third), ['a', 'b', 'c']
+        )
+        metrics = executor.metrics()
+        self.assertEqual((metrics.running, metrics.waiting), (0, 0))
+        self.assertEqual(metrics.completed, 3)
+
+    async def test_rejects_calls_beyond_max_waiting(self) -> None:
+        """Test calls are refused at once when the queue is full."""
+        executor = self.executor(max_workers=1, max_waiting=1)
+        running = asyncio.create_task(executor.run(self.gate, 'a'))
+        await self.gate.wait_started()
+        waiting = asyncio.create_task(executor.run(lambda: 'b'))
+        await asyncio.sleep(0)
+        with self.assertRaises(ServerBusyError):
+            await executor.run(lambda: 'c')
+        self.assertEqual(executor.metrics().rejected, 1)
+        self.gate.release.set()
+        self.assertEqual(await asyncio.gather(running, waiting), ['a', 'b'])
+
+    async def test_rejects_calls_after_wait_timeout(self) -> None:
+        """Test calls waiting longer than wait_timeout are refused."""
+        executor = self.executor(max_workers=1, wait_timeout=0.01)
+        running = asyncio.create_task(executor.run(self.gate, 'a'))
+        await self.gate.wait_started()
+        with self.assertRaisesRegex(ServerBusyError, '0.01 seconds'):
+            await executor.run(lambda: 'b')
+        metrics = executor.metrics()
+        self.assertEqual((metrics.waiting, metrics.rejected), (0, 1))
+        self.gate.release.set()
+        self.assertEqual(await running, 'a')
+        self.assertEqual(await executor.run(lambda: 'c'), 'c')
+
+    async def test_cancelled_waiters_leave_the_queue(self) -> None:
+        """Test a call cancelled while waiting gives up its place."""
+        executor = self.executor(max_workers=1, max_waiting=1)
+        running = asyncio.create_task(executor.run(self.gate, 'a'))
+        await self.gate.wait_started()
+        waiting = asyncio.create_task(executor.run(lambda: 'b'))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(executor.metrics().waiting, 0)
+        queued = asyncio.create_task(executor.run(lambda: 'c'))
+        self.gate.release.set()
+        self.assertEqual(await asyncio.gather(running, queued), ['a', 'c'])
+
+
+class GetBlockingExecutorTest(unittest.TestCase):
+    """Tests for get_blocking_executor."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        patcher = mock.patch.object(blocking, '_executor', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_is_configured_by_the_environment(self) -> None:
+        """Test the process executor reads its limits once."""
+        environ = {
+            'BLOCKING_CALL_WORKERS': '2',
+            'BLOCKING_CALL_MAX_WAITING': '3',
+            'BLOCKING_CALL_WAIT_TIMEOUT': '1.5',
+        }
+        with mock.patch.dict(os.environ, environ):
+            executor = blocking.get_blocking_executor()
+        self.addCleanup(executor.shutdown)
+        self.assertIs(blocking.get_blocking_executor(), executor)
+        self.assertEqual(executor._executor._max_workers, 2)
+        self.assertEqual(executor._max_waiting, 3)
+        self.assertEqual(executor._wait_timeout, 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
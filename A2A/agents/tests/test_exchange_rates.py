@@ -0,0 +1,160 @@
+import asyncio
+import unittest
+
+from typing import Any
+from unittest import mock
+
+import httpx
+
+from agents.exchange_rates import ExchangeRateService, FrankfurterUpstream
+
+
+class FakeUpstream:
+    """Serves fixed rates, counting requests and optionally blocking them."""
+
+    def __init__(self):
+        self.requests: list[tuple[str, str]] = []
+        self.release = asyncio.Event()
+        self.release.set()
+        self.error: Exception | None = None
+
+    async def fetch(self, date: str, base: str) -> dict[str, Any]:
+        self.requests.append((date, base))
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return {
+            'amount': 1.0,
+            'base': base,
+            'date': '2024-01-02' if date == 'latest' else date,
+            'rates': {'EUR': 0.9, 'GBP': 0.8},
+        }
+
+
+class ExchangeRateServiceTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for the caching ExchangeRateService."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.upstream = FakeUpstream()
+        self.now = 1000.0
+        # The module's clock only, the event loop keeps the real one.
+        patcher = mock.patch(
+            'agents.exchange_rates.time',
+            mock.Mock(monotonic=lambda: self.now),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_pairs_are_answered_from_one_snapshot(self) -> None:
+        """Test lookups with the same base share one upstream request."""
+        service = ExchangeRateService(self.upstream)
+        eur = await service.get_rates('usd', 'eur')
+        both = await service.get_rates('USD', 'GBP, USD, JPY')
+        self.assertEqual(eur['rates'], {'EUR': 0.9})
+        self.assertEqual(both['rates'], {'GBP': 0.8, 'USD': 1.0})
+        self.assertEqual(both['base'], 'USD')
+        self.assertEqual(self.upstream.requests, [('latest', 'USD')])
+        self.assertEqual((service.hits, service.misses), (1, 1))
+
+    async def test_latest_rates_expire(self) -> None:
+        """Test the latest rates are fetched again after the TTL."""
+        service = ExchangeRateService(self.upstream, latest_ttl=60)
+        await service.get_rates()
+        self.now += 59
+        await service.get_rates()
+        self.now += 2
+        await service.get_rates()
+        self.assertEqual(len(self.upstream.requests), 2)
+
+    async def test_past_rates_never_expire(self) -> None:
+        """Test rates of past dates are kept past the TTL."""
+        service = ExchangeRateService(self.upstream, latest_ttl=60)
+        await service.get_rates(date='2020-01-02')
+        self.now += 3600
+        await service.get_rates(date='2020-01-02')
+        self.assertEqual(len(self.upstream.requests), 1)
+
+    async def test_snapshots_are_bounded(self) -> None:
+        """Test the least recently used snapshot is evicted."""
+        service = ExchangeRateService(self.upstream, max_snapshots=2)
+        await service.get_rates('USD', date='2020-01-01')
+        await service.get_rates('GBP', date='2020-01-01')
+        await service.get_rates('USD', date='2020-01-01')
+        await service.get_rates('JPY', date='2020-01-01')
+        await service.get_rates('USD', date='2020-01-01')
+        await service.get_rates('GBP', date='2020-01-01')
+        self.assertEqual(
+            [base for _, base in self.upstream.requests],
+            ['USD', 'GBP', 'JPY', 'GBP'],
+        )
+
+    async def test_concurrent_lookups_are_coalesced(self) -> None:
+        """Test concurrent lookups of a snapshot share one request."""
+        service = ExchangeRateService(self.upstream)
+        self.upstream.release.clear()
+        lookups = [
+            asyncio.ensure_future(service.get_rates('USD', x))
+            for x in ['EUR', 'GBP', 'EUR']
+        ]
+        await asyncio.sleep(0)
+        self.upstream.release.set()
+        results = await asyncio.gather(*lookups)
+        self.assertEqual(len(self.upstream.requests), 1)
+        self.assertEqual((service.hits, service.misses), (0, 1))
+        self.assertEqual(results[1]['rates'], {'GBP': 0.8})
+
+    async def test_cancelled_caller_does_not_cancel_the_request(self) -> None:
+        """Test other callers still get the shared result."""
+        service = ExchangeRateService(self.upstream)
+        self.upstream.release.clear()
+        first = asyncio.ensure_future(service.get_rates())
+        second = asyncio.ensure_future(service.get_rates())
+        await asyncio.sleep(0)
+        first.cancel()
+        self.upstream.release.set()
+        self.assertEqual((await second)['rates'], {'EUR': 0.9})
+        self.assertEqual(len(self.upstream.requests), 1)
+
+    async def test_errors_are_raised_and_not_cached(self) -> None:
+        """Test a failed request is retried by the next lookup."""
+        service = ExchangeRateService(self.upstream)
+        self.upstream.error = ValueError('down')
+        with self.assertRaises(ValueError):
+            await service.get_rates()
+        self.upstream.error = None
+        self.assertEqual((await service.get_rates())['rates'], {'EUR': 0.9})
+        self.assertEqual(len(self.upstream.requests), 2)
+
+
+class FrankfurterUpstreamTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for the FrankfurterUpstream client."""
+
+    async def test_fetch_requests_the_date_and_base(self) -> None:
+        """Test rates are fetched from the date's path with the base."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if request.url.path == '/bad':
+                return httpx.Response(200, json={'message': 'not found'})
+            return httpx.Response(200, json={'base': 'USD', 'rates': {}})
+
+        upstream = FrankfurterUpstream('http://rates.test/')
+        upstream._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        self.assertEqual(
+            await upstream.fetch('latest', 'USD'),
+            {'base': 'USD', 'rates': {}},
+        )
+        self.assertEqual(
+            str(requests[0].url), 'http://rates.test/latest?from=USD'
+        )
+        with self.assertRaises(ValueError):
+            await upstream.fetch('bad', 'USD')
+        await upstream.aclose()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from agents.lifespan import close_on_shutdown
+
+
+class CloseOnShutdownTest(unittest.TestCase):
+    """Tests for close_on_shutdown."""
+
+    def test_closes_in_order_on_shutdown(self) -> None:
+        """Test sync and async close functions run once the app stops."""
+        app = Starlette()
+        closed = []
+
+        async def close_session():
+            closed.append('session')
+
+        close_on_shutdown(app, close_session, lambda: closed.append('pool'))
+        with TestClient(app):
+            self.assertEqual(closed, [])
+        self.assertEqual(closed, ['session', 'pool'])
+
+    def test_failures_do_not_stop_the_others(self) -> None:
+        """Test a close function raising does not skip the next ones."""
+        app = Starlette()
+        closed = []
+
+        def fail():
+            raise OSError('gone')
+
+        close_on_shutdown(app, fail, lambda: closed.append('pool'))
+        with self.assertLogs('agents.lifespan', 'ERROR'), TestClient(app):
+            pass
+        self.assertEqual(closed, ['pool'])
+
+    def test_keeps_the_existing_lifespan(self) -> None:
+        """Test the app's own lifespan still runs around the close."""
+        app = Starlette()
+        events = []
+
+        lifespan = app.router.lifespan_context
+
+        def tracked(app):
+            events.append('startup')
+            return lifespan(app)
+
+        app.router.lifespan_context = tracked
+        close_on_shutdown(app, lambda: events.append('close'))
+        with TestClient(app):
+            pass
+        self.assertEqual(events, ['startup', 'close'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from agents.retrieval import BM25Index, merge_ranges, tokenize
+
+
+class TokenizeTest(unittest.TestCase):
+    """Tests for tokenize."""
+
+    def test_words_are_lowercased(self) -> None:
+        """Test text is split into lowercase words without punctuation."""
+        self.assertEqual(tokenize('Hello, World! 42'), ['hello', 'world', '42'])
+
+
+class BM25IndexTest(unittest.TestCase):
+    """Tests for the chunked BM25Index."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.lines = [f'filler line {i}' for i in range(50)]
+        self.lines[3] = 'attention is all you need'
+        self.lines[40] = 'attention heads and transformer layers'
+
+    def test_chunks_overlap(self) -> None:
+        """Test chunks cover every line and overlap by `overlap` lines."""
+        index = BM25Index(self.lines, chunk_lines=20, overlap=5)
+        self.assertEqual(index.chunks, [(0, 20), (15, 35), (30, 50)])
+
+    def test_short_document_is_one_chunk(self) -> None:
+        """Test documents shorter than a chunk are a single chunk."""
+        self.assertEqual(BM25Index(['a', 'b']).chunks, [(0, 2)])
+        self.assertEqual(BM25Index([]).chunks, [(0, 0)])
+
+    def test_search_ranks_chunks_by_relevance(self) -> None:
+        """Test the chunk matching more query terms ranks first."""
+        index = BM25Index(self.lines, chunk_lines=20, overlap=5)
+        self.assertEqual(
+            index.search('transformer attention', top_k=2),
+            [(30, 50), (0, 20)],
+        )
+
+    def test_unknown_terms_match_nothing(self) -> None:
+        """Test queries without indexed terms return no chunks."""
+        index = BM25Index(self.lines)
+        self.assertEqual(index.search('zebra'), [])
+        self.assertEqual(index.search(''), [])
+
+
+class MergeRangesTest(unittest.TestCase):
+    """Tests for merge_ranges."""
+
+    def test_overlapping_and_touching_ranges_are_joined(self) -> None:
+        """Test ranges are sorted and joined when they overlap or touch."""
+        self.assertEqual(
+            merge_ranges([(30, 40), (0, 10), (5, 15), (15, 20), (50, 60)]),
+            [(0, 20), (30, 40), (50, 60)],
+        )
+        self.assertEqual(merge_ranges([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
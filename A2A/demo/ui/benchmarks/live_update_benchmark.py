@@ -0,0 +1,155 @@
+"""Input latency of the UI while live updates are streamed.
+
+Mesop runs the events of a page one at a time, so an event handler that stays
+open delays every click and message sent after it. The benchmark simulates
+that channel as a queue served by a single worker. Live updates flow from the
+server's update stream while a message is appended every WRITE_INTERVAL
+seconds, user events arrive every CLICK_INTERVAL seconds, and the time user
+events wait before their handler starts is reported for:
+
+- handler: the stream is read by an event handler that stays open for the
+  whole run, as the Live mode used to do for 30 seconds at a time.
+- component: the stream is read outside the channel, as the update_stream
+  component does, and each update is applied by its own short event.
+
+run:
+  uv run python -m benchmarks.live_update_benchmark
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from common.types import Message, TextPart
+from fastapi import APIRouter
+from service.server.server import ConversationServer
+from service.types import (
+    StateUpdate,
+    SubscribeUpdatesParams,
+    SubscribeUpdatesResponse,
+)
+from state.host_agent_service import apply_state_update
+from state.state import AppState
+
+
+RUN_SECONDS = 5.0
+WRITE_INTERVAL = 0.05
+CLICK_INTERVAL = 0.1
+
+
+async def updates(
+    server: ConversationServer, conversation_id: str
+) -> AsyncIterator[StateUpdate]:
+    params = SubscribeUpdatesParams(
+        conversation_id=conversation_id, duration=RUN_SECONDS
+    )
+    async for event in server._stream_updates('live', params):
+        if event.startswith('data: '):
+            yield SubscribeUpdatesResponse(**json.loads(event[6:])).result
+
+
+async def write_messages(server: ConversationServer, conversation_id: str):
+    deadline = time.monotonic() + RUN_SECONDS
+    i = 0
+    while time.monotonic() < deadline:
+        server.store.add_conversation_message(
+            conversation_id,
+            Message(
+                role='agent',
+                parts=[TextPart(text=f'Message {i}')],
+                metadata={'message_id': f'm{i}'},
+            ),
+        )
+        i += 1
+        await asyncio.sleep(WRITE_INTERVAL)
+
+
+async def run(mode: str) -> tuple[list[float], int]:
+    """Run a mode, returning the waits of the user events and the updates."""
+    server = ConversationServer(APIRouter())
+    conversation_id = server.manager.create_conversation().conversation_id
+    state = AppState()
+    channel: asyncio.Queue[Callable[[], Awaitable[None]]] = asyncio.Queue()
+    waits: list[float] = []
+    applied = 0
+
+    async def serve():
+        while True:
+            handler = await channel.get()
+            await handler()
+
+    def user_event():
+        queued = time.monotonic()
+
+        async def handler():
+            waits.append(time.monotonic() - queued)
+
+        channel.put_nowait(handler)
+
+    def apply(update: StateUpdate):
+        async def handler():
+            nonlocal applied
+            apply_state_update(state, update)
+            applied += 1
+
+        return handler
+
+    async def stream_handler():
+        nonlocal applied
+        async for update in updates(server, conversation_id):
+            apply_state_update(state, update)
+            applied += 1
+
+    async def stream_component():
+        async for update in updates(server, conversation_id):
+            channel.put_nowait(apply(update))
+
+    worker = asyncio.create_task(serve())
+    if mode == 'handler':
+        channel.put_nowait(stream_handler)
+        stream = None
+    else:
+        stream = asyncio.create_task(stream_component())
+    writer = asyncio.create_task(write_messages(server, conversation_id))
+    while not writer.done():
+        user_event()
+        await asyncio.sleep(CLICK_INTERVAL)
+    if stream:
+        await stream
+    # Let the channel drain the events still queued.
+    done = asyncio.Event()
+    channel.put_nowait(lambda: asyncio.sleep(0, done.set()))
+    await done.wait()
+    worker.cancel()
+    server.shutdown()
+    return waits, applied
+
+
+async def main():
+    os.environ.setdefault('A2A_HOST', 'memory')
+    print(
+        f'{RUN_SECONDS:.0f} s of updates, a message every '
+        f'{WRITE_INTERVAL * 1000:.0f} ms, a user event every '
+        f'{CLICK_INTERVAL * 1000:.0f} ms'
+    )
+    print(
+        f'{"mode":>10} {"updates":>8} {"events":>7} {"mean wait ms":>13} '
+        f'{"p95 wait ms":>12} {"max wait ms":>12}'
+    )
+    for mode in ['handler', 'component']:
+        waits, applied = await run(mode)
+        waits.sort()
+        print(
+            f'{mode:>10} {applied:>8} {len(waits):>7} '
+            f'{statistics.mean(waits) * 1000:>13.1f} '
+            f'{waits[int(len(waits) * 0.95)] * 1000:>12.1f} '
+            f'{waits[-1] * 1000:>12.1f}'
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
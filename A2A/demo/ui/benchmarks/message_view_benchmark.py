@@ -0,0 +1,117 @@
+"""Microbenchmark for listing conversation messages that carry files.
+
+Compares the per-poll walk that cache_content used to do over the whole
+conversation history against the message views the store computes once at
+ingestion, for conversations of growing size where every other message holds
+an image. The views are listed both in full and incrementally with a cursor,
+which is what the UI polls with once it has caught up.
+
+run:
+  uv run python -m benchmarks.message_view_benchmark
+"""
+
+import base64
+import os
+import timeit
+import uuid
+
+from common.types import FileContent, FilePart, Message, TextPart
+from service.server.file_cache import FileCache
+from service.server.store import InMemoryStore
+from service.types import Conversation
+
+
+SIZES = [1_000, 5_000, 10_000]
+IMAGE_BYTES = 16 * 1024
+POLLS = 20
+
+
+def make_message(conversation_id: str, i: int) -> Message:
+    parts = [TextPart(text=f'Message {i}')]
+    if i % 2:
+        parts.append(
+            FilePart(
+                file=FileContent(
+                    mimeType='image/png',
+                    bytes=base64.b64encode(os.urandom(IMAGE_BYTES)).decode(),
+                )
+            )
+        )
+    return Message(
+        role='agent',
+        parts=parts,
+        metadata={
+            'conversation_id': conversation_id,
+            'message_id': str(uuid.uuid4()),
+        },
+    )
+
+
+class PerPollWalk:
+    """The file part rewriting cache_content did on every /message/list."""
+
+    def __init__(self):
+        self._file_cache = {}
+        self._message_to_cache = {}
+
+    def cache_content(self, messages: list[Message]) -> list[Message]:
+        rval = []
+        for m in messages:
+            message_id = m.metadata['message_id']
+            new_parts = []
+            for i, part in enumerate(m.parts):
+                if part.type != 'file':
+                    new_parts.append(part)
+                    continue
+                message_part_id = f'{message_id}:{i}'
+                if message_part_id in self._message_to_cache:
+                    cache_id = self._message_to_cache[message_part_id]
+                else:
+                    cache_id = str(uuid.uuid4())
+                    self._message_to_cache[message_part_id] = cache_id
+                new_parts.append(
+                    FilePart(
+                        file=FileContent(
+                            mimeType=part.file.mimeType,
+                            uri=f'/message/file/{cache_id}',
+                        )
+                    )
+                )
+                if cache_id not in self._file_cache:
+                    self._file_cache[cache_id] = part
+            m.parts = new_parts
+            rval.append(m)
+        return rval
+
+
+def bench(size: int) -> tuple[float, float, float]:
+    walk = PerPollWalk()
+    store = InMemoryStore(message_view=FileCache().message_view)
+    store.add_conversation(Conversation(conversation_id='c1', is_active=True))
+    messages = [make_message('c1', i) for i in range(size)]
+    for message in messages:
+        store.add_conversation_message('c1', message.model_copy())
+    cursor = store.list_messages('c1', views=True).cursor
+
+    def time_ms(fn) -> float:
+        return min(timeit.repeat(fn, number=POLLS, repeat=3)) / POLLS * 1e3
+
+    return (
+        time_ms(lambda: walk.cache_content(messages)),
+        time_ms(lambda: store.list_messages('c1', views=True)),
+        time_ms(lambda: store.list_messages('c1', cursor, views=True)),
+    )
+
+
+def main():
+    print(
+        f'{"messages":>8} {"walk ms/poll":>13} {"views ms/poll":>14}'
+        f' {"delta ms/poll":>14}'
+    )
+    for size in SIZES:
+        walk, views, delta = bench(size)
+        print(f'{size:>8} {walk:>13.3f} {views:>14.3f} {delta:>14.4f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Microbenchmark for the task callback path of the application store.
+
+Compares the indexed InMemoryStore against the list scans it replaced, for a
+growing number of stored tasks. The per-callback cost of the store should stay
+flat while the list based lookups grow linearly.
+
+run:
+  uv run python -m benchmarks.store_benchmark
+"""
+
+import timeit
+import uuid
+
+from common.types import Message, Task, TaskState, TaskStatus, TextPart
+from service.server.store import InMemoryStore
+
+
+SIZES = [100, 1_000, 10_000]
+TASKS_PER_CONVERSATION = 10
+CALLBACKS = 1_000
+
+
+def make_task(task_id: str, conversation_id: str) -> Task:
+    message = Message(
+        role='agent',
+        parts=[TextPart(text='Working...')],
+        metadata={
+            'conversation_id': conversation_id,
+            'message_id': str(uuid.uuid4()),
+        },
+    )
+    return Task(
+        id=task_id,
+        sessionId=conversation_id,
+        status=TaskStatus(state=TaskState.WORKING, message=message),
+        history=[message],
+    )
+
+
+class ListStore:
+    """The list based lookups used by the managers before InMemoryStore."""
+
+    def __init__(self):
+        self._tasks: list[Task] = []
+        self._task_map: dict[str, str] = {}
+
+    def add_task(self, task: Task):
+        self._tasks.append(task)
+
+    def upsert_task(self, task: Task):
+        for i, t in enumerate(self._tasks):
+            if t.id == task.id:
+                self._tasks[i] = task
+                return
+        self._tasks.append(task)
+
+    def get_task(self, task_id: str) -> Task | None:
+        return next(filter(lambda x: x.id == task_id, self._tasks), None)
+
+    def attach_message_to_task(self, message_id: str, task_id: str):
+        self._task_map[message_id] = task_id
+
+    def get_task_for_message(self, message_id: str) -> Task | None:
+        if message_id not in self._task_map:
+            return None
+        return self.get_task(self._task_map[message_id])
+
+
+def populate(store, size: int) -> list[Task]:
+    tasks = [
+        make_task(
+            str(uuid.uuid4()), f'conversation-{i // TASKS_PER_CONVERSATION}'
+        )
+        for i in range(size)
+    ]
+    for task in tasks:
+        if isinstance(store, ListStore):
+            store.add_task(task)
+        else:
+            store.upsert_task(task)
+        store.attach_message_to_task(
+            task.status.message.metadata['message_id'], task.id
+        )
+    return tasks
+
+
+def run_callbacks(store, tasks: list[Task]):
+    """Replays the lookups done by ADKHostManager.task_callback.
+
+    Callbacks hit the most recently created tasks, as that is where remote
+    agents are still reporting progress.
+    """
+    for task in tasks[-CALLBACKS:]:
+        current_task = store.get_task(task.id)
+        store.attach_message_to_task(
+            current_task.status.message.metadata['message_id'],
+            current_task.id,
+        )
+        store.upsert_task(current_task)
+        store.get_task_for_message(
+            current_task.status.message.metadata['message_id']
+        )
+
+
+def bench(store_factory, size: int) -> float:
+    store = store_factory()
+    tasks = populate(store, size)
+    seconds = min(
+        timeit.repeat(lambda: run_callbacks(store, tasks), number=1, repeat=3)
+    )
+    return seconds / min(CALLBACKS, size) * 1e6
+
+
+def main():
+    print(f'{"tasks":>8} {"indexed us/cb":>14} {"list us/cb":>12}')
+    for size in SIZES:
+        indexed = bench(InMemoryStore, size)
+        scanned = bench(ListStore, size)
+        print(f'{size:>8} {indexed:>14.2f} {scanned:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -64,7 +64,7 @@ async def send_message(message: str, message_id: str = ''):
         None,
     )
     if conversation:
-        conversation.message_ids.append(state_message.message_id)
+        conversation.message_count += 1
     response = await SendMessage(request)
 
 
@@ -1,7 +1,12 @@
 import mesop as me
 import mesop.labs as mel
 
-from state.host_agent_service import UpdateAppState
+from service.types import StateUpdate
+from state.host_agent_service import (
+    UpdateAppState,
+    apply_state_update,
+    select_conversation,
+)
 from state.state import AppState
 from styles.styles import (
     MAIN_COLUMN_STYLE,
@@ -13,6 +18,16 @@ from styles.styles import (
 
 from .async_poller import AsyncAction, async_poller
 from .side_nav import sidenav
+from .update_stream import update_stream
+
+
+def apply_update(e: mel.WebEvent):
+    """Apply a state update pushed by the server event handler"""
+    app_state = me.state(AppState)
+    update = StateUpdate(**e.value)
+    if update.conversation_id:
+        select_conversation(app_state, update.conversation_id)
+    apply_state_update(app_state, update)
 
 
 async def refresh_app_state(e: mel.WebEvent):  # pylint: disable=unused-argument
@@ -27,14 +42,28 @@ async def refresh_app_state(e: mel.WebEvent):  # pylint: disable=unused-argument
 def page_scaffold():
     """Page scaffold component"""
     app_state = me.state(AppState)
-    action = (
-        AsyncAction(
-            value=app_state, duration_seconds=app_state.polling_interval
+    if app_state.live_updates:
+        conversation_id = app_state.current_conversation_id
+        update_stream(
+            update_event=apply_update,
+            conversation_id=conversation_id,
+            messages_since=app_state.messages_cursor
+            if app_state.messages_conversation_id == conversation_id
+            else 0,
+            conversations_since=app_state.conversations_cursor,
+            tasks_since=app_state.tasks_cursor,
+            # A new stream is opened when another conversation is shown.
+            key=f'live_updates_{conversation_id}',
+        )
+    else:
+        action = (
+            AsyncAction(
+                value=app_state, duration_seconds=app_state.polling_interval
+            )
+            if app_state
+            else None
         )
-        if app_state
-        else None
-    )
-    async_poller(action=action, trigger_event=refresh_app_state)
+        async_poller(action=action, trigger_event=refresh_app_state)
 
     sidenav('')
 
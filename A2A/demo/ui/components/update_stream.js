@@ -0,0 +1,95 @@
+import {
+  LitElement,
+  html,
+} from 'https://cdn.jsdelivr.net/gh/lit/dist@3/core/lit-core.min.js';
+
+// Seconds to wait before reopening a stream that failed or was closed.
+const RETRY_SECONDS = 2;
+
+class UpdateStream extends LitElement {
+  static properties = {
+    updateEvent: {type: String},
+    params: {type: Object},
+  };
+
+  render() {
+    return html`<div></div>`;
+  }
+
+  connectedCallback() {
+    super.connectedCallback();
+    this.controller = new AbortController();
+    this.subscribe(this.controller.signal);
+  }
+
+  disconnectedCallback() {
+    super.disconnectedCallback();
+    this.controller.abort();
+  }
+
+  // The stream is read here rather than in a Mesop event handler, which
+  // would hold up every other event of the page while it is open. Only the
+  // updates are sent to Mesop, each as a short event.
+  async subscribe(signal) {
+    await this.updateComplete;
+    const params = {...this.params};
+    while (!signal.aborted) {
+      try {
+        const response = await fetch('/updates/subscribe', {
+          method: 'POST',
+          headers: {'Content-Type': 'application/json'},
+          body: JSON.stringify({
+            jsonrpc: '2.0',
+            id: crypto.randomUUID(),
+            method: 'updates/subscribe',
+            params: params,
+          }),
+          signal: signal,
+        });
+        // An error body is not a stream of updates, retry instead.
+        if (!response.ok) {
+          throw new Error(`Update stream failed: ${response.status}`);
+        }
+        const reader = response.body
+          .pipeThrough(new TextDecoderStream())
+          .getReader();
+        let buffer = '';
+        while (true) {
+          const {value, done} = await reader.read();
+          if (done) {
+            break;
+          }
+          buffer += value;
+          let end;
+          while ((end = buffer.indexOf('\n\n')) >= 0) {
+            const event = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+            // Anything else is a keep-alive comment.
+            if (event.startsWith('data: ')) {
+              this.dispatchUpdate(params, JSON.parse(event.slice(6)).result);
+            }
+          }
+        }
+      } catch (e) {
+        if (signal.aborted) {
+          return;
+        }
+      }
+      await new Promise((resolve) => {
+        setTimeout(resolve, RETRY_SECONDS * 1000);
+      });
+    }
+  }
+
+  dispatchUpdate(params, update) {
+    // Reopened streams carry on from the last update received.
+    if (params.conversation_id) {
+      params.messages_since = update.messages_cursor;
+    }
+    params.conversations_since = update.conversations_cursor;
+    params.tasks_since = update.tasks_cursor;
+    this.dispatchEvent(new MesopEvent(this.updateEvent, update));
+  }
+}
+
+customElements.define('update-stream-component', UpdateStream);
@@ -0,0 +1,42 @@
+from collections.abc import Callable
+from typing import Any
+
+import mesop.labs as mel
+
+
+@mel.web_component(path='./update_stream.js')
+def update_stream(
+    *,
+    update_event: Callable[[mel.WebEvent], Any],
+    conversation_id: str = '',
+    messages_since: int = 0,
+    conversations_since: int = 0,
+    tasks_since: int = 0,
+    key: str | None = None,
+):
+    """Creates an invisible component streaming the state updates of the server.
+
+    The component subscribes to /updates/subscribe from the browser, starting
+    after the given cursors, and triggers `update_event` with each update as
+    its value. The stream stays open while the component is rendered and is
+    reopened if it drops, so event handlers only ever run for the short time
+    it takes to apply an update.
+
+    Returns:
+      The web component that was created.
+    """
+    return mel.insert_web_component(
+        name='update-stream-component',
+        key=key,
+        events={
+            'updateEvent': update_event,
+        },
+        properties={
+            'params': {
+                'conversation_id': conversation_id,
+                'messages_since': messages_since if conversation_id else 0,
+                'conversations_since': conversations_since,
+                'tasks_since': tasks_since,
+            },
+        },
+    )
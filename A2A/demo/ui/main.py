@@ -3,6 +3,7 @@ run:
   uv main.py
 """
 
+import contextlib
 import os
 
 import mesop as me
@@ -134,8 +135,15 @@ def task_page():
     task_list_page(me.state(AppState))
 
 
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    agent_server.shutdown()
+    await host_agent_service.CloseClient()
+
+
 # Setup the server global objects
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 router = APIRouter()
 agent_server = ConversationServer(router)
 app.include_router(router)
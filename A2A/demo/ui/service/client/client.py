@@ -1,3 +1,5 @@
+import asyncio
+import importlib.util
 import json
 
 from typing import Any
@@ -11,7 +13,10 @@ from service.types import (
     CreateConversationResponse,
     GetEventRequest,
     GetEventResponse,
+    GetMetricsRequest,
+    GetMetricsResponse,
     JSONRPCRequest,
+    JSONRPCResponse,
     ListAgentRequest,
     ListAgentResponse,
     ListConversationRequest,
@@ -29,9 +34,79 @@ from service.types import (
 )
 
 
+# Response types of the methods that can be sent in a batch.
+BATCH_RESPONSE_TYPES: dict[str, type[JSONRPCResponse]] = {
+    'conversation/list': ListConversationResponse,
+    'events/get': GetEventResponse,
+    'message/list': ListMessageResponse,
+    'message/pending': PendingMessageResponse,
+    'task/list': ListTaskResponse,
+    'agent/list': ListAgentResponse,
+    'metrics/get': GetMetricsResponse,
+}
+
+
 class ConversationClient:
-    def __init__(self, base_url):
+    """Client for the ConversationServer JSON-RPC routes.
+
+    Requests share one pooled `httpx.AsyncClient` that keeps connections alive
+    between calls and negotiates HTTP/2 when the `h2` package is installed.
+    The pool is created lazily on first use and bound to the event loop it
+    was created on, call `aclose` to release it.
+
+    When `loop` is given, requests made from other event loops are executed
+    on it, so callers on short-lived loops can share one pool. Streaming
+    subscriptions always run on the caller's loop.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: httpx.Timeout | float = 5.0,
+        limits: httpx.Limits | None = None,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ):
         self.base_url = base_url.rstrip('/')
+        self.loop = loop
+        self._timeout = timeout
+        self._limits = limits or httpx.Limits(
+            max_connections=20, max_keepalive_connections=10
+        )
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self._timeout,
+                limits=self._limits,
+                http2=importlib.util.find_spec('h2') is not None,
+            )
+        return self._client
+
+    def _on_other_loop(self) -> bool:
+        return (
+            self.loop is not None
+            and self.loop is not asyncio.get_running_loop()
+        )
+
+    async def _run_on_loop(self, coroutine):
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        )
+
+    async def aclose(self):
+        if self._on_other_loop():
+            return await self._run_on_loop(self.aclose())
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> 'ConversationClient':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
 
     async def send_message(
         self, payload: SendMessageRequest
@@ -39,20 +114,42 @@ class ConversationClient:
         return SendMessageResponse(**await self._send_request(payload))
 
     async def _send_request(self, request: JSONRPCRequest) -> dict[str, Any]:
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    self.base_url + '/' + request.method,
-                    json=request.model_dump(),
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                raise AgentClientHTTPError(
-                    e.response.status_code, str(e)
-                ) from e
-            except json.JSONDecodeError as e:
-                raise AgentClientJSONError(str(e)) from e
+        return await self._post(request.method, request.model_dump())
+
+    async def _post(self, path: str, payload: Any) -> Any:
+        if self._on_other_loop():
+            return await self._run_on_loop(self._post(path, payload))
+        try:
+            response = await self.client.post(
+                self.base_url + '/' + path, json=payload
+            )
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            raise AgentClientHTTPError(e.response.status_code, str(e)) from e
+        except json.JSONDecodeError as e:
+            raise AgentClientJSONError(str(e)) from e
+
+    async def batch(
+        self, payloads: list[JSONRPCRequest]
+    ) -> list[JSONRPCResponse]:
+        """Send several list requests in one round trip.
+
+        Only the methods in BATCH_RESPONSE_TYPES are accepted. The responses
+        are returned in the order of the requests.
+        """
+        for payload in payloads:
+            if payload.method not in BATCH_RESPONSE_TYPES:
+                raise ValueError(f'{payload.method} cannot be batched')
+        results = await self._post('batch', [x.model_dump() for x in payloads])
+        by_id = {x.get('id'): x for x in results}
+        responses = []
+        for payload in payloads:
+            if payload.id not in by_id:
+                raise AgentClientJSONError(f'No response for {payload.id}')
+            response_type = BATCH_RESPONSE_TYPES[payload.method]
+            responses.append(response_type(**by_id[payload.id]))
+        return responses
 
     async def create_conversation(
         self, payload: CreateConversationRequest
@@ -87,3 +184,8 @@ class ConversationClient:
 
     async def list_agents(self, payload: ListAgentRequest) -> ListAgentResponse:
         return ListAgentResponse(**await self._send_request(payload))
+
+    async def get_metrics(
+        self, payload: GetMetricsRequest
+    ) -> GetMetricsResponse:
+        return GetMetricsResponse(**await self._send_request(payload))
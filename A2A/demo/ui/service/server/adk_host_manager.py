@@ -1,5 +1,6 @@
 import base64
 import datetime
+import functools
 import json
 import os
 import uuid
@@ -19,19 +20,19 @@ from common.types import (
     TextPart,
 )
 from google.adk import Runner
-from google.adk.artifacts import InMemoryArtifactService
 from google.adk.events.event import Event as ADKEvent
 from google.adk.events.event_actions import EventActions as ADKEventActions
-from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
-from google.adk.sessions.in_memory_session_service import InMemorySessionService
 from google.genai import types
 from hosts.multiagent.host_agent import HostAgent
 from hosts.multiagent.remote_agent_connection import (
     TaskCallbackArg,
 )
+from service.server.adk_storage import ADKServices, create_adk_services
 from service.server.application_manager import ApplicationManager
+from service.server.artifact_assembler import ArtifactAssembler
+from service.server.store import InMemoryStore, get_message_id
 from service.types import Conversation, Event
-from utils.agent_card import get_agent_card
+from utils.agent_card import get_agent_cards_for_registration
 
 
 class ADKHostManager(ApplicationManager):
@@ -42,25 +43,25 @@ class ADKHostManager(ApplicationManager):
     uses to send messages to the agent and provide information for the frontend.
     """
 
-    _conversations: list[Conversation]
-    _messages: list[Message]
-    _tasks: list[Task]
-    _events: dict[str, Event]
-    _pending_message_ids: list[str]
+    _store: InMemoryStore
     _agents: list[AgentCard]
-    _task_map: dict[str, str]
-
-    def __init__(self, api_key: str = '', uses_vertex_ai: bool = False):
-        self._conversations = []
-        self._messages = []
-        self._tasks = []
-        self._events = {}
-        self._pending_message_ids = []
+
+    def __init__(
+        self,
+        api_key: str = '',
+        uses_vertex_ai: bool = False,
+        store: InMemoryStore | None = None,
+        artifact_assembler: ArtifactAssembler | None = None,
+        services: ADKServices | None = None,
+    ):
+        self._store = store or InMemoryStore()
         self._agents = []
-        self._artifact_chunks = {}
-        self._session_service = InMemorySessionService()
-        self._artifact_service = InMemoryArtifactService()
-        self._memory_service = InMemoryMemoryService()
+        self._artifact_assembler = artifact_assembler or ArtifactAssembler()
+        # Storage backends selected by A2A_ADK_STORAGE unless given.
+        self._services = services or create_adk_services()
+        self._session_service = self._services.session_service
+        self._artifact_service = self._services.artifact_service
+        self._memory_service = self._services.memory_service
         self._host_agent = HostAgent([], self.task_callback)
         self.user_id = 'test_user'
         self.app_name = 'A2A'
@@ -81,10 +82,86 @@ class ADKHostManager(ApplicationManager):
 
         self._initialize_host()
 
-        # Map of message id to task id
-        self._task_map = {}
         # Map to manage 'lost' message ids until protocol level id is introduced
         self._next_id = {}  # dict[str, str]: previous message to next message
+        self._restore_conversations()
+
+    def shutdown(self):
+        self._services.close()
+
+    def _restore_conversations(self):
+        """List the conversations kept by persistent session storage.
+
+        Only the conversations are added, their messages are loaded from the
+        session events the first time each conversation is read.
+        """
+        sessions = self._session_service.list_sessions(
+            app_name=self.app_name, user_id=self.user_id
+        ).sessions
+        for session in sessions:
+            self._store.add_conversation(
+                Conversation(conversation_id=session.id, is_active=True),
+                load_messages=functools.partial(
+                    self._load_conversation_messages, session.id
+                ),
+            )
+
+    def _load_conversation_messages(
+        self, conversation_id: str
+    ) -> list[Message]:
+        """Rebuild the messages of a conversation from its session events.
+
+        Each user message is followed by the last event with content of the
+        run it started, which is the response that was added to the
+        conversation. The metadata of a user message is recovered from the
+        state update that preceded it.
+        """
+        session = self._session_service.get_session(
+            app_name=self.app_name,
+            user_id=self.user_id,
+            session_id=conversation_id,
+        )
+        if not session:
+            return []
+        messages = []
+        metadata: dict = {'conversation_id': conversation_id}
+        response: ADKEvent | None = None
+
+        def add_response():
+            if not response:
+                return
+            message = self.adk_content_to_message(
+                response.content, conversation_id
+            )
+            message.role = 'agent'
+            message.metadata = {
+                **metadata,
+                'last_message_id': metadata.get('message_id'),
+                'message_id': response.id,
+            }
+            messages.append(message)
+
+        for event in session.events:
+            state_delta = event.actions.state_delta if event.actions else None
+            if state_delta and 'input_message_metadata' in state_delta:
+                add_response()
+                response = None
+                metadata = state_delta['input_message_metadata'] or metadata
+            elif event.author == 'user' and event.content:
+                add_response()
+                response = None
+                message = self.adk_content_to_message(
+                    event.content, conversation_id
+                )
+                message.metadata = {
+                    **metadata,
+                    'message_id': metadata.get('message_id') or event.id,
+                }
+                messages.append(message)
+            elif event.content:
+                response = event
+        add_response()
+        return messages
 
     def update_api_key(self, api_key: str):
         """Update the API key and reinitialize the host if needed"""
@@ -113,7 +190,7 @@ class ADKHostManager(ApplicationManager):
         )
         conversation_id = session.id
         c = Conversation(conversation_id=conversation_id, is_active=True)
-        self._conversations.append(c)
+        self._store.add_conversation(c)
         return c
 
     def sanitize_message(self, message: Message) -> Message:
@@ -136,10 +213,10 @@ class ADKHostManager(ApplicationManager):
         return message
 
     async def process_message(self, message: Message):
-        self._messages.append(message)
+        self._store.add_message(message)
         message_id = get_message_id(message)
         if message_id:
-            self._pending_message_ids.append(message_id)
+            self._store.add_pending_message(message_id)
         conversation_id = (
             message.metadata['conversation_id']
             if 'conversation_id' in message.metadata
@@ -148,7 +225,7 @@ class ADKHostManager(ApplicationManager):
         # Now check the conversation and attach the message id.
         conversation = self.get_conversation(conversation_id)
         if conversation:
-            conversation.messages.append(message)
+            self._store.add_conversation_message(conversation_id, message)
         self.add_event(
             Event(
                 id=str(uuid.uuid4()),
@@ -168,20 +245,9 @@ class ADKHostManager(ApplicationManager):
             'session_id': conversation_id,
         }
         last_message_id = get_last_message_id(message)
-        if (
-            last_message_id
-            and last_message_id in self._task_map
-            and task_still_open(
-                next(
-                    filter(
-                        lambda x: x.id == self._task_map[last_message_id],
-                        self._tasks,
-                    ),
-                    None,
-                )
-            )
-        ):
-            state_update['task_id'] = self._task_map[last_message_id]
+        last_task = self._store.get_task_for_message(last_message_id)
+        if task_still_open(last_task):
+            state_update['task_id'] = last_task.id
         # Need to upsert session state now, only way is to append an event.
         self._session_service.append_event(
             session,
@@ -226,26 +292,27 @@ class ADKHostManager(ApplicationManager):
                 'last_message_id': last_message_id,
                 'message_id': new_message_id,
             }
-            self._messages.append(response)
+            self._store.add_message(response)
 
-        if conversation:
-            conversation.messages.append(response)
-        self._pending_message_ids.remove(message_id)
+        if conversation and response:
+            self._store.add_conversation_message(conversation_id, response)
+        self._store.remove_pending_message(message_id)
 
     def add_task(self, task: Task):
-        self._tasks.append(task)
+        self._store.upsert_task(task)
 
     def update_task(self, task: Task):
-        for i, t in enumerate(self._tasks):
-            if t.id == task.id:
-                self._tasks[i] = task
-                return
+        if self._store.has_task(task.id):
+            self._store.upsert_task(task)
 
     def task_callback(self, task: TaskCallbackArg, agent_card: AgentCard):
         self.emit_event(task, agent_card)
         if isinstance(task, TaskStatusUpdateEvent):
             current_task = self.add_or_get_task(task)
             current_task.status = task.status
+            if task.final:
+                # No more chunks will follow, drop any incomplete artifacts.
+                self._artifact_assembler.discard_task(task.id)
             self.attach_message_to_task(task.status.message, current_task.id)
             self.insert_message_history(current_task, task.status.message)
             self.update_task(current_task)
@@ -257,7 +324,7 @@ class ADKHostManager(ApplicationManager):
             self.update_task(current_task)
             return current_task
         # Otherwise this is a Task, either new or updated
-        if not any(filter(lambda x: x.id == task.id, self._tasks)):
+        if not self._store.has_task(task.id):
             self.attach_message_to_task(task.status.message, task.id)
             self.insert_id_trace(task.status.message)
             self.add_task(task)
@@ -316,7 +383,9 @@ class ADKHostManager(ApplicationManager):
 
     def attach_message_to_task(self, message: Message | None, task_id: str):
         if message and message.metadata and 'message_id' in message.metadata:
-            self._task_map[message.metadata['message_id']] = task_id
+            self._store.attach_message_to_task(
+                message.metadata['message_id'], task_id
+            )
 
     def insert_id_trace(self, message: Message | None):
         if not message:
@@ -346,9 +415,7 @@ class ADKHostManager(ApplicationManager):
             )
 
     def add_or_get_task(self, task: TaskCallbackArg):
-        current_task = next(
-            filter(lambda x: x.id == task.id, self._tasks), None
-        )
+        current_task = self._store.get_task(task.id)
         if not current_task:
             conversation_id = None
             if task.metadata and 'conversation_id' in task.metadata:
@@ -370,83 +437,33 @@ class ADKHostManager(ApplicationManager):
     def process_artifact_event(
         self, current_task: Task, task_update_event: TaskArtifactUpdateEvent
     ):
-        artifact = task_update_event.artifact
-        if not artifact.append:
-            # received the first chunk or entire payload for an artifact
-            if artifact.lastChunk is None or artifact.lastChunk:
-                # lastChunk bit is missing or is set to true, so this is the entire payload
-                # add this to artifacts
-                if not current_task.artifacts:
-                    current_task.artifacts = []
-                current_task.artifacts.append(artifact)
-            else:
-                # this is a chunk of an artifact, stash it in temp store for assembling
-                if task_update_event.id not in self._artifact_chunks:
-                    self._artifact_chunks[task_update_event.id] = {}
-                self._artifact_chunks[task_update_event.id][artifact.index] = (
-                    artifact
-                )
-        else:
-            # we received an append chunk, add to the existing temp artifact
-            current_temp_artifact = self._artifact_chunks[task_update_event.id][
-                artifact.index
-            ]
-            # TODO handle if current_temp_artifact is missing
-            current_temp_artifact.parts.extend(artifact.parts)
-            if artifact.lastChunk:
-                current_task.artifacts.append(current_temp_artifact)
-                del self._artifact_chunks[task_update_event.id][artifact.index]
+        artifact = self._artifact_assembler.add(
+            task_update_event.id, task_update_event.artifact
+        )
+        if not artifact:
+            # A chunk of an artifact that is still being streamed.
+            return
+        if not current_task.artifacts:
+            current_task.artifacts = []
+        current_task.artifacts.append(artifact)
 
     def add_event(self, event: Event):
-        self._events[event.id] = event
+        self._store.add_event(event)
 
     def get_conversation(
         self, conversation_id: str | None
     ) -> Conversation | None:
-        if not conversation_id:
-            return None
-        return next(
-            filter(
-                lambda c: c.conversation_id == conversation_id,
-                self._conversations,
-            ),
-            None,
-        )
+        return self._store.get_conversation(conversation_id)
 
     def get_pending_messages(self) -> list[tuple[str, str]]:
-        rval = []
-        for message_id in self._pending_message_ids:
-            if message_id in self._task_map:
-                task_id = self._task_map[message_id]
-                task = next(
-                    filter(lambda x: x.id == task_id, self._tasks), None
-                )
-                if not task:
-                    rval.append((message_id, ''))
-                elif task.history and task.history[-1].parts:
-                    if len(task.history) == 1:
-                        rval.append((message_id, 'Working...'))
-                    else:
-                        part = task.history[-1].parts[0]
-                        rval.append(
-                            (
-                                message_id,
-                                part.text
-                                if part.type == 'text'
-                                else 'Working...',
-                            )
-                        )
-            else:
-                rval.append((message_id, ''))
-        return rval
-
-    def register_agent(self, url):
-        agent_data = get_agent_card(url)
-        if not agent_data.url:
-            agent_data.url = url
-        self._agents.append(agent_data)
-        self._host_agent.register_agent_card(agent_data)
-        # Now update the host agent definition
+        return self._store.get_pending_messages()
+
+    async def register_agent(self, url: str | list[str]):
+        agent_cards = await get_agent_cards_for_registration(url)
+        for agent_card in agent_cards:
+            self._agents.append(agent_card)
+            self._host_agent.register_agent_card(agent_card)
+        # Now update the host agent definition, once for the whole batch
         self._initialize_host()
 
     @property
@@ -455,15 +472,15 @@ class ADKHostManager(ApplicationManager):
 
     @property
     def conversations(self) -> list[Conversation]:
-        return self._conversations
+        return self._store.conversations
 
     @property
     def tasks(self) -> list[Task]:
-        return self._tasks
+        return self._store.tasks
 
     @property
     def events(self) -> list[Event]:
-        return sorted(self._events.values(), key=lambda x: x.timestamp)
+        return self._store.events
 
     def adk_content_from_message(self, message: Message) -> types.Content:
         parts: list[types.Part] = []
@@ -591,12 +608,6 @@ class ADKHostManager(ApplicationManager):
         return parts
 
 
-def get_message_id(m: Message | None) -> str | None:
-    if not m or not m.metadata or 'message_id' not in m.metadata:
-        return None
-    return m.metadata['message_id']
-
-
 def get_last_message_id(m: Message | None) -> str | None:
     if not m or not m.metadata or 'last_message_id' not in m.metadata:
         return None
@@ -0,0 +1,577 @@
+import collections
+import copy
+import dataclasses
+import json
+import os
+import threading
+import time
+import uuid
+
+from typing import Any
+
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.artifacts.base_artifact_service import BaseArtifactService
+from google.adk.events.event import Event as ADKEvent
+from google.adk.memory.base_memory_service import (
+    BaseMemoryService,
+    MemoryResult,
+    SearchMemoryResponse,
+)
+from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
+from google.adk.sessions.base_session_service import (
+    BaseSessionService,
+    GetSessionConfig,
+    ListEventsResponse,
+    ListSessionsResponse,
+)
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.adk.sessions.session import Session
+from google.adk.sessions.state import State
+from google.genai import types
+from service.server.database import SqliteDatabase
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    last_update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, position)
+);
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    part TEXT NOT NULL,
+    PRIMARY KEY (path, version)
+);
+CREATE TABLE IF NOT EXISTS memories (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, position)
+);
+"""
+
+
+class SqliteSessionService(BaseSessionService):
+    """Session service persisting sessions and their events to SQLite.
+
+    Up to `cache_size` recently used sessions are kept in memory, others are
+    loaded from the database when next requested. Events are appended to the
+    database through the batched writes of SqliteDatabase.
+    """
+
+    def __init__(self, db: SqliteDatabase, cache_size: int = 64):
+        self._db = db
+        self._cache_size = cache_size
+        self._lock = threading.RLock()
+        # Least recently used first.
+        self._sessions: collections.OrderedDict[
+            tuple[str, str, str], Session
+        ] = collections.OrderedDict()
+        self._app_state: dict[str, dict[str, Any]] = {
+            app_name: json.loads(state)
+            for app_name, state in db.query(
+                'SELECT app_name, state FROM app_states'
+            )
+        }
+        self._user_state: dict[tuple[str, str], dict[str, Any]] = {
+            (app_name, user_id): json.loads(state)
+            for app_name, user_id, state in db.query(
+                'SELECT app_name, user_id, state FROM user_states'
+            )
+        }
+
+    def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: dict[str, Any] | None = None,
+        session_id: str | None = None,
+    ) -> Session:
+        session_id = (
+            session_id.strip()
+            if session_id and session_id.strip()
+            else str(uuid.uuid4())
+        )
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=state or {},
+            last_update_time=time.time(),
+        )
+        with self._lock:
+            self._cache((app_name, user_id, session_id), session)
+            self._write_session(session)
+            return self._copy(session)
+
+    def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: GetSessionConfig | None = None,
+    ) -> Session | None:
+        with self._lock:
+            session = self._get(app_name, user_id, session_id)
+            if not session:
+                return None
+            copied_session = self._copy(session)
+        if config:
+            if config.num_recent_events:
+                copied_session.events = copied_session.events[
+                    -config.num_recent_events :
+                ]
+            elif config.after_timestamp:
+                copied_session.events = [
+                    x
+                    for x in copied_session.events
+                    if x.timestamp >= config.after_timestamp
+                ]
+        return copied_session
+
+    def list_sessions(
+        self, *, app_name: str, user_id: str
+    ) -> ListSessionsResponse:
+        rows = self._db.query(
+            'SELECT id, last_update_time FROM sessions'
+            ' WHERE app_name = ? AND user_id = ? ORDER BY last_update_time',
+            (app_name, user_id),
+        )
+        return ListSessionsResponse(
+            sessions=[
+                Session(
+                    app_name=app_name,
+                    user_id=user_id,
+                    id=session_id,
+                    last_update_time=last_update_time,
+                )
+                for session_id, last_update_time in rows
+            ]
+        )
+
+    def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            self._sessions.pop(key, None)
+            self._db.write(
+                'DELETE FROM sessions WHERE app_name = ? AND user_id = ?'
+                ' AND id = ?',
+                key,
+            )
+            self._db.write(
+                'DELETE FROM events WHERE app_name = ? AND user_id = ?'
+                ' AND session_id = ?',
+                key,
+            )
+
+    def list_events(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+    ) -> ListEventsResponse:
+        with self._lock:
+            session = self._get(app_name, user_id, session_id)
+            return ListEventsResponse(
+                events=list(session.events) if session else []
+            )
+
+    def append_event(self, session: Session, event: ADKEvent) -> ADKEvent:
+        # Update the caller's copy of the session.
+        super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        if event.partial:
+            return event
+        with self._lock:
+            storage_session = self._get(
+                session.app_name, session.user_id, session.id
+            )
+            if not storage_session:
+                return event
+            if event.actions and event.actions.state_delta:
+                self._update_shared_state(session, event.actions.state_delta)
+            position = len(storage_session.events)
+            super().append_event(session=storage_session, event=event)
+            storage_session.last_update_time = event.timestamp
+            self._db.write(
+                'INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?)',
+                (
+                    session.app_name,
+                    session.user_id,
+                    session.id,
+                    position,
+                    event.model_dump_json(exclude_none=True),
+                ),
+            )
+            self._write_session(storage_session)
+        return event
+
+    def _update_shared_state(self, session: Session, delta: dict[str, Any]):
+        app_name, user_id = session.app_name, session.user_id
+        app_state = self._app_state.setdefault(app_name, {})
+        user_state = self._user_state.setdefault((app_name, user_id), {})
+        app_changed = user_changed = False
+        for key, value in delta.items():
+            if key.startswith(State.APP_PREFIX):
+                app_state[key.removeprefix(State.APP_PREFIX)] = value
+                app_changed = True
+            elif key.startswith(State.USER_PREFIX):
+                user_state[key.removeprefix(State.USER_PREFIX)] = value
+                user_changed = True
+        if app_changed:
+            self._db.write(
+                'INSERT OR REPLACE INTO app_states VALUES (?, ?)',
+                (app_name, json.dumps(app_state)),
+            )
+        if user_changed:
+            self._db.write(
+                'INSERT OR REPLACE INTO user_states VALUES (?, ?, ?)',
+                (app_name, user_id, json.dumps(user_state)),
+            )
+
+    def _write_session(self, session: Session):
+        self._db.write(
+            'INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)',
+            (
+                session.app_name,
+                session.user_id,
+                session.id,
+                json.dumps(_session_state(session.state)),
+                session.last_update_time,
+            ),
+        )
+
+    def _get(
+        self, app_name: str, user_id: str, session_id: str
+    ) -> Session | None:
+        key = (app_name, user_id, session_id)
+        session = self._sessions.get(key)
+        if session:
+            self._sessions.move_to_end(key)
+            return session
+        rows = self._db.query(
+            'SELECT state, last_update_time FROM sessions'
+            ' WHERE app_name = ? AND user_id = ? AND id = ?',
+            key,
+        )
+        if not rows:
+            return None
+        state, last_update_time = rows[0]
+        events = self._db.query(
+            'SELECT event FROM events WHERE app_name = ? AND user_id = ?'
+            ' AND session_id = ? ORDER BY position',
+            key,
+        )
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=json.loads(state),
+            events=[ADKEvent.model_validate_json(x) for (x,) in events],
+            last_update_time=last_update_time,
+        )
+        self._cache(key, session)
+        return session
+
+    def _cache(self, key: tuple[str, str, str], session: Session):
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self._cache_size:
+            # Everything is already queued for the database, just drop it.
+            self._sessions.popitem(last=False)
+
+    def _copy(self, session: Session) -> Session:
+        """A copy of the session for the caller, with the shared state.
+
+        Events are never changed once appended, so only the list holding them
+        is copied rather than every event.
+        """
+        state = copy.deepcopy(session.state)
+        for key, value in self._app_state.get(session.app_name, {}).items():
+            state[State.APP_PREFIX + key] = value
+        user_state = self._user_state.get((session.app_name, session.user_id))
+        for key, value in (user_state or {}).items():
+            state[State.USER_PREFIX + key] = value
+        return session.model_copy(
+            update={'state': state, 'events': list(session.events)}
+        )
+
+
+class SqliteArtifactService(BaseArtifactService):
+    """Artifact service persisting artifact versions to SQLite.
+
+    Up to `cache_size` recently loaded or saved artifact versions are kept in
+    memory.
+    """
+
+    def __init__(self, db: SqliteDatabase, cache_size: int = 128):
+        self._db = db
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        # Least recently used first.
+        self._parts: collections.OrderedDict[tuple[str, int], types.Part] = (
+            collections.OrderedDict()
+        )
+        self._next_versions: dict[str, int] = {}
+
+    def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        artifact: types.Part,
+    ) -> int:
+        path = _artifact_path(app_name, user_id, session_id, filename)
+        with self._lock:
+            version = self._next_version(path)
+            self._next_versions[path] = version + 1
+            self._db.write(
+                'INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?)',
+                (path, version, artifact.model_dump_json(exclude_none=True)),
+            )
+            self._cache((path, version), artifact)
+        return version
+
+    def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: int | None = None,
+    ) -> types.Part | None:
+        path = _artifact_path(app_name, user_id, session_id, filename)
+        with self._lock:
+            if version is None:
+                version = self._next_version(path) - 1
+                if version < 0:
+                    return None
+            part = self._parts.get((path, version))
+            if part:
+                self._parts.move_to_end((path, version))
+                return part
+            rows = self._db.query(
+                'SELECT part FROM artifacts WHERE path = ? AND version = ?',
+                (path, version),
+            )
+            if not rows:
+                return None
+            part = types.Part.model_validate_json(rows[0][0])
+            self._cache((path, version), part)
+            return part
+
+    def list_artifact_keys(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> list[str]:
+        session_prefix = f'{app_name}/{user_id}/{session_id}/'
+        user_prefix = f'{app_name}/{user_id}/user/'
+        rows = self._db.query(
+            'SELECT DISTINCT path FROM artifacts'
+            ' WHERE substr(path, 1, ?) = ? OR substr(path, 1, ?) = ?',
+            (
+                len(session_prefix),
+                session_prefix,
+                len(user_prefix),
+                user_prefix,
+            ),
+        )
+        return sorted(
+            path.removeprefix(session_prefix).removeprefix(user_prefix)
+            for (path,) in rows
+        )
+
+    def delete_artifact(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> None:
+        path = _artifact_path(app_name, user_id, session_id, filename)
+        with self._lock:
+            self._db.write('DELETE FROM artifacts WHERE path = ?', (path,))
+            self._next_versions[path] = 0
+            for key in [x for x in self._parts if x[0] == path]:
+                del self._parts[key]
+
+    def list_versions(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> list[int]:
+        path = _artifact_path(app_name, user_id, session_id, filename)
+        with self._lock:
+            return list(range(self._next_version(path)))
+
+    def _next_version(self, path: str) -> int:
+        if path not in self._next_versions:
+            rows = self._db.query(
+                'SELECT MAX(version) FROM artifacts WHERE path = ?', (path,)
+            )
+            latest = rows[0][0]
+            self._next_versions[path] = 0 if latest is None else latest + 1
+        return self._next_versions[path]
+
+    def _cache(self, key: tuple[str, int], part: types.Part):
+        self._parts[key] = part
+        self._parts.move_to_end(key)
+        while len(self._parts) > self._cache_size:
+            self._parts.popitem(last=False)
+
+
+class SqliteMemoryService(BaseMemoryService):
+    """Memory service keeping session events in SQLite.
+
+    Like InMemoryMemoryService it matches keywords rather than searching
+    semantically, but the matching runs in the database instead of scanning
+    every stored event in memory.
+    """
+
+    def __init__(self, db: SqliteDatabase):
+        self._db = db
+
+    def add_session_to_memory(self, session: Session):
+        key = (session.app_name, session.user_id, session.id)
+        self._db.write(
+            'DELETE FROM memories WHERE app_name = ? AND user_id = ?'
+            ' AND session_id = ?',
+            key,
+        )
+        for position, event in enumerate(session.events):
+            if not event.content:
+                continue
+            self._db.write(
+                'INSERT INTO memories VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    *key,
+                    position,
+                    event.model_dump_json(exclude_none=True),
+                    _event_text(event),
+                ),
+            )
+
+    def search_memory(
+        self, *, app_name: str, user_id: str, query: str
+    ) -> SearchMemoryResponse:
+        keywords = sorted(set(query.lower().split()))
+        response = SearchMemoryResponse()
+        if not keywords:
+            return response
+        matches = ' OR '.join(["text LIKE ? ESCAPE '\\'"] * len(keywords))
+        rows = self._db.query(
+            'SELECT session_id, event FROM memories'
+            f' WHERE app_name = ? AND user_id = ? AND ({matches})'
+            ' ORDER BY session_id, position',
+            (app_name, user_id, *[f'%{_escape_like(x)}%' for x in keywords]),
+        )
+        memories: dict[str, MemoryResult] = {}
+        for session_id, event in rows:
+            if session_id not in memories:
+                memories[session_id] = MemoryResult(
+                    session_id=session_id, events=[]
+                )
+            memories[session_id].events.append(
+                ADKEvent.model_validate_json(event)
+            )
+        response.memories.extend(memories.values())
+        return response
+
+
+@dataclasses.dataclass
+class ADKServices:
+    """The storage services backing the ADK Runner of the host agent."""
+
+    session_service: BaseSessionService
+    artifact_service: BaseArtifactService
+    memory_service: BaseMemoryService
+    db: SqliteDatabase | None = None
+
+    def close(self):
+        if self.db:
+            self.db.close()
+
+
+def create_adk_services(
+    storage: str | None = None, path: str | None = None
+) -> ADKServices:
+    """Create the ADK storage services selected by `storage`.
+
+    Defaults to the A2A_ADK_STORAGE environment variable, either `memory`,
+    the default, or `sqlite` to persist to the database file at `path` or
+    A2A_ADK_STORAGE_PATH.
+    """
+    storage = (storage or os.environ.get('A2A_ADK_STORAGE', 'memory')).lower()
+    if storage == 'memory':
+        return ADKServices(
+            session_service=InMemorySessionService(),
+            artifact_service=InMemoryArtifactService(),
+            memory_service=InMemoryMemoryService(),
+        )
+    if storage == 'sqlite':
+        db = SqliteDatabase(
+            path or os.environ.get('A2A_ADK_STORAGE_PATH', 'a2a_ui.db')
+        )
+        db.executescript(SCHEMA)
+        return ADKServices(
+            session_service=SqliteSessionService(db),
+            artifact_service=SqliteArtifactService(db),
+            memory_service=SqliteMemoryService(db),
+            db=db,
+        )
+    raise ValueError(f'Unknown ADK storage backend: {storage}')
+
+
+def _session_state(state: dict[str, Any]) -> dict[str, Any]:
+    """The part of a session state stored with the session itself."""
+    return {
+        key: value
+        for key, value in state.items()
+        if not key.startswith(
+            (State.APP_PREFIX, State.USER_PREFIX, State.TEMP_PREFIX)
+        )
+    }
+
+
+def _artifact_path(
+    app_name: str, user_id: str, session_id: str, filename: str
+) -> str:
+    if filename.startswith('user:'):
+        return f'{app_name}/{user_id}/user/{filename}'
+    return f'{app_name}/{user_id}/{session_id}/{filename}'
+
+
+def _event_text(event: ADKEvent) -> str:
+    if not event.content or not event.content.parts:
+        return ''
+    return '\n'.join(x.text for x in event.content.parts if x.text).lower()
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
@@ -18,13 +18,16 @@ class ApplicationManager(ABC):
         pass
 
     @abstractmethod
-    def register_agent(self, url: str):
+    async def register_agent(self, url: str | list[str]):
         pass
 
     @abstractmethod
     def get_pending_messages(self) -> list[str]:
         pass
 
+    def shutdown(self):
+        """Release the resources held by the manager."""
+
     @property
     @abstractmethod
     def conversations(self) -> list[Conversation]:
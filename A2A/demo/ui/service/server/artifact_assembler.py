@@ -0,0 +1,243 @@
+import collections
+import dataclasses
+import logging
+import threading
+import time
+
+from common.types import Artifact, Part, TextPart
+from service.types import ArtifactAssemblerMetrics
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class _PartialArtifact:
+    # The chunk opening the artifact, None while only appends have arrived.
+    first: Artifact | None = None
+    parts: list[Part] = dataclasses.field(default_factory=list)
+    # Trailing run of text appended since the last non text part, joined
+    # into a single part when another kind of part or the end arrives.
+    text_run: list[str] = dataclasses.field(default_factory=list)
+    size: int = 0
+    last_chunk: bool = False
+    updated_at: float = 0.0
+
+
+class ArtifactAssembler:
+    """Assembles artifacts streamed by remote agents in chunks.
+
+    An artifact is streamed as a first chunk, followed by chunks with `append`
+    set, the last of which has `lastChunk` set. Appends that arrive before the
+    first chunk are buffered and placed after it once it arrives, and the
+    artifact is only completed once both its first and last chunk are in.
+    Another chunk without `append` replaces the content streamed so far.
+
+    Buffered bytes are capped per task and across all tasks. An artifact that
+    would go over its task's cap is discarded, while going over the global cap
+    discards the least recently updated artifacts. Partial artifacts that see
+    no chunk for `ttl` seconds are expired. Chunks of a discarded artifact are
+    ignored until its last chunk. Adjacent text parts are joined, so a long
+    stream of text chunks ends up as one part.
+    """
+
+    def __init__(
+        self,
+        max_task_bytes: int = 16 * 1024 * 1024,
+        max_total_bytes: int = 128 * 1024 * 1024,
+        ttl: float = 300.0,
+        coalesce_text: bool = True,
+    ):
+        self._max_task_bytes = max_task_bytes
+        self._max_total_bytes = max_total_bytes
+        self._ttl = ttl
+        self._coalesce_text = coalesce_text
+        self._lock = threading.Lock()
+        # Keyed by (task id, artifact index), least recently updated first.
+        self._partials: collections.OrderedDict[
+            tuple[str, int], _PartialArtifact
+        ] = collections.OrderedDict()
+        self._task_bytes: dict[str, int] = {}
+        # Artifacts discarded before their last chunk, with the discard time.
+        self._discarded: collections.OrderedDict[tuple[str, int], float] = (
+            collections.OrderedDict()
+        )
+        self._total_bytes = 0
+        self._completed = 0
+        self._discarded_count = 0
+        self._expired = 0
+
+    def add(self, task_id: str, artifact: Artifact) -> Artifact | None:
+        """Add a chunk, returning the artifact once it is fully assembled."""
+        now = time.monotonic()
+        key = (task_id, artifact.index)
+        with self._lock:
+            self._expire(now)
+            if key in self._discarded:
+                if artifact.lastChunk:
+                    del self._discarded[key]
+                else:
+                    self._discarded.move_to_end(key)
+                    self._discarded[key] = now
+                return None
+            if (
+                not artifact.append
+                and key not in self._partials
+                and (artifact.lastChunk is None or artifact.lastChunk)
+            ):
+                # The entire payload in a single chunk.
+                self._completed += 1
+                return self._coalesced(artifact)
+            partial = self._partials.get(key)
+            if not partial:
+                partial = self._partials[key] = _PartialArtifact()
+            self._partials.move_to_end(key)
+            partial.updated_at = now
+            if artifact.append:
+                self._grow(key, partial, self._extend(partial, artifact.parts))
+            else:
+                if partial.first is None:
+                    # The first chunk, which goes before any early appends.
+                    early_parts = self._flush(partial)
+                else:
+                    # A chunk without append replaces what came before it.
+                    early_parts = []
+                    partial.text_run = []
+                    self._grow(key, partial, -partial.size)
+                partial.parts = []
+                partial.first = artifact
+                self._grow(key, partial, self._extend(partial, artifact.parts))
+                self._extend(partial, early_parts)
+            if artifact.lastChunk:
+                partial.last_chunk = True
+            if task_id in self._task_bytes and (
+                self._task_bytes[task_id] > self._max_task_bytes
+            ):
+                logger.warning(
+                    'Discarding artifact %s of task %s over %d bytes',
+                    artifact.index,
+                    task_id,
+                    self._max_task_bytes,
+                )
+                self._discard(key, now)
+                return None
+            self._enforce_total(now)
+            if key not in self._partials:
+                return None
+            if partial.first is None or not partial.last_chunk:
+                return None
+            self._remove(key)
+            self._completed += 1
+            return partial.first.model_copy(
+                update={
+                    'parts': self._flush(partial),
+                    'append': None,
+                    'lastChunk': None,
+                }
+            )
+
+    def discard_task(self, task_id: str):
+        """Drop the partial artifacts of a task that will not stream more."""
+        with self._lock:
+            for key in [x for x in self._partials if x[0] == task_id]:
+                self._remove(key)
+
+    def _extend(self, partial: _PartialArtifact, parts: list[Part]) -> int:
+        """Append parts to a partial artifact, returning their size."""
+        size = 0
+        for part in parts:
+            size += _part_size(part)
+            if (
+                self._coalesce_text
+                and part.type == 'text'
+                and part.metadata is None
+            ):
+                partial.text_run.append(part.text)
+                continue
+            self._flush_text(partial)
+            partial.parts.append(part)
+        return size
+
+    def _flush_text(self, partial: _PartialArtifact):
+        if partial.text_run:
+            partial.parts.append(TextPart(text=''.join(partial.text_run)))
+            partial.text_run = []
+
+    def _flush(self, partial: _PartialArtifact) -> list[Part]:
+        self._flush_text(partial)
+        return partial.parts
+
+    def _coalesced(self, artifact: Artifact) -> Artifact:
+        if not self._coalesce_text or len(artifact.parts) < 2:
+            return artifact
+        partial = _PartialArtifact()
+        self._extend(partial, artifact.parts)
+        return artifact.model_copy(update={'parts': self._flush(partial)})
+
+    def _grow(self, key: tuple[str, int], partial: _PartialArtifact, size: int):
+        partial.size += size
+        self._add_bytes(key[0], size)
+
+    def _add_bytes(self, task_id: str, delta: int):
+        self._total_bytes += delta
+        task_bytes = self._task_bytes.get(task_id, 0) + delta
+        if task_bytes:
+            self._task_bytes[task_id] = task_bytes
+        else:
+            self._task_bytes.pop(task_id, None)
+
+    def _remove(self, key: tuple[str, int]) -> _PartialArtifact:
+        partial = self._partials.pop(key)
+        self._add_bytes(key[0], -partial.size)
+        return partial
+
+    def _discard(self, key: tuple[str, int], now: float):
+        partial = self._remove(key)
+        self._discarded_count += 1
+        if not partial.last_chunk:
+            self._discarded[key] = now
+
+    def _enforce_total(self, now: float):
+        while self._total_bytes > self._max_total_bytes and self._partials:
+            key = next(iter(self._partials))
+            logger.warning(
+                'Discarding artifact %s of task %s, %d bytes in flight',
+                key[1],
+                key[0],
+                self._total_bytes,
+            )
+            self._discard(key, now)
+
+    def _expire(self, now: float):
+        deadline = now - self._ttl
+        while self._partials:
+            key, partial = next(iter(self._partials.items()))
+            if partial.updated_at > deadline:
+                break
+            logger.warning('Expiring artifact %s of task %s', key[1], key[0])
+            self._remove(key)
+            self._expired += 1
+        while self._discarded:
+            key, discarded_at = next(iter(self._discarded.items()))
+            if discarded_at > deadline:
+                break
+            del self._discarded[key]
+
+    def metrics(self) -> ArtifactAssemblerMetrics:
+        with self._lock:
+            return ArtifactAssemblerMetrics(
+                in_flight_artifacts=len(self._partials),
+                in_flight_bytes=self._total_bytes,
+                largest_task_bytes=max(self._task_bytes.values(), default=0),
+                completed=self._completed,
+                discarded=self._discarded_count,
+                expired=self._expired,
+            )
+
+
+def _part_size(part: Part) -> int:
+    if part.type == 'text':
+        return len(part.text)
+    if part.type == 'file':
+        return len(part.file.bytes or part.file.uri or '')
+    return len(str(part.data))
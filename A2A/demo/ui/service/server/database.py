@@ -0,0 +1,74 @@
+import sqlite3
+import threading
+
+
+class SqliteDatabase:
+    """A SQLite database shared by the UI server's storage, with batched writes.
+
+    Writes are queued and committed together in a single transaction once
+    `batch_size` of them are pending, or by a background thread every
+    `flush_interval` seconds. Queries flush the pending writes first so they
+    always see them. Writes still queued when the process dies are lost, so
+    at most `flush_interval` seconds of history.
+    """
+
+    def __init__(
+        self, path: str, batch_size: int = 100, flush_interval: float = 1.0
+    ):
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending: list[tuple[str, tuple]] = []
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically,
+            args=(flush_interval,),
+            name='sqlite-flush',
+            daemon=True,
+        )
+        self._flusher.start()
+
+    def write(self, sql: str, params: tuple = ()):
+        with self._lock:
+            self._pending.append((sql, params))
+            if len(self._pending) >= self._batch_size:
+                self._flush()
+
+    def executescript(self, script: str):
+        """Run `script`, such as the schema of the tables a service uses."""
+        with self._lock:
+            self._flush()
+            self._conn.executescript(script)
+            self._conn.commit()
+
+    def query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            self._flush()
+            return self._conn.execute(sql, params).fetchall()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        with self._conn:
+            for sql, params in pending:
+                self._conn.execute(sql, params)
+
+    def _flush_periodically(self, interval: float):
+        while not self._closed.wait(interval):
+            self.flush()
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flusher.join()
+        with self._lock:
+            self._flush()
+            self._conn.close()
@@ -0,0 +1,236 @@
+import base64
+import collections
+import contextlib
+import dataclasses
+import hashlib
+import itertools
+import mmap
+import os
+import threading
+
+from urllib.parse import quote
+
+from common.types import FileContent, FilePart, Message
+from service.types import FileCacheMetrics
+
+
+@dataclasses.dataclass
+class CachedFile:
+    digest: str
+    mime_type: str
+    size: int
+    # Decoded bytes until the file has been spilled to disk.
+    data: bytes | None = None
+    path: str | None = None
+
+
+class FileCache:
+    """Content addressed cache for the files served to the UI.
+
+    Files are keyed by the sha256 digest of their decoded bytes, so the same
+    image attached to several messages is stored and decoded once. Resident
+    bytes are bounded by `max_bytes` with least recently used eviction. With
+    a `spill_dir`, evicted files are written there instead of being dropped
+    and are read back through a memory map, bounded by `max_disk_bytes`.
+
+    The cache holds no reference to the messages the files came from, so an
+    evicted file is gone until `restore` decodes it again from its message.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        spill_dir: str | None = None,
+        max_disk_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self._max_bytes = max_bytes
+        self._spill_dir = spill_dir
+        self._max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        # Files in memory and on disk, least recently used first.
+        self._memory: collections.OrderedDict[str, CachedFile] = (
+            collections.OrderedDict()
+        )
+        self._disk: collections.OrderedDict[str, CachedFile] = (
+            collections.OrderedDict()
+        )
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        # Spilled files get unique names, so a file removed from disk never
+        # deletes a newer spill of the same content.
+        self._spill_ids = itertools.count()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def put(self, data: bytes, mime_type: str) -> str:
+        """Store decoded bytes and return their digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        self._put(digest, data, mime_type)
+        return digest
+
+    def _put(self, digest: str, data: bytes, mime_type: str):
+        with self._lock:
+            if self._touch(digest):
+                return
+            self._memory[digest] = CachedFile(
+                digest=digest, mime_type=mime_type, size=len(data), data=data
+            )
+            self._memory_bytes += len(data)
+            spilled, removed = self._evict()
+        # Disk writes and removals are done without holding the lock.
+        for cached in spilled:
+            self._spill(cached)
+        for path in removed:
+            _remove(path)
+
+    def get(self, digest: str) -> CachedFile | None:
+        with self._lock:
+            cached = self._touch(digest)
+            if cached:
+                self._hits += 1
+            else:
+                self._misses += 1
+            return cached
+
+    def restore(self, digest: str, message: Message) -> CachedFile | None:
+        """Decode a file evicted from the cache again from its message."""
+        for part in message.parts:
+            if not _has_bytes(part):
+                continue
+            data = _decode_file(part)
+            if hashlib.sha256(data).hexdigest() == digest:
+                self._put(digest, data, part.file.mimeType)
+                return self.get(digest)
+        return None
+
+    def message_view(self, message: Message) -> Message:
+        """The message as served to the UI, with file parts as cache urls.
+
+        The message is left untouched and a copy is only made when it has
+        inline file content. The urls name the message, so that a file that
+        was evicted by the time it is requested can be restored from it.
+        """
+        if not any(_has_bytes(part) for part in message.parts):
+            return message
+        message_id = (message.metadata or {}).get('message_id')
+        query = f'?message_id={quote(message_id)}' if message_id else ''
+        parts = []
+        for part in message.parts:
+            if not _has_bytes(part):
+                parts.append(part)
+                continue
+            digest = self.put(_decode_file(part), part.file.mimeType)
+            # Replace the part data with a url reference
+            parts.append(
+                FilePart(
+                    file=FileContent(
+                        mimeType=part.file.mimeType,
+                        uri=f'/message/file/{digest}{query}',
+                    )
+                )
+            )
+        return message.model_copy(update={'parts': parts})
+
+    def read(
+        self, cached: CachedFile, start: int = 0, end: int | None = None
+    ) -> bytes:
+        """Read bytes [start, end) of a cached file, from memory or disk.
+
+        Raises OSError when the file was removed from disk since it was
+        looked up.
+        """
+        end = cached.size if end is None else end
+        data = cached.data
+        if data is not None:
+            return data[start:end]
+        with open(cached.path, 'rb') as f:
+            if cached.size == 0:
+                return b''
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[start:end]
+
+    def _touch(self, digest: str) -> CachedFile | None:
+        for files in (self._memory, self._disk):
+            cached = files.get(digest)
+            if cached:
+                files.move_to_end(digest)
+                return cached
+        return None
+
+    def _evict(self) -> tuple[list[CachedFile], list[str]]:
+        """Evict from the least recently used end until within the limits.
+
+        Returns the files to write to disk and the paths to remove, which the
+        caller does once the lock is released. Files to spill keep their
+        bytes until written, so they can still be read meanwhile.
+        """
+        spilled: dict[str, CachedFile] = {}
+        while self._memory_bytes > self._max_bytes:
+            _, cached = self._memory.popitem(last=False)
+            self._memory_bytes -= cached.size
+            if not self._spill_dir or cached.size > self._max_disk_bytes:
+                self._evictions += 1
+                continue
+            cached.path = os.path.join(
+                self._spill_dir, f'{cached.digest}.{next(self._spill_ids)}'
+            )
+            self._disk[cached.digest] = cached
+            self._disk_bytes += cached.size
+            spilled[cached.digest] = cached
+        removed = []
+        while self._disk_bytes > self._max_disk_bytes:
+            _, cached = self._disk.popitem(last=False)
+            self._disk_bytes -= cached.size
+            self._evictions += 1
+            if not spilled.pop(cached.digest, None):
+                removed.append(cached.path)
+        return list(spilled.values()), removed
+
+    def _spill(self, cached: CachedFile):
+        try:
+            with open(cached.path, 'wb') as f:
+                f.write(cached.data)
+        except OSError:
+            # Drop the file rather than failing the call that evicted it.
+            with self._lock:
+                if self._disk.get(cached.digest) is cached:
+                    del self._disk[cached.digest]
+                    self._disk_bytes -= cached.size
+                    self._evictions += 1
+            _remove(cached.path)
+            return
+        with self._lock:
+            if self._disk.get(cached.digest) is cached:
+                cached.data = None
+                return
+        # Evicted from disk while it was being written.
+        _remove(cached.path)
+
+    def metrics(self) -> FileCacheMetrics:
+        with self._lock:
+            return FileCacheMetrics(
+                files=len(self._memory) + len(self._disk),
+                memory_bytes=self._memory_bytes,
+                disk_bytes=self._disk_bytes,
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+            )
+
+
+def _remove(path: str):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def _has_bytes(part) -> bool:
+    return part.type == 'file' and part.file.bytes is not None
+
+
+def _decode_file(part: FilePart) -> bytes:
+    if 'image' in (part.file.mimeType or ''):
+        return base64.b64decode(part.file.bytes)
+    return part.file.bytes.encode('utf-8')
@@ -0,0 +1,159 @@
+import asyncio
+import collections
+import logging
+import threading
+import time
+
+from collections.abc import Awaitable, Callable
+
+from common.types import Message
+from service.types import MessageExecutorMetrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a message is submitted while the executor queue is full."""
+
+
+class MessageExecutor:
+    """Runs message processing on a long-lived event loop with backpressure.
+
+    Messages are admitted into a bounded queue and processed by at most
+    `max_concurrency` coroutines on a single event loop owned by a background
+    thread. Messages of the same conversation are processed one at a time in
+    submission order, while different conversations run concurrently. When
+    the queue is full, `submit` raises QueueFullError instead of accepting more
+    work.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Message], Awaitable[None]],
+        max_concurrency: int = 8,
+        max_queue_size: int = 100,
+    ):
+        self._handler = handler
+        self._max_concurrency = max_concurrency
+        self._max_queue_size = max_queue_size
+        # Guards the counters below, which are read and written from both
+        # the server event loop and the executor thread.
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+        # Only touched from the executor thread.
+        self._conversation_queues: dict[
+            str, collections.deque[tuple[Message, float]]
+        ] = {}
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._thread = threading.Thread(
+            target=self._run_loop, name='message-executor', daemon=True
+        )
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_forever()
+        finally:
+            # Cancel the messages still queued or running when stopped.
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(
+                asyncio.gather(*tasks, return_exceptions=True)
+            )
+            self._loop.close()
+
+    def submit(self, message: Message):
+        """Queue a message for processing, raising QueueFullError if full."""
+        with self._lock:
+            if self._queued >= self._max_queue_size:
+                self._rejected += 1
+                raise QueueFullError(
+                    f'Message queue is full ({self._max_queue_size} pending)'
+                )
+            self._queued += 1
+            self._submitted += 1
+        metadata = message.metadata or {}
+        key = metadata.get('conversation_id') or metadata.get('message_id', '')
+        self._loop.call_soon_threadsafe(
+            self._enqueue, key, message, time.monotonic()
+        )
+
+    def _enqueue(self, key: str, message: Message, enqueued_at: float):
+        queue = self._conversation_queues.get(key)
+        if queue is not None:
+            # The conversation is already being drained, keep the order.
+            queue.append((message, enqueued_at))
+            return
+        self._conversation_queues[key] = collections.deque(
+            [(message, enqueued_at)]
+        )
+        self._loop.create_task(self._drain(key))
+
+    async def _drain(self, key: str):
+        queue = self._conversation_queues[key]
+        while queue:
+            message, enqueued_at = queue[0]
+            async with self._semaphore:
+                started = time.monotonic()
+                with self._lock:
+                    self._queued -= 1
+                    self._in_flight += 1
+                failed = False
+                try:
+                    await self._handler(message)
+                except Exception:
+                    failed = True
+                    logger.exception('Failed to process message')
+                finished = time.monotonic()
+                with self._lock:
+                    self._in_flight -= 1
+                    if failed:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
+                    latency = finished - enqueued_at
+                    self._total_wait += started - enqueued_at
+                    self._total_latency += latency
+                    self._max_latency = max(self._max_latency, latency)
+            queue.popleft()
+        del self._conversation_queues[key]
+
+    def metrics(self) -> MessageExecutorMetrics:
+        with self._lock:
+            processed = self._completed + self._failed
+            return MessageExecutorMetrics(
+                max_concurrency=self._max_concurrency,
+                max_queue_size=self._max_queue_size,
+                queue_depth=self._queued,
+                in_flight=self._in_flight,
+                submitted=self._submitted,
+                completed=self._completed,
+                failed=self._failed,
+                rejected=self._rejected,
+                avg_wait_ms=(
+                    self._total_wait / processed * 1000 if processed else 0.0
+                ),
+                avg_latency_ms=(
+                    self._total_latency / processed * 1000 if processed else 0.0
+                ),
+                max_latency_ms=self._max_latency * 1000,
+            )
+
+    def shutdown(self, timeout: float | None = 5.0):
+        """Stop the executor loop, abandoning messages still queued."""
+        if not self._thread.is_alive():
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
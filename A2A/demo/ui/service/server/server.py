@@ -1,27 +1,52 @@
 import asyncio
-import base64
+import json
 import os
-import threading
-import uuid
+import time
 
-from common.types import FileContent, FilePart, Message
-from fastapi import APIRouter, Request, Response
+from collections.abc import AsyncIterator
+
+from common.types import (
+    JSONRPCError,
+    JSONRPCResponse,
+    Message,
+    MethodNotFoundError,
+)
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from service.types import (
     CreateConversationResponse,
     GetEventResponse,
+    GetMetricsResponse,
     ListAgentResponse,
     ListConversationResponse,
+    ListMessageParams,
     ListMessageResponse,
+    ListParams,
     ListTaskResponse,
     MessageInfo,
     PendingMessageResponse,
     RegisterAgentResponse,
     SendMessageResponse,
+    StateUpdate,
+    SubscribeUpdatesParams,
+    SubscribeUpdatesResponse,
 )
 
-from .adk_host_manager import ADKHostManager, get_message_id
+from .adk_host_manager import ADKHostManager
+from .adk_storage import create_adk_services
 from .application_manager import ApplicationManager
+from .artifact_assembler import ArtifactAssembler
+from .file_cache import FileCache
 from .in_memory_manager import InMemoryFakeAgentManager
+from .message_executor import MessageExecutor, QueueFullError
+from .store import InMemoryStore
+
+
+# Seconds between keep-alive comments on an idle update stream.
+UPDATE_HEARTBEAT_SECONDS = 15
+# Changes arriving within this window are pushed as a single update.
+UPDATE_COALESCE_SECONDS = 0.05
 
 
 class ConversationServer:
@@ -34,6 +59,38 @@ class ConversationServer:
     def __init__(self, router: APIRouter):
         agent_manager = os.environ.get('A2A_HOST', 'ADK')
         self.manager: ApplicationManager
+        self._file_cache = FileCache(
+            max_bytes=int(
+                os.environ.get('A2A_FILE_CACHE_BYTES', str(256 * 1024 * 1024))
+            ),
+            spill_dir=os.environ.get('A2A_FILE_CACHE_DIR') or None,
+            max_disk_bytes=int(
+                os.environ.get(
+                    'A2A_FILE_CACHE_DISK_BYTES', str(1024 * 1024 * 1024)
+                )
+            ),
+        )
+        # The ADK host persists the store to the database of its session
+        # storage, when that is one.
+        services = (
+            create_adk_services() if agent_manager.upper() == 'ADK' else None
+        )
+        self.store = InMemoryStore(
+            message_view=self._file_cache.message_view,
+            db=services.db if services else None,
+            cache_size=int(os.environ.get('A2A_STORE_CACHE_SIZE', '1024')),
+        )
+        self.artifact_assembler = ArtifactAssembler(
+            max_task_bytes=int(
+                os.environ.get('A2A_ARTIFACT_TASK_BYTES', str(16 * 1024 * 1024))
+            ),
+            max_total_bytes=int(
+                os.environ.get(
+                    'A2A_ARTIFACT_TOTAL_BYTES', str(128 * 1024 * 1024)
+                )
+            ),
+            ttl=float(os.environ.get('A2A_ARTIFACT_TTL_SECONDS', '300')),
+        )
 
         # Get API key from environment
         api_key = os.environ.get('GOOGLE_API_KEY', '')
@@ -43,12 +100,19 @@ class ConversationServer:
 
         if agent_manager.upper() == 'ADK':
             self.manager = ADKHostManager(
-                api_key=api_key, uses_vertex_ai=uses_vertex_ai
+                api_key=api_key,
+                uses_vertex_ai=uses_vertex_ai,
+                store=self.store,
+                artifact_assembler=self.artifact_assembler,
+                services=services,
             )
         else:
-            self.manager = InMemoryFakeAgentManager()
-        self._file_cache = {}  # dict[str, FilePart] maps file id to message data
-        self._message_to_cache = {}  # dict[str, str] maps message id to cache id
+            self.manager = InMemoryFakeAgentManager(store=self.store)
+        self._executor = MessageExecutor(
+            self.manager.process_message,
+            max_concurrency=int(os.environ.get('A2A_MESSAGE_CONCURRENCY', '8')),
+            max_queue_size=int(os.environ.get('A2A_MESSAGE_QUEUE_SIZE', '100')),
+        )
 
         router.add_api_route(
             '/conversation/create', self._create_conversation, methods=['POST']
@@ -77,6 +141,27 @@ class ConversationServer:
         router.add_api_route(
             '/api_key/update', self._update_api_key, methods=['POST']
         )
+        router.add_api_route(
+            '/metrics/get', self._get_metrics, methods=['POST']
+        )
+        router.add_api_route(
+            '/updates/subscribe', self._subscribe_updates, methods=['POST']
+        )
+        router.add_api_route('/batch', self._batch, methods=['POST'])
+        # Read only methods that can be combined in a single /batch call.
+        self._batch_handlers = {
+            'conversation/list': self._handle_list_conversation,
+            'events/get': self._handle_get_events,
+            'message/list': self._handle_list_messages,
+            'message/pending': self._handle_pending_messages,
+            'task/list': self._handle_list_tasks,
+            'agent/list': self._handle_list_agents,
+            'metrics/get': self._handle_get_metrics,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown()
+        self.manager.shutdown()
 
     # Update API key in manager
     def update_api_key(self, api_key: str):
@@ -91,10 +176,19 @@ class ConversationServer:
         message_data = await request.json()
         message = Message(**message_data['params'])
         message = self.manager.sanitize_message(message)
-        t = threading.Thread(
-            target=lambda: asyncio.run(self.manager.process_message(message))
-        )
-        t.start()
+        try:
+            self._executor.submit(message)
+        except QueueFullError as e:
+            # Shed load rather than queueing without bound, the client can
+            # retry once the backlog has drained.
+            return JSONResponse(
+                status_code=503,
+                headers={'Retry-After': '1'},
+                content=SendMessageResponse(
+                    id=message_data.get('id'),
+                    error=JSONRPCError(code=-32000, message=str(e)),
+                ).model_dump(),
+            )
         return SendMessageResponse(
             result=MessageInfo(
                 message_id=message.metadata['message_id'],
@@ -104,82 +198,272 @@ class ConversationServer:
             )
         )
 
-    async def _list_messages(self, request: Request):
-        message_data = await request.json()
-        conversation_id = message_data['params']
-        conversation = self.manager.get_conversation(conversation_id)
-        if conversation:
-            return ListMessageResponse(
-                result=self.cache_content(conversation.messages)
-            )
-        return ListMessageResponse(result=[])
-
-    def cache_content(self, messages: list[Message]):
-        rval = []
-        for m in messages:
-            message_id = get_message_id(m)
-            if not message_id:
-                rval.append(m)
-                continue
-            new_parts = []
-            for i, part in enumerate(m.parts):
-                if part.type != 'file':
-                    new_parts.append(part)
-                    continue
-                message_part_id = f'{message_id}:{i}'
-                if message_part_id in self._message_to_cache:
-                    cache_id = self._message_to_cache[message_part_id]
-                else:
-                    cache_id = str(uuid.uuid4())
-                    self._message_to_cache[message_part_id] = cache_id
-                # Replace the part data with a url reference
-                new_parts.append(
-                    FilePart(
-                        file=FileContent(
-                            mimeType=part.file.mimeType,
-                            uri=f'/message/file/{cache_id}',
-                        )
+    async def _batch(self, request: Request) -> list[JSONRPCResponse]:
+        return await run_in_threadpool(self._handle_batch, await request.json())
+
+    def _handle_batch(self, messages: list[dict]) -> list[JSONRPCResponse]:
+        responses = []
+        for message_data in messages:
+            handler = self._batch_handlers.get(message_data.get('method'))
+            if handler:
+                responses.append(handler(message_data))
+            else:
+                responses.append(
+                    JSONRPCResponse(
+                        id=message_data.get('id'), error=MethodNotFoundError()
                     )
                 )
-                if cache_id not in self._file_cache:
-                    self._file_cache[cache_id] = part
-            m.parts = new_parts
-            rval.append(m)
-        return rval
+        return responses
+
+    async def _list_messages(self, request: Request):
+        return await run_in_threadpool(
+            self._handle_list_messages, await _read_json(request)
+        )
 
-    async def _pending_messages(self):
+    def _handle_list_messages(self, message_data: dict) -> ListMessageResponse:
+        params = message_data['params']
+        if isinstance(params, str):
+            # Plain conversation id, list the whole history.
+            params = ListMessageParams(conversation_id=params)
+        else:
+            params = ListMessageParams(**params)
+        page = self.store.list_messages(
+            params.conversation_id, params.since, params.limit, views=True
+        )
+        return ListMessageResponse(
+            id=message_data.get('id'),
+            result=page.items,
+            next_cursor=page.cursor,
+            has_more=page.has_more,
+        )
+
+    async def _pending_messages(self, request: Request):
+        return await run_in_threadpool(
+            self._handle_pending_messages, await _read_json(request)
+        )
+
+    def _handle_pending_messages(
+        self, message_data: dict
+    ) -> PendingMessageResponse:
         return PendingMessageResponse(
-            result=self.manager.get_pending_messages()
+            id=message_data.get('id'),
+            result=self.manager.get_pending_messages(),
         )
 
-    def _list_conversation(self):
-        return ListConversationResponse(result=self.manager.conversations)
+    async def _list_conversation(self, request: Request):
+        return await run_in_threadpool(
+            self._handle_list_conversation, await _read_json(request)
+        )
 
-    def _get_events(self):
-        return GetEventResponse(result=self.manager.events)
+    def _handle_list_conversation(
+        self, message_data: dict
+    ) -> ListConversationResponse:
+        params = _list_params(message_data)
+        page = self.store.list_conversations(params.since, params.limit)
+        return ListConversationResponse(
+            id=message_data.get('id'),
+            result=page.items,
+            next_cursor=page.cursor,
+            has_more=page.has_more,
+        )
 
-    def _list_tasks(self):
-        return ListTaskResponse(result=self.manager.tasks)
+    async def _get_events(self, request: Request):
+        return await run_in_threadpool(
+            self._handle_get_events, await _read_json(request)
+        )
+
+    def _handle_get_events(self, message_data: dict) -> GetEventResponse:
+        params = _list_params(message_data)
+        page = self.store.list_events(params.since, params.limit)
+        return GetEventResponse(
+            id=message_data.get('id'),
+            result=page.items,
+            next_cursor=page.cursor,
+            has_more=page.has_more,
+        )
+
+    async def _list_tasks(self, request: Request):
+        return await run_in_threadpool(
+            self._handle_list_tasks, await _read_json(request)
+        )
+
+    def _handle_list_tasks(self, message_data: dict) -> ListTaskResponse:
+        params = _list_params(message_data)
+        page = self.store.list_tasks(params.since, params.limit)
+        return ListTaskResponse(
+            id=message_data.get('id'),
+            result=page.items,
+            next_cursor=page.cursor,
+            has_more=page.has_more,
+        )
+
+    async def _subscribe_updates(self, request: Request):
+        message_data = await request.json()
+        params = SubscribeUpdatesParams(**(message_data.get('params') or {}))
+        return StreamingResponse(
+            self._stream_updates(message_data.get('id'), params),
+            media_type='text/event-stream',
+        )
+
+    async def _stream_updates(
+        self, request_id: str | None, params: SubscribeUpdatesParams
+    ) -> AsyncIterator[str]:
+        """Push the store changes after the given cursors as SSE events.
+
+        The store notifies from whichever thread made the change, the
+        notification only wakes this stream up, which then collects the
+        deltas through the same cursors the list routes use.
+        """
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        unsubscribe = self.store.subscribe(
+            lambda: loop.call_soon_threadsafe(changed.set)
+        )
+        deadline = (
+            time.monotonic() + params.duration if params.duration else None
+        )
+        pending_messages = None
+        try:
+            while True:
+                changed.clear()
+                update = await run_in_threadpool(
+                    self._collect_update, params, pending_messages
+                )
+                if update:
+                    if update.pending_messages is not None:
+                        pending_messages = update.pending_messages
+                    response = SubscribeUpdatesResponse(
+                        id=request_id, result=update
+                    )
+                    yield f'data: {response.model_dump_json()}\n\n'
+                timeout = UPDATE_HEARTBEAT_SECONDS
+                if deadline:
+                    timeout = min(timeout, deadline - time.monotonic())
+                    if timeout <= 0:
+                        return
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout)
+                    await asyncio.sleep(UPDATE_COALESCE_SECONDS)
+                except TimeoutError:
+                    yield ': keep-alive\n\n'
+        finally:
+            unsubscribe()
+
+    def _collect_update(
+        self,
+        params: SubscribeUpdatesParams,
+        last_pending_messages: list[tuple[str, str]] | None,
+    ) -> StateUpdate | None:
+        """Collect the changes after the cursors in params and advance them."""
+        update = StateUpdate(conversation_id=params.conversation_id)
+        if params.conversation_id:
+            page = self.store.list_messages(
+                params.conversation_id, params.messages_since, views=True
+            )
+            update.messages = page.items
+            params.messages_since = page.cursor
+        update.messages_cursor = params.messages_since
+        page = self.store.list_conversations(params.conversations_since)
+        update.conversations = page.items
+        update.conversations_cursor = params.conversations_since = page.cursor
+        page = self.store.list_tasks(params.tasks_since)
+        update.tasks = page.items
+        update.tasks_cursor = params.tasks_since = page.cursor
+        if params.events_since is not None:
+            page = self.store.list_events(params.events_since)
+            update.events = page.items
+            update.events_cursor = params.events_since = page.cursor
+        pending_messages = self.store.get_pending_messages()
+        if pending_messages != last_pending_messages:
+            update.pending_messages = pending_messages
+        if (
+            update.messages
+            or update.conversations
+            or update.tasks
+            or update.events
+            or update.pending_messages is not None
+        ):
+            return update
+        return None
 
     async def _register_agent(self, request: Request):
         message_data = await request.json()
         url = message_data['params']
-        self.manager.register_agent(url)
+        await self.manager.register_agent(url)
         return RegisterAgentResponse()
 
-    async def _list_agents(self):
-        return ListAgentResponse(result=self.manager.agents)
+    async def _list_agents(self, request: Request):
+        return self._handle_list_agents(await _read_json(request))
+
+    def _handle_list_agents(self, message_data: dict) -> ListAgentResponse:
+        return ListAgentResponse(
+            id=message_data.get('id'), result=self.manager.agents
+        )
+
+    async def _get_metrics(self, request: Request):
+        return self._handle_get_metrics(await _read_json(request))
+
+    def _handle_get_metrics(self, message_data: dict) -> GetMetricsResponse:
+        return GetMetricsResponse(
+            id=message_data.get('id'),
+            result={
+                'message_executor': self._executor.metrics(),
+                'file_cache': self._file_cache.metrics(),
+                'artifact_assembler': self.artifact_assembler.metrics(),
+            },
+        )
 
-    def _files(self, file_id):
-        if file_id not in self._file_cache:
-            raise Exception('file not found')
-        part = self._file_cache[file_id]
-        if 'image' in part.file.mimeType:
+    def _files(
+        self, file_id: str, request: Request, message_id: str | None = None
+    ):
+        cached = self._file_cache.get(file_id)
+        if not cached and message_id:
+            # Evicted from the cache, decode it again from its message.
+            message = self.store.get_message(message_id)
+            if message:
+                cached = self._file_cache.restore(file_id, message)
+        if not cached:
+            raise HTTPException(status_code=404, detail='file not found')
+        # The id is the digest of the content, so it never changes.
+        headers = {
+            'ETag': f'"{cached.digest}"',
+            'Cache-Control': 'public, max-age=31536000, immutable',
+            'Accept-Ranges': 'bytes',
+        }
+        if_none_match = request.headers.get('if-none-match', '')
+        if cached.digest in if_none_match or if_none_match == '*':
+            return Response(status_code=304, headers=headers)
+        range_header = request.headers.get('range')
+        byte_range = None
+        if range_header:
+            byte_range = _parse_range(range_header, cached.size)
+            if not byte_range:
+                return Response(
+                    status_code=416,
+                    headers={
+                        **headers,
+                        'Content-Range': f'bytes */{cached.size}',
+                    },
+                )
+        try:
+            content = self._file_cache.read(cached, *(byte_range or ()))
+        except OSError:
+            # Removed from disk by an eviction since it was looked up.
+            raise HTTPException(
+                status_code=404, detail='file not found'
+            ) from None
+        if not byte_range:
             return Response(
-                content=base64.b64decode(part.file.bytes),
-                media_type=part.file.mimeType,
+                content=content, media_type=cached.mime_type, headers=headers
             )
-        return Response(content=part.file.bytes, media_type=part.file.mimeType)
+        start, end = byte_range
+        headers['Content-Range'] = f'bytes {start}-{end - 1}/{cached.size}'
+        return Response(
+            status_code=206,
+            content=content,
+            media_type=cached.mime_type,
+            headers=headers,
+        )
 
     async def _update_api_key(self, request: Request):
         """Update the API key"""
@@ -194,3 +478,35 @@ class ConversationServer:
             return {'status': 'error', 'message': 'No API key provided'}
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
+
+
+async def _read_json(request: Request) -> dict:
+    body = await request.body()
+    return json.loads(body) if body else {}
+
+
+def _list_params(message_data: dict) -> ListParams:
+    params = message_data.get('params')
+    return ListParams(**params) if params else ListParams()
+
+
+def _parse_range(range_header: str, size: int) -> tuple[int, int] | None:
+    """Parse a single `bytes=` range into [start, end), None if unsatisfiable."""
+    unit, _, spec = range_header.partition('=')
+    if unit.strip() != 'bytes' or ',' in spec:
+        return None
+    first, _, last = spec.strip().partition('-')
+    try:
+        if not first:
+            # A suffix range, the last N bytes.
+            length = int(last)
+            if length <= 0:
+                return None
+            return max(size - length, 0), size
+        start = int(first)
+        end = int(last) + 1 if last else size
+    except ValueError:
+        return None
+    if start >= size or end <= start:
+        return None
+    return start, min(end, size)
@@ -0,0 +1,500 @@
+import bisect
+import collections
+import dataclasses
+import threading
+
+from collections.abc import Callable
+from typing import Generic, TypeVar
+
+from common.types import Message, Task
+from service.server.database import SqliteDatabase
+from service.types import Conversation, Event
+
+
+T = TypeVar('T')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ui_tasks (
+    id TEXT PRIMARY KEY,
+    session_id TEXT,
+    seq INTEGER NOT NULL,
+    task TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ui_events (
+    seq INTEGER PRIMARY KEY,
+    event TEXT NOT NULL
+);
+"""
+
+
+@dataclasses.dataclass
+class Page(Generic[T]):
+    """A slice of a listing, ordered by the sequence number of each change.
+
+    `cursor` is the sequence number to pass as `since` to fetch the changes
+    after this page, `has_more` is set when `limit` cut the page short.
+    """
+
+    items: list[T]
+    cursor: int
+    has_more: bool = False
+
+
+class ChangeLog:
+    """Keeps ids ordered by the sequence number of their latest change.
+
+    Touching an id moves it to the end, so the ids changed after a given
+    sequence number are found by walking back from the end and only cost the
+    size of the delta.
+    """
+
+    def __init__(self):
+        self._versions: dict[str, int] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._versions
+
+    def touch(self, key: str, seq: int):
+        self._versions.pop(key, None)
+        self._versions[key] = seq
+
+    def since(self, since: int, limit: int | None) -> Page[str]:
+        changed = []
+        for key, seq in reversed(self._versions.items()):
+            if seq <= since:
+                break
+            changed.append((key, seq))
+        changed.reverse()
+        return _paginate(changed, since, limit)
+
+
+class InMemoryStore:
+    """Indexed storage for conversations, messages, tasks and events.
+
+    The ApplicationManager implementations share this store so that lookups on
+    the task callback path are dict accesses rather than scans over every task
+    the server has ever seen. Besides the primary indexes keyed by conversation,
+    task and message id, the store keeps secondary indexes from a conversation
+    to its tasks and from a message to the task it belongs to.
+
+    Every change is stamped with a monotonic sequence number, which list calls
+    accept as a cursor to only return what changed since a previous call.
+    Messages are processed on the executor thread while the server reads from
+    its own event loop, so access is serialized by a lock.
+
+    `message_view` converts a conversation message into the form served to
+    the UI. It is applied once when the message is added and the views are
+    kept alongside the messages, so listings never convert them again.
+
+    Conversations restored from persistent storage can be added with a loader
+    for their messages, which is only called when the conversation is first
+    read.
+
+    With a `db`, tasks and events are also written to the database and only
+    `cache_size` of each are kept in memory: the least recently used tasks
+    are loaded again on demand, and events older than the ones kept are
+    listed from the database. Tasks and events of previous runs are listed
+    from it too, and sequence numbers continue after theirs.
+    """
+
+    def __init__(
+        self,
+        message_view: Callable[[Message], Message] | None = None,
+        db: SqliteDatabase | None = None,
+        cache_size: int = 1024,
+    ):
+        self._message_view = message_view
+        self._db = db
+        self._cache_size = cache_size
+        self._lock = threading.RLock()
+        self._seq = 0
+        self._listeners: set[Callable[[], None]] = set()
+        self._conversations: dict[str, Conversation] = {}
+        self._messages: dict[str, Message] = {}
+        # Least recently used first, bounded when there is a database.
+        self._tasks: collections.OrderedDict[str, Task] = (
+            collections.OrderedDict()
+        )
+        # Dicts are used as insertion ordered sets.
+        self._pending_message_ids: dict[str, None] = {}
+        self._conversation_tasks: dict[str, dict[str, None]] = {}
+        self._message_tasks: dict[str, str] = {}
+        # Change logs backing the incremental list calls.
+        self._conversation_log = ChangeLog()
+        self._task_log = ChangeLog()
+        # Events and conversation messages are append only, the sequence
+        # numbers are kept in parallel lists to bisect on.
+        self._events: list[Event] = []
+        self._event_seqs: list[int] = []
+        self._conversation_message_seqs: dict[str, list[int]] = {}
+        self._conversation_message_views: dict[str, list[Message]] = {}
+        self._message_loaders: dict[str, Callable[[], list[Message]]] = {}
+        # Events up to this sequence number are only in the database.
+        self._dropped_event_seq = 0
+        if db:
+            self._restore()
+
+    def _restore(self):
+        """Index the tasks and events persisted by previous runs."""
+        self._db.executescript(SCHEMA)
+        tasks = self._db.query(
+            'SELECT id, session_id, seq FROM ui_tasks ORDER BY rowid'
+        )
+        for task_id, session_id, _ in tasks:
+            if session_id:
+                conversation_tasks = self._conversation_tasks.setdefault(
+                    session_id, {}
+                )
+                conversation_tasks[task_id] = None
+        for task_id, _, seq in sorted(tasks, key=lambda x: x[2]):
+            self._task_log.touch(task_id, seq)
+        [(event_seq,)] = self._db.query('SELECT MAX(seq) FROM ui_events')
+        self._dropped_event_seq = event_seq or 0
+        self._seq = max([self._dropped_event_seq] + [x[2] for x in tasks])
+
+    def _next_seq(self) -> int:
+        self._seq += 1
+        for listener in self._listeners:
+            listener()
+        return self._seq
+
+    def subscribe(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call `listener` after every change until unsubscribed.
+
+        Listeners run with the store lock held, on whichever thread made the
+        change, so they should only hand off the notification. Returns the
+        function that unsubscribes the listener.
+        """
+        with self._lock:
+            self._listeners.add(listener)
+        return lambda: self._unsubscribe(listener)
+
+    def _unsubscribe(self, listener: Callable[[], None]):
+        with self._lock:
+            self._listeners.discard(listener)
+
+    @property
+    def seq(self) -> int:
+        """The sequence number of the latest change."""
+        return self._seq
+
+    def add_conversation(
+        self,
+        conversation: Conversation,
+        load_messages: Callable[[], list[Message]] | None = None,
+    ):
+        with self._lock:
+            conversation_id = conversation.conversation_id
+            if load_messages:
+                self._message_loaders[conversation_id] = load_messages
+            seq = self._next_seq()
+            self._conversations[conversation_id] = conversation
+            self._conversation_message_seqs[conversation_id] = [
+                seq for _ in conversation.messages
+            ]
+            self._conversation_message_views[conversation_id] = [
+                self._view(x) for x in conversation.messages
+            ]
+            self._conversation_log.touch(conversation_id, seq)
+
+    def get_conversation(
+        self, conversation_id: str | None
+    ) -> Conversation | None:
+        if not conversation_id:
+            return None
+        self._load_messages(conversation_id)
+        return self._conversations.get(conversation_id)
+
+    def _load_messages(self, conversation_id: str):
+        if conversation_id not in self._message_loaders:
+            return
+        with self._lock:
+            load_messages = self._message_loaders.pop(conversation_id, None)
+            if not load_messages:
+                return
+            for message in load_messages():
+                self._append_conversation_message(conversation_id, message)
+
+    def add_conversation_message(self, conversation_id: str, message: Message):
+        """Append a message to a conversation's history."""
+        self._load_messages(conversation_id)
+        self._append_conversation_message(conversation_id, message)
+
+    def _append_conversation_message(
+        self, conversation_id: str, message: Message
+    ):
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if not conversation:
+                return
+            seq = self._next_seq()
+            self.add_message(message)
+            conversation.messages.append(message)
+            self._conversation_message_seqs[conversation_id].append(seq)
+            self._conversation_message_views[conversation_id].append(
+                self._view(message)
+            )
+            self._conversation_log.touch(conversation_id, seq)
+
+    def _view(self, message: Message) -> Message:
+        if not self._message_view:
+            return message
+        return self._message_view(message)
+
+    def add_message(self, message: Message):
+        message_id = get_message_id(message)
+        if message_id:
+            self._messages[message_id] = message
+
+    def get_message(self, message_id: str | None) -> Message | None:
+        if not message_id:
+            return None
+        return self._messages.get(message_id)
+
+    def add_pending_message(self, message_id: str):
+        with self._lock:
+            self._pending_message_ids[message_id] = None
+            self._next_seq()
+
+    def remove_pending_message(self, message_id: str):
+        with self._lock:
+            self._pending_message_ids.pop(message_id, None)
+            self._next_seq()
+
+    def upsert_task(self, task: Task):
+        with self._lock:
+            self._cache_task(task)
+            if task.sessionId:
+                tasks = self._conversation_tasks.setdefault(task.sessionId, {})
+                tasks[task.id] = None
+            seq = self._next_seq()
+            self._task_log.touch(task.id, seq)
+            if self._db:
+                self._db.write(
+                    'INSERT INTO ui_tasks (id, session_id, seq, task)'
+                    ' VALUES (?, ?, ?, ?) ON CONFLICT (id) DO UPDATE'
+                    ' SET seq = excluded.seq, task = excluded.task',
+                    (task.id, task.sessionId, seq, task.model_dump_json()),
+                )
+
+    def get_task(self, task_id: str | None) -> Task | None:
+        if not task_id:
+            return None
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task:
+                self._tasks.move_to_end(task_id)
+                return task
+            if not self._db or task_id not in self._task_log:
+                return None
+            [(data,)] = self._db.query(
+                'SELECT task FROM ui_tasks WHERE id = ?', (task_id,)
+            )
+            task = Task.model_validate_json(data)
+            self._cache_task(task)
+            return task
+
+    def _cache_task(self, task: Task):
+        self._tasks[task.id] = task
+        self._tasks.move_to_end(task.id)
+        if self._db:
+            while len(self._tasks) > self._cache_size:
+                self._tasks.popitem(last=False)
+
+    def has_task(self, task_id: str) -> bool:
+        return task_id in self._task_log
+
+    def get_conversation_tasks(self, conversation_id: str) -> list[Task]:
+        with self._lock:
+            return [
+                self.get_task(task_id)
+                for task_id in self._conversation_tasks.get(conversation_id, {})
+            ]
+
+    def attach_message_to_task(self, message_id: str, task_id: str):
+        self._message_tasks[message_id] = task_id
+
+    def get_task_id_for_message(self, message_id: str | None) -> str | None:
+        if not message_id:
+            return None
+        return self._message_tasks.get(message_id)
+
+    def get_task_for_message(self, message_id: str | None) -> Task | None:
+        return self.get_task(self.get_task_id_for_message(message_id))
+
+    def add_event(self, event: Event):
+        with self._lock:
+            seq = self._next_seq()
+            self._events.append(event)
+            self._event_seqs.append(seq)
+            if not self._db:
+                return
+            self._db.write(
+                'INSERT INTO ui_events (seq, event) VALUES (?, ?)',
+                (seq, event.model_dump_json()),
+            )
+            # Trimmed in batches, as deleting from the head of a list is
+            # linear in its length.
+            if len(self._events) >= 2 * self._cache_size:
+                drop = len(self._events) - self._cache_size
+                self._dropped_event_seq = self._event_seqs[drop - 1]
+                del self._events[:drop]
+                del self._event_seqs[:drop]
+
+    def get_pending_messages(self) -> list[tuple[str, str]]:
+        rval = []
+        with self._lock:
+            message_ids = list(self._pending_message_ids)
+        for message_id in message_ids:
+            task_id = self.get_task_id_for_message(message_id)
+            if not task_id:
+                rval.append((message_id, ''))
+                continue
+            task = self.get_task(task_id)
+            if not task:
+                rval.append((message_id, ''))
+            elif task.history and task.history[-1].parts:
+                if len(task.history) == 1:
+                    rval.append((message_id, 'Working...'))
+                else:
+                    part = task.history[-1].parts[0]
+                    rval.append(
+                        (
+                            message_id,
+                            part.text if part.type == 'text' else 'Working...',
+                        )
+                    )
+        return rval
+
+    def list_conversations(
+        self, since: int = 0, limit: int | None = None
+    ) -> Page[Conversation]:
+        """Conversations created or given new messages after `since`.
+
+        The conversations are listed without their messages, which are only
+        counted, as a conversation is listed again on every new message and
+        its history is fetched incrementally with list_messages instead.
+        """
+        with self._lock:
+            page = self._conversation_log.since(since, limit)
+            return Page(
+                [self._summary(x) for x in page.items],
+                page.cursor,
+                page.has_more,
+            )
+
+    def _summary(self, conversation_id: str) -> Conversation:
+        return self._conversations[conversation_id].model_copy(
+            update={
+                'messages': [],
+                'message_count': len(
+                    self._conversation_message_seqs[conversation_id]
+                ),
+            }
+        )
+
+    def list_tasks(
+        self, since: int = 0, limit: int | None = None
+    ) -> Page[Task]:
+        """Tasks created or updated after `since`."""
+        with self._lock:
+            page = self._task_log.since(since, limit)
+            return Page(
+                [self.get_task(x) for x in page.items],
+                page.cursor,
+                page.has_more,
+            )
+
+    def list_events(
+        self, since: int = 0, limit: int | None = None
+    ) -> Page[Event]:
+        """Events added after `since`, in the order they were added."""
+        with self._lock:
+            if since >= self._dropped_event_seq:
+                return _slice_log(self._events, self._event_seqs, since, limit)
+            rows = self._db.query(
+                'SELECT event, seq FROM ui_events WHERE seq > ? ORDER BY seq'
+                ' LIMIT ?',
+                (since, -1 if limit is None else limit + 1),
+            )
+            return _paginate(
+                [(Event.model_validate_json(x), seq) for x, seq in rows],
+                since,
+                limit,
+            )
+
+    def list_messages(
+        self,
+        conversation_id: str,
+        since: int = 0,
+        limit: int | None = None,
+        views: bool = False,
+    ) -> Page[Message]:
+        """Messages appended to a conversation after `since`.
+
+        With `views` set, the precomputed views of the messages are returned.
+        """
+        self._load_messages(conversation_id)
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if not conversation:
+                return Page([], since)
+            return _slice_log(
+                self._conversation_message_views[conversation_id]
+                if views
+                else conversation.messages,
+                self._conversation_message_seqs[conversation_id],
+                since,
+                limit,
+            )
+
+    @property
+    def conversations(self) -> list[Conversation]:
+        with self._lock:
+            return list(self._conversations.values())
+
+    @property
+    def messages(self) -> list[Message]:
+        with self._lock:
+            return list(self._messages.values())
+
+    @property
+    def tasks(self) -> list[Task]:
+        with self._lock:
+            return self.list_tasks().items
+
+    @property
+    def events(self) -> list[Event]:
+        with self._lock:
+            return self.list_events().items
+
+    @property
+    def pending_message_ids(self) -> list[str]:
+        with self._lock:
+            return list(self._pending_message_ids)
+
+
+def _paginate(
+    changed: list[tuple[T, int]], since: int, limit: int | None
+) -> Page[T]:
+    has_more = limit is not None and len(changed) > limit
+    if has_more:
+        changed = changed[:limit]
+    cursor = changed[-1][1] if changed else since
+    return Page([x for x, _ in changed], cursor, has_more)
+
+
+def _slice_log(
+    items: list[T], seqs: list[int], since: int, limit: int | None
+) -> Page[T]:
+    start = bisect.bisect_right(seqs, since)
+    end = len(items) if limit is None else min(len(items), start + limit)
+    if start >= end:
+        return Page([], since)
+    return Page(items[start:end], seqs[end - 1], end < len(items))
+
+
+def get_message_id(m: Message | None) -> str | None:
+    if not m or not m.metadata or 'message_id' not in m.metadata:
+        return None
+    return m.metadata['message_id']
@@ -1,4 +1,4 @@
-from typing import Annotated, Literal
+from typing import Annotated, Any, Literal
 
 from common.types import (
     AgentCard,
@@ -16,6 +16,8 @@ class Conversation(BaseModel):
     name: str = ''
     task_ids: list[str] = Field(default_factory=list)
     messages: list[Message] = Field(default_factory=list)
+    # Set on listings, which leave `messages` out, see list_messages.
+    message_count: int = 0
 
 
 class Event(BaseModel):
@@ -26,6 +28,23 @@ class Event(BaseModel):
     timestamp: float
 
 
+class ListParams(BaseModel):
+    # Only return items changed after this cursor, 0 returns everything.
+    since: int = 0
+    limit: int | None = None
+
+
+class ListMessageParams(ListParams):
+    conversation_id: str
+
+
+class PagedResponse(JSONRPCResponse):
+    # Pass as `since` on the next call to only receive newer changes.
+    next_cursor: int = 0
+    # Set when `limit` cut the result short.
+    has_more: bool = False
+
+
 class SendMessageRequest(JSONRPCRequest):
     method: Literal['message/send'] = 'message/send'
     params: Message
@@ -33,11 +52,11 @@ class SendMessageRequest(JSONRPCRequest):
 
 class ListMessageRequest(JSONRPCRequest):
     method: Literal['message/list'] = 'message/list'
-    # This is the conversation id
-    params: str
+    # This is the conversation id, or the conversation id with a cursor
+    params: str | ListMessageParams
 
 
-class ListMessageResponse(JSONRPCResponse):
+class ListMessageResponse(PagedResponse):
     result: list[Message] | None = None
 
 
@@ -52,17 +71,19 @@ class SendMessageResponse(JSONRPCResponse):
 
 class GetEventRequest(JSONRPCRequest):
     method: Literal['events/get'] = 'events/get'
+    params: ListParams | None = None
 
 
-class GetEventResponse(JSONRPCResponse):
+class GetEventResponse(PagedResponse):
     result: list[Event] | None = None
 
 
 class ListConversationRequest(JSONRPCRequest):
     method: Literal['conversation/list'] = 'conversation/list'
+    params: ListParams | None = None
 
 
-class ListConversationResponse(JSONRPCResponse):
+class ListConversationResponse(PagedResponse):
     result: list[Conversation] | None = None
 
 
@@ -84,16 +105,18 @@ class CreateConversationResponse(JSONRPCResponse):
 
 class ListTaskRequest(JSONRPCRequest):
     method: Literal['task/list'] = 'task/list'
+    params: ListParams | None = None
 
 
-class ListTaskResponse(JSONRPCResponse):
+class ListTaskResponse(PagedResponse):
     result: list[Task] | None = None
 
 
 class RegisterAgentRequest(JSONRPCRequest):
     method: Literal['agent/register'] = 'agent/register'
-    # This is the base url of the agent card
-    params: str | None = None
+    # This is the base url of the agent card, or a list of them to register
+    # several agents at once
+    params: str | list[str] | None = None
 
 
 class RegisterAgentResponse(JSONRPCResponse):
@@ -108,6 +131,89 @@ class ListAgentResponse(JSONRPCResponse):
     result: list[AgentCard] | None = None
 
 
+class SubscribeUpdatesParams(BaseModel):
+    # Conversation to stream new messages for, if any.
+    conversation_id: str = ''
+    messages_since: int = 0
+    conversations_since: int = 0
+    tasks_since: int = 0
+    # Events are only streamed when a cursor is given.
+    events_since: int | None = None
+    # Close the stream after this many seconds, it stays open if unset.
+    duration: float | None = None
+
+
+class StateUpdate(BaseModel):
+    conversation_id: str = ''
+    messages: list[Message] = Field(default_factory=list)
+    messages_cursor: int = 0
+    conversations: list[Conversation] = Field(default_factory=list)
+    conversations_cursor: int = 0
+    tasks: list[Task] = Field(default_factory=list)
+    tasks_cursor: int = 0
+    events: list[Event] = Field(default_factory=list)
+    events_cursor: int | None = None
+    # Only set when the pending messages changed.
+    pending_messages: list[tuple[str, str]] | None = None
+
+
+class SubscribeUpdatesRequest(JSONRPCRequest):
+    method: Literal['updates/subscribe'] = 'updates/subscribe'
+    params: SubscribeUpdatesParams = Field(
+        default_factory=SubscribeUpdatesParams
+    )
+
+
+class SubscribeUpdatesResponse(JSONRPCResponse):
+    result: StateUpdate | None = None
+
+
+class MessageExecutorMetrics(BaseModel):
+    max_concurrency: int
+    max_queue_size: int
+    # Messages admitted but not yet picked up by a worker.
+    queue_depth: int = 0
+    in_flight: int = 0
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0
+    # Time from submission until processing started.
+    avg_wait_ms: float = 0.0
+    # Time from submission until processing finished.
+    avg_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+
+
+class ArtifactAssemblerMetrics(BaseModel):
+    # Partial artifacts waiting for more chunks and the bytes they hold.
+    in_flight_artifacts: int = 0
+    in_flight_bytes: int = 0
+    largest_task_bytes: int = 0
+    completed: int = 0
+    discarded: int = 0
+    expired: int = 0
+
+
+class FileCacheMetrics(BaseModel):
+    files: int = 0
+    # Bytes held in memory and spilled to disk.
+    memory_bytes: int = 0
+    disk_bytes: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class GetMetricsRequest(JSONRPCRequest):
+    method: Literal['metrics/get'] = 'metrics/get'
+
+
+class GetMetricsResponse(JSONRPCResponse):
+    # Maps a server component name to its metrics.
+    result: dict[str, Any] | None = None
+
+
 AgentRequest = TypeAdapter(
     Annotated[
         SendMessageRequest | ListConversationRequest,
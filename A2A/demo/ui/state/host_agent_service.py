@@ -1,6 +1,8 @@
+import asyncio
 import json
 import os
 import sys
+import threading
 import traceback
 
 from typing import Any
@@ -14,11 +16,14 @@ from service.types import (
     GetEventRequest,
     ListAgentRequest,
     ListConversationRequest,
+    ListMessageParams,
     ListMessageRequest,
+    ListParams,
     ListTaskRequest,
     PendingMessageRequest,
     RegisterAgentRequest,
     SendMessageRequest,
+    StateUpdate,
 )
 
 from .state import (
@@ -33,9 +38,40 @@ from .state import (
 
 server_url = 'http://localhost:12000'
 
+_client: ConversationClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> ConversationClient:
+    """Return the client shared by all event handlers.
+
+    Mesop runs every event handler on a new event loop, so the shared client
+    runs its requests on a dedicated loop and its connections are reused
+    across handlers.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name='conversation-client', daemon=True
+            ).start()
+            _client = ConversationClient(server_url, loop=loop)
+        return _client
+
+
+async def CloseClient():
+    """Close the shared client and stop its event loop."""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client:
+        await client.aclose()
+        client.loop.call_soon_threadsafe(client.loop.stop)
+
 
 async def ListConversations() -> list[Conversation]:
-    client = ConversationClient(server_url)
+    client = get_client()
     try:
         response = await client.list_conversation(ListConversationRequest())
         return response.result
@@ -44,7 +80,7 @@ async def ListConversations() -> list[Conversation]:
 
 
 async def SendMessage(message: Message) -> str | None:
-    client = ConversationClient(server_url)
+    client = get_client()
     try:
         response = await client.send_message(SendMessageRequest(params=message))
         return response.result
@@ -53,7 +89,7 @@ async def SendMessage(message: Message) -> str | None:
 
 
 async def CreateConversation() -> Conversation:
-    client = ConversationClient(server_url)
+    client = get_client()
     try:
         response = await client.create_conversation(CreateConversationRequest())
         return response.result
@@ -62,7 +98,7 @@ async def CreateConversation() -> Conversation:
 
 
 async def ListRemoteAgents():
-    client = ConversationClient(server_url)
+    client = get_client()
     try:
         response = await client.list_agents(ListAgentRequest())
         return response.result
@@ -70,8 +106,8 @@ async def ListRemoteAgents():
         print('Failed to read agents', e)
 
 
-async def AddRemoteAgent(path: str):
-    client = ConversationClient(server_url)
+async def AddRemoteAgent(path: str | list[str]):
+    client = get_client()
     try:
         await client.register_agent(RegisterAgentRequest(params=path))
     except Exception as e:
@@ -79,7 +115,7 @@ async def AddRemoteAgent(path: str):
 
 
 async def GetEvents() -> list[Event]:
-    client = ConversationClient(server_url)
+    client = get_client()
     try:
         response = await client.get_events(GetEventRequest())
         return response.result
@@ -88,7 +124,7 @@ async def GetEvents() -> list[Event]:
 
 
 async def GetProcessingMessages():
-    client = ConversationClient(server_url)
+    client = get_client()
     try:
         response = await client.get_pending_messages(PendingMessageRequest())
         return dict(response.result)
@@ -101,7 +137,7 @@ def GetMessageAliases():
 
 
 async def GetTasks():
-    client = ConversationClient(server_url)
+    client = get_client()
     try:
         response = await client.list_tasks(ListTaskRequest())
         return response.result
@@ -110,7 +146,7 @@ async def GetTasks():
 
 
 async def ListMessages(conversation_id: str) -> list[Message]:
-    client = ConversationClient(server_url)
+    client = get_client()
     try:
         response = await client.list_messages(
             ListMessageRequest(params=conversation_id)
@@ -121,38 +157,70 @@ async def ListMessages(conversation_id: str) -> list[Message]:
 
 
 async def UpdateAppState(state: AppState, conversation_id: str):
-    """Update the app state."""
+    """Update the app state.
+
+    Only the changes since the cursors stored in the state are fetched, in a
+    single batched call, and merged into the existing state.
+    """
+    client = get_client()
     try:
+        requests = [
+            ListConversationRequest(
+                params=ListParams(since=state.conversations_cursor)
+            ),
+            ListTaskRequest(params=ListParams(since=state.tasks_cursor)),
+            PendingMessageRequest(),
+        ]
         if conversation_id:
-            state.current_conversation_id = conversation_id
-            messages = await ListMessages(conversation_id)
-            if not messages:
-                state.messages = []
-            else:
-                state.messages = [convert_message_to_state(x) for x in messages]
-        conversations = await ListConversations()
-        if not conversations:
-            state.conversations = []
-        else:
-            state.conversations = [
-                convert_conversation_to_state(x) for x in conversations
-            ]
-
-        state.task_list = []
-        for task in await GetTasks():
-            state.task_list.append(
-                SessionTask(
-                    session_id=extract_conversation_id(task),
-                    task=convert_task_to_state(task),
+            select_conversation(state, conversation_id)
+            requests.append(
+                ListMessageRequest(
+                    params=ListMessageParams(
+                        conversation_id=conversation_id,
+                        since=state.messages_cursor,
+                    )
                 )
             )
-        state.background_tasks = await GetProcessingMessages()
+        conversations, tasks, pending, *messages = await client.batch(requests)
+        merge_conversations(state, conversations.result)
+        state.conversations_cursor = conversations.next_cursor
+        merge_tasks(state, tasks.result)
+        state.tasks_cursor = tasks.next_cursor
+        state.background_tasks = dict(pending.result or [])
+        if messages:
+            merge_messages(state, messages[0].result)
+            state.messages_cursor = messages[0].next_cursor
         state.message_aliases = GetMessageAliases()
     except Exception as e:
         print('Failed to update state: ', e)
         traceback.print_exc(file=sys.stdout)
 
 
+def select_conversation(state: AppState, conversation_id: str):
+    state.current_conversation_id = conversation_id
+    if state.messages_conversation_id != conversation_id:
+        state.messages_conversation_id = conversation_id
+        state.messages = []
+        state.messages_cursor = 0
+
+
+def apply_state_update(state: AppState, update: StateUpdate | None):
+    if not update:
+        return
+    if (
+        update.conversation_id
+        and update.conversation_id == state.messages_conversation_id
+    ):
+        merge_messages(state, update.messages)
+        state.messages_cursor = update.messages_cursor
+    merge_conversations(state, update.conversations)
+    state.conversations_cursor = update.conversations_cursor
+    merge_tasks(state, update.tasks)
+    state.tasks_cursor = update.tasks_cursor
+    if update.pending_messages is not None:
+        state.background_tasks = dict(update.pending_messages)
+
+
 async def UpdateApiKey(api_key: str):
     """Update the API key"""
     import httpx
@@ -173,6 +241,54 @@ async def UpdateApiKey(api_key: str):
         return False
 
 
+def merge_messages(state: AppState, messages: list[Message] | None):
+    if not messages:
+        return
+    if not state.messages:
+        state.messages = []
+    # Messages are only ever appended, but drop the placeholders added while
+    # sending a message now that the server's copy has arrived.
+    known = {x.message_id for x in state.messages if x.message_id}
+    state.messages = [x for x in state.messages if x.message_id]
+    for message in messages:
+        state_message = convert_message_to_state(message)
+        if state_message.message_id not in known:
+            state.messages.append(state_message)
+
+
+def merge_conversations(
+    state: AppState, conversations: list[Conversation] | None
+):
+    if not conversations:
+        return
+    if not state.conversations:
+        state.conversations = []
+    index = {x.conversation_id: i for i, x in enumerate(state.conversations)}
+    for conversation in conversations:
+        state_conversation = convert_conversation_to_state(conversation)
+        if conversation.conversation_id in index:
+            state.conversations[index[conversation.conversation_id]] = (
+                state_conversation
+            )
+        else:
+            state.conversations.append(state_conversation)
+
+
+def merge_tasks(state: AppState, tasks: list[Task] | None):
+    if not tasks:
+        return
+    index = {x.task.task_id: i for i, x in enumerate(state.task_list)}
+    for task in tasks:
+        session_task = SessionTask(
+            session_id=extract_conversation_id(task),
+            task=convert_task_to_state(task),
+        )
+        if task.id in index:
+            state.task_list[index[task.id]] = session_task
+        else:
+            state.task_list.append(session_task)
+
+
 def convert_message_to_state(message: Message) -> StateMessage:
     if not message:
         return StateMessage()
@@ -191,7 +307,7 @@ def convert_conversation_to_state(
         conversation_id=conversation.conversation_id,
         conversation_name=conversation.name,
         is_active=conversation.is_active,
-        message_ids=[extract_message_id(x) for x in conversation.messages],
+        message_count=conversation.message_count,
     )
 
 
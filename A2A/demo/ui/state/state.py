@@ -17,7 +17,7 @@ class StateConversation:
     conversation_id: str = ''
     conversation_name: str = ''
     is_active: bool = True
-    message_ids: list[str] = dataclasses.field(default_factory=list)
+    message_count: int = 0
 
 
 @dataclass
@@ -78,6 +78,11 @@ class AppState:
     conversations: list[StateConversation]
     messages: list[StateMessage]
     task_list: list[SessionTask] = dataclasses.field(default_factory=list)
+    # Cursors of the last incremental update, see UpdateAppState.
+    messages_conversation_id: str = ''
+    messages_cursor: int = 0
+    conversations_cursor: int = 0
+    tasks_cursor: int = 0
     background_tasks: dict[str, str] = dataclasses.field(default_factory=dict)
     message_aliases: dict[str, str] = dataclasses.field(default_factory=dict)
     # This is used to track the data entered in a form
@@ -87,6 +92,8 @@ class AppState:
     # This is used to track the message sent to agent with form data
     form_responses: dict[str, str] = dataclasses.field(default_factory=dict)
     polling_interval: int = 1
+    # Stream updates pushed by the server instead of polling.
+    live_updates: bool = True
 
     # Added for API key management
     api_key: str = ''
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.genai import types
+from service.server.adk_storage import create_adk_services
+
+
+class SqliteStorageTest(unittest.TestCase):
+    """Tests for the SQLite backed ADK storage services."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'a2a_ui.db')
+
+    def open(self):
+        services = create_adk_services('sqlite', self.path)
+        self.addCleanup(services.close)
+        return services
+
+    def test_sessions_survive_restart(self) -> None:
+        """Test sessions, their events and state are reloaded."""
+        services = self.open()
+        session_service = services.session_service
+        session = session_service.create_session(app_name='A2A', user_id='u')
+        session_service.append_event(
+            session,
+            Event(
+                author='host_agent',
+                actions=EventActions(
+                    state_delta={'task_id': 't1', 'user:name': 'Ada'}
+                ),
+            ),
+        )
+        session_service.append_event(
+            session,
+            Event(
+                author='user',
+                content=types.Content(
+                    role='user', parts=[types.Part(text='Hello')]
+                ),
+            ),
+        )
+        services.close()
+
+        session_service = self.open().session_service
+        sessions = session_service.list_sessions(app_name='A2A', user_id='u')
+        self.assertEqual([x.id for x in sessions.sessions], [session.id])
+        restored = session_service.get_session(
+            app_name='A2A', user_id='u', session_id=session.id
+        )
+        self.assertEqual(restored.state['task_id'], 't1')
+        self.assertEqual(restored.state['user:name'], 'Ada')
+        self.assertEqual(len(restored.events), 2)
+        self.assertEqual(restored.events[1].content.parts[0].text, 'Hello')
+
+    def test_session_cache_is_bounded(self) -> None:
+        """Test sessions evicted from the cache are loaded again."""
+        services = self.open()
+        session_service = services.session_service
+        session_service._cache_size = 1
+        first = session_service.create_session(app_name='A2A', user_id='u')
+        session_service.create_session(app_name='A2A', user_id='u')
+        self.assertEqual(len(session_service._sessions), 1)
+        restored = session_service.get_session(
+            app_name='A2A', user_id='u', session_id=first.id
+        )
+        self.assertEqual(restored.id, first.id)
+
+    def test_artifact_versions(self) -> None:
+        """Test artifact versions are saved and reloaded."""
+        services = self.open()
+        for data in [b'v0', b'v1']:
+            services.artifact_service.save_artifact(
+                app_name='A2A',
+                user_id='u',
+                session_id='s',
+                filename='image.png',
+                artifact=types.Part.from_bytes(
+                    data=data, mime_type='image/png'
+                ),
+            )
+        services.close()
+
+        artifact_service = self.open().artifact_service
+        key = {'app_name': 'A2A', 'user_id': 'u', 'session_id': 's'}
+        self.assertEqual(
+            artifact_service.list_artifact_keys(**key), ['image.png']
+        )
+        self.assertEqual(
+            artifact_service.list_versions(**key, filename='image.png'), [0, 1]
+        )
+        latest = artifact_service.load_artifact(**key, filename='image.png')
+        self.assertEqual(latest.inline_data.data, b'v1')
+        first = artifact_service.load_artifact(
+            **key, filename='image.png', version=0
+        )
+        self.assertEqual(first.inline_data.data, b'v0')
+
+    def test_search_memory(self) -> None:
+        """Test memory search matches keywords of the stored events."""
+        services = self.open()
+        session_service = services.session_service
+        session = session_service.create_session(app_name='A2A', user_id='u')
+        for text in ['Exchange rate of USD', 'Reimburse 20% of lunch']:
+            session_service.append_event(
+                session,
+                Event(
+                    author='user',
+                    content=types.Content(
+                        role='user', parts=[types.Part(text=text)]
+                    ),
+                ),
+            )
+        services.memory_service.add_session_to_memory(session)
+        response = services.memory_service.search_memory(
+            app_name='A2A', user_id='u', query='usd'
+        )
+        self.assertEqual(len(response.memories), 1)
+        self.assertEqual(len(response.memories[0].events), 1)
+        response = services.memory_service.search_memory(
+            app_name='A2A', user_id='u', query='0%'
+        )
+        self.assertEqual(len(response.memories[0].events), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+import httpx
+
+from utils.agent_card import AgentCardCache
+
+
+CARD = {
+    'name': 'Currency Agent',
+    'url': 'http://localhost:10000/',
+    'version': '1.0.0',
+    'capabilities': {},
+    'skills': [],
+}
+
+
+class AgentCardCacheTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for the HTTP caching AgentCardCache."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.requests = []
+        self.cache_control = 'max-age=60'
+        self.card = CARD
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            if request.url.host == 'missing':
+                return httpx.Response(404)
+            headers = {'ETag': '"v1"', 'Cache-Control': self.cache_control}
+            if request.headers.get('if-none-match') == '"v1"':
+                return httpx.Response(304, headers=headers)
+            return httpx.Response(200, json=self.card, headers=headers)
+
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def asyncTearDown(self) -> None:
+        await self.client.aclose()
+
+    async def test_fresh_card_is_reused(self) -> None:
+        """Test a card is fetched once while its max-age lasts."""
+        cache = AgentCardCache()
+        card = await cache.get('localhost:10000', self.client)
+        self.assertEqual(card.name, 'Currency Agent')
+        self.assertIs(await cache.get('localhost:10000', self.client), card)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(
+            str(self.requests[0].url),
+            'http://localhost:10000/.well-known/agent.json',
+        )
+
+    async def test_expired_card_is_revalidated(self) -> None:
+        """Test an expired card is revalidated with its ETag."""
+        self.cache_control = 'no-cache'
+        cache = AgentCardCache()
+        card = await cache.get('localhost:10000', self.client)
+        self.assertIs(await cache.get('localhost:10000', self.client), card)
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.requests[1].headers['if-none-match'], '"v1"')
+
+    async def test_no_store_is_not_cached(self) -> None:
+        """Test no-store responses are fetched on every lookup."""
+        self.cache_control = 'no-store'
+        cache = AgentCardCache()
+        await cache.get('localhost:10000', self.client)
+        await cache.get('localhost:10000', self.client)
+        self.assertEqual(len(self.requests), 2)
+        self.assertNotIn('if-none-match', self.requests[1].headers)
+
+    async def test_registration_copies_the_cached_card(self) -> None:
+        """Test registered cards get the agent url without changing the cache."""
+        self.card = {**CARD, 'url': ''}
+        cache = AgentCardCache()
+        [card] = await cache.get_for_registration(
+            ['localhost:10000'], self.client
+        )
+        self.assertEqual(card.url, 'localhost:10000')
+        cached = await cache.get('localhost:10000', self.client)
+        self.assertIsNot(cached, card)
+        self.assertEqual(cached.url, '')
+
+    async def test_registration_skips_failed_agents(self) -> None:
+        """Test failing agents are skipped unless all of them fail."""
+        cache = AgentCardCache()
+        cards = await cache.get_for_registration(
+            ['localhost:10000', 'missing:1'], self.client
+        )
+        self.assertEqual([x.name for x in cards], ['Currency Agent'])
+        with self.assertRaises(httpx.HTTPStatusError):
+            await cache.get_for_registration(['missing:1'], self.client)
+
+
+if __name__ == '__main__':
+    unittest.main()
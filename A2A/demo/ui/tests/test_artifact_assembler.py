@@ -0,0 +1,117 @@
+import unittest
+
+from unittest import mock
+
+from common.types import Artifact, DataPart, TextPart
+from service.server.artifact_assembler import ArtifactAssembler
+
+
+def chunk(
+    text: str, append: bool | None = None, last_chunk: bool | None = False
+) -> Artifact:
+    return Artifact(
+        name='answer',
+        parts=[TextPart(text=text)],
+        append=append,
+        lastChunk=last_chunk,
+    )
+
+
+class ArtifactAssemblerTest(unittest.TestCase):
+    """Tests for the streaming ArtifactAssembler."""
+
+    def test_single_chunk_is_returned_as_is(self) -> None:
+        """Test an artifact sent in one chunk needs no assembly."""
+        assembler = ArtifactAssembler()
+        artifact = chunk('Hello', last_chunk=None)
+        self.assertIs(assembler.add('t1', artifact), artifact)
+
+    def test_chunks_are_assembled_and_text_coalesced(self) -> None:
+        """Test chunks are joined into one artifact with one text part."""
+        assembler = ArtifactAssembler()
+        self.assertIsNone(assembler.add('t1', chunk('a')))
+        self.assertIsNone(assembler.add('t1', chunk('b', append=True)))
+        self.assertEqual(assembler.metrics().in_flight_bytes, 2)
+        artifact = assembler.add('t1', chunk('c', append=True, last_chunk=True))
+        self.assertEqual([x.text for x in artifact.parts], ['abc'])
+        self.assertEqual(artifact.name, 'answer')
+        self.assertIsNone(artifact.lastChunk)
+        metrics = assembler.metrics()
+        self.assertEqual(metrics.in_flight_bytes, 0)
+        self.assertEqual(metrics.completed, 1)
+
+    def test_non_text_parts_split_text_runs(self) -> None:
+        """Test only adjacent text parts are coalesced."""
+        assembler = ArtifactAssembler()
+        assembler.add('t1', chunk('a'))
+        data = Artifact(
+            parts=[DataPart(data={'k': 'v'})], append=True, lastChunk=False
+        )
+        assembler.add('t1', data)
+        assembler.add('t1', chunk('b', append=True))
+        artifact = assembler.add('t1', chunk('c', append=True, last_chunk=True))
+        self.assertEqual(
+            [x.type for x in artifact.parts], ['text', 'data', 'text']
+        )
+        self.assertEqual(artifact.parts[2].text, 'bc')
+
+    def test_appends_before_first_chunk(self) -> None:
+        """Test appends and the last chunk may arrive before the first."""
+        assembler = ArtifactAssembler()
+        self.assertIsNone(assembler.add('t1', chunk('b', append=True)))
+        self.assertIsNone(
+            assembler.add('t1', chunk('c', append=True, last_chunk=True))
+        )
+        artifact = assembler.add('t1', chunk('a'))
+        self.assertEqual(artifact.parts[0].text, 'abc')
+
+    def test_chunk_without_append_replaces_the_content(self) -> None:
+        """Test a later chunk without append replaces the streamed text."""
+        assembler = ArtifactAssembler()
+        assembler.add('t1', chunk('stream'))
+        assembler.add('t1', chunk('ed text', append=True))
+        artifact = assembler.add('t1', chunk('error', last_chunk=True))
+        self.assertEqual([x.text for x in artifact.parts], ['error'])
+        self.assertEqual(assembler.metrics().in_flight_bytes, 0)
+
+    def test_task_cap_discards_artifact(self) -> None:
+        """Test an artifact over the task cap is discarded with its chunks."""
+        assembler = ArtifactAssembler(max_task_bytes=4)
+        assembler.add('t1', chunk('abc'))
+        self.assertIsNone(assembler.add('t1', chunk('def', append=True)))
+        self.assertIsNone(assembler.add('t1', chunk('g', append=True)))
+        self.assertIsNone(
+            assembler.add('t1', chunk('h', append=True, last_chunk=True))
+        )
+        metrics = assembler.metrics()
+        self.assertEqual(metrics.discarded, 1)
+        self.assertEqual(metrics.in_flight_artifacts, 0)
+        # A new stream for the same artifact is assembled again.
+        assembler.add('t1', chunk('a'))
+        artifact = assembler.add('t1', chunk('b', append=True, last_chunk=True))
+        self.assertEqual(artifact.parts[0].text, 'ab')
+
+    def test_total_cap_discards_least_recently_updated(self) -> None:
+        """Test the global cap discards the stalest partial artifact."""
+        assembler = ArtifactAssembler(max_total_bytes=4)
+        assembler.add('t1', chunk('ab'))
+        assembler.add('t2', chunk('cd'))
+        assembler.add('t2', chunk('e', append=True))
+        metrics = assembler.metrics()
+        self.assertEqual(metrics.in_flight_artifacts, 1)
+        self.assertEqual(metrics.in_flight_bytes, 3)
+
+    def test_stale_partial_artifacts_expire(self) -> None:
+        """Test partial artifacts without chunks for the ttl are dropped."""
+        assembler = ArtifactAssembler(ttl=10)
+        with mock.patch('time.monotonic', return_value=100.0):
+            assembler.add('t1', chunk('a'))
+        with mock.patch('time.monotonic', return_value=111.0):
+            assembler.add('t2', chunk('b'))
+        metrics = assembler.metrics()
+        self.assertEqual(metrics.expired, 1)
+        self.assertEqual(metrics.in_flight_artifacts, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
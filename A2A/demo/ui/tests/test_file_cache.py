@@ -0,0 +1,127 @@
+import base64
+import os
+import tempfile
+import unittest
+
+from common.types import FileContent, FilePart, Message, TextPart
+from service.server.file_cache import FileCache
+
+
+def make_image_message(data: bytes) -> Message:
+    return Message(
+        role='agent',
+        parts=[
+            TextPart(text='Here it is'),
+            FilePart(
+                file=FileContent(
+                    mimeType='image/png',
+                    bytes=base64.b64encode(data).decode('utf-8'),
+                )
+            ),
+        ],
+        metadata={'message_id': 'm1'},
+    )
+
+
+class FileCacheTest(unittest.TestCase):
+    """Tests for the content addressed FileCache."""
+
+    def test_put_deduplicates_by_content(self) -> None:
+        """Test the same bytes are stored once under their digest."""
+        cache = FileCache()
+        digest = cache.put(b'image', 'image/png')
+        self.assertEqual(cache.put(b'image', 'image/png'), digest)
+        self.assertNotEqual(cache.put(b'other', 'image/png'), digest)
+        cached = cache.get(digest)
+        self.assertEqual(cache.read(cached), b'image')
+        self.assertEqual(cache.read(cached, 1, 3), b'ma')
+        self.assertEqual(cache.metrics().files, 2)
+
+    def test_evicts_least_recently_used(self) -> None:
+        """Test resident bytes are bounded by evicting the oldest file."""
+        cache = FileCache(max_bytes=8)
+        first = cache.put(b'aaaa', 'text/plain')
+        second = cache.put(b'bbbb', 'text/plain')
+        # Reading the first file makes the second the least recently used.
+        cache.get(first)
+        cache.put(b'cccc', 'text/plain')
+        self.assertIsNotNone(cache.get(first))
+        self.assertIsNone(cache.get(second))
+        metrics = cache.metrics()
+        self.assertEqual(metrics.memory_bytes, 8)
+        self.assertEqual(metrics.evictions, 1)
+
+    def test_spills_to_disk(self) -> None:
+        """Test evicted files are spilled to disk and read back."""
+        with tempfile.TemporaryDirectory() as spill_dir:
+            cache = FileCache(max_bytes=4, spill_dir=spill_dir)
+            first = cache.put(b'aaaa', 'text/plain')
+            cache.put(b'bbbb', 'text/plain')
+            cached = cache.get(first)
+            self.assertIsNone(cached.data)
+            self.assertEqual(cache.read(cached), b'aaaa')
+            self.assertEqual(cache.read(cached, 2), b'aa')
+            metrics = cache.metrics()
+            self.assertEqual(metrics.memory_bytes, 4)
+            self.assertEqual(metrics.disk_bytes, 4)
+
+    def test_message_view_replaces_file_parts(self) -> None:
+        """Test file content is served by url without changing the message."""
+        cache = FileCache()
+        message = make_image_message(b'png')
+        view = cache.message_view(message)
+        self.assertIsNotNone(message.parts[1].file.bytes)
+        self.assertIs(view.parts[0], message.parts[0])
+        self.assertIsNone(view.parts[1].file.bytes)
+        digest = view.parts[1].file.uri.partition('?')[0].rsplit('/', 1)[-1]
+        self.assertEqual(cache.read(cache.get(digest)), b'png')
+        text_message = Message(role='user', parts=[TextPart(text='Hi')])
+        self.assertIs(cache.message_view(text_message), text_message)
+
+    def test_evicted_file_is_restored_from_its_message(self) -> None:
+        """Test an evicted file is only decoded again from its message."""
+        cache = FileCache(max_bytes=4)
+        message = make_image_message(b'aaaa')
+        view = cache.message_view(message)
+        path, _, query = view.parts[1].file.uri.partition('?')
+        self.assertEqual(query, 'message_id=m1')
+        digest = path.rsplit('/', 1)[-1]
+        cache.put(b'bbbb', 'text/plain')
+        self.assertIsNone(cache.get(digest))
+        self.assertIsNone(cache.restore(digest, make_image_message(b'other')))
+        self.assertEqual(cache.read(cache.restore(digest, message)), b'aaaa')
+        self.assertEqual(cache.metrics().memory_bytes, 4)
+
+    def test_disk_is_bounded(self) -> None:
+        """Test spilled files are removed from disk beyond its limit."""
+        with tempfile.TemporaryDirectory() as spill_dir:
+            cache = FileCache(
+                max_bytes=4, spill_dir=spill_dir, max_disk_bytes=8
+            )
+            digests = [
+                cache.put(x * 4, 'text/plain') for x in [b'a', b'b', b'c', b'd']
+            ]
+            self.assertIsNone(cache.get(digests[0]))
+            self.assertEqual(len(os.listdir(spill_dir)), 2)
+            metrics = cache.metrics()
+            self.assertEqual(metrics.files, 3)
+            self.assertEqual(metrics.disk_bytes, 8)
+            self.assertEqual(metrics.evictions, 1)
+
+    def test_read_after_removal_from_disk_raises(self) -> None:
+        """Test reading a file removed from disk since it was looked up."""
+        with tempfile.TemporaryDirectory() as spill_dir:
+            cache = FileCache(
+                max_bytes=4, spill_dir=spill_dir, max_disk_bytes=4
+            )
+            first = cache.put(b'aaaa', 'text/plain')
+            cache.put(b'bbbb', 'text/plain')
+            cached = cache.get(first)
+            self.assertEqual(cache.read(cached), b'aaaa')
+            cache.put(b'cccc', 'text/plain')
+            with self.assertRaises(OSError):
+                cache.read(cached)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import unittest
+
+from common.types import Message, TextPart
+from service.server.message_executor import MessageExecutor, QueueFullError
+
+
+def make_message(conversation_id: str, message_id: str) -> Message:
+    return Message(
+        role='user',
+        parts=[TextPart(text='Hello')],
+        metadata={
+            'conversation_id': conversation_id,
+            'message_id': message_id,
+        },
+    )
+
+
+class MessageExecutorTest(unittest.TestCase):
+    """Tests for the bounded MessageExecutor."""
+
+    def test_conversation_order_is_preserved(self) -> None:
+        """Test messages of one conversation are processed in order."""
+        processed = []
+        done = threading.Event()
+
+        async def handler(message: Message):
+            await asyncio.sleep(0.001)
+            processed.append(message.metadata['message_id'])
+            if len(processed) == 10:
+                done.set()
+
+        executor = MessageExecutor(handler, max_concurrency=4)
+        self.addCleanup(executor.shutdown)
+        for i in range(10):
+            executor.submit(make_message('c1', str(i)))
+        self.assertTrue(done.wait(5))
+        self.assertEqual(processed, [str(i) for i in range(10)])
+        metrics = executor.metrics()
+        self.assertEqual(metrics.completed, 10)
+        self.assertEqual(metrics.queue_depth, 0)
+
+    def test_submit_rejects_when_queue_is_full(self) -> None:
+        """Test messages are rejected instead of queued without bound."""
+        release = threading.Event()
+
+        async def handler(message: Message):
+            while not release.is_set():
+                await asyncio.sleep(0.001)
+
+        executor = MessageExecutor(handler, max_concurrency=1, max_queue_size=1)
+        self.addCleanup(executor.shutdown)
+        self.addCleanup(release.set)
+        executor.submit(make_message('c1', '1'))
+        while executor.metrics().in_flight == 0:
+            threading.Event().wait(0.001)
+        # The first message occupies the only worker, the second one waits.
+        executor.submit(make_message('c2', '2'))
+        with self.assertRaises(QueueFullError):
+            executor.submit(make_message('c3', '3'))
+        self.assertEqual(executor.metrics().rejected, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
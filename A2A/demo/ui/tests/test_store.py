@@ -0,0 +1,255 @@
+import os
+import tempfile
+import unittest
+
+from common.types import Message, Task, TaskState, TaskStatus, TextPart
+from service.server.database import SqliteDatabase
+from service.server.store import InMemoryStore
+from service.types import Conversation, Event
+
+
+def make_message(message_id: str, text: str = 'Hello') -> Message:
+    return Message(
+        role='agent',
+        parts=[TextPart(text=text)],
+        metadata={'message_id': message_id},
+    )
+
+
+class InMemoryStoreTest(unittest.TestCase):
+    """Tests for the indexed InMemoryStore."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.store = InMemoryStore()
+
+    def test_get_conversation(self) -> None:
+        """Test conversations are indexed by id."""
+        conversation = Conversation(conversation_id='c1', is_active=True)
+        self.store.add_conversation(conversation)
+        self.assertIs(self.store.get_conversation('c1'), conversation)
+        self.assertIsNone(self.store.get_conversation('missing'))
+        self.assertIsNone(self.store.get_conversation(None))
+
+    def test_upsert_task_replaces_and_indexes_conversation(self) -> None:
+        """Test upserting a task replaces it and indexes its conversation."""
+        task = Task(
+            id='t1', sessionId='c1', status=TaskStatus(state=TaskState.WORKING)
+        )
+        self.store.upsert_task(task)
+        updated = Task(
+            id='t1',
+            sessionId='c1',
+            status=TaskStatus(state=TaskState.COMPLETED),
+        )
+        self.store.upsert_task(updated)
+        self.assertEqual(len(self.store.tasks), 1)
+        self.assertIs(self.store.get_task('t1'), updated)
+        self.assertEqual(self.store.get_conversation_tasks('c1'), [updated])
+
+    def test_message_to_task_index(self) -> None:
+        """Test messages are resolved to their task."""
+        task = Task(id='t1', status=TaskStatus(state=TaskState.WORKING))
+        self.store.upsert_task(task)
+        self.store.attach_message_to_task('m1', 't1')
+        self.assertIs(self.store.get_task_for_message('m1'), task)
+        self.assertIsNone(self.store.get_task_for_message('m2'))
+
+    def test_pending_messages(self) -> None:
+        """Test pending message status is derived from the task history."""
+        self.store.add_pending_message('m1')
+        self.store.add_pending_message('m2')
+        task = Task(
+            id='t1',
+            status=TaskStatus(state=TaskState.WORKING),
+            history=[make_message('m1'), make_message('m3', 'Thinking')],
+        )
+        self.store.upsert_task(task)
+        self.store.attach_message_to_task('m1', 't1')
+        self.assertEqual(
+            self.store.get_pending_messages(),
+            [('m1', 'Thinking'), ('m2', '')],
+        )
+        self.store.remove_pending_message('m1')
+        self.assertEqual(self.store.pending_message_ids, ['m2'])
+
+    def test_list_tasks_since_cursor(self) -> None:
+        """Test only tasks changed after the cursor are listed."""
+        for task_id in ['t1', 't2', 't3']:
+            self.store.upsert_task(
+                Task(id=task_id, status=TaskStatus(state=TaskState.WORKING))
+            )
+        page = self.store.list_tasks(limit=2)
+        self.assertEqual([x.id for x in page.items], ['t1', 't2'])
+        self.assertTrue(page.has_more)
+        page = self.store.list_tasks(since=page.cursor)
+        self.assertEqual([x.id for x in page.items], ['t3'])
+        self.assertFalse(page.has_more)
+        # Updating a task moves it after the cursor again.
+        self.store.upsert_task(self.store.get_task('t1'))
+        page = self.store.list_tasks(since=page.cursor)
+        self.assertEqual([x.id for x in page.items], ['t1'])
+        self.assertEqual(self.store.list_tasks(since=page.cursor).items, [])
+
+    def test_list_messages_since_cursor(self) -> None:
+        """Test conversation messages are listed incrementally."""
+        self.store.add_conversation(
+            Conversation(conversation_id='c1', is_active=True)
+        )
+        self.store.add_conversation_message('c1', make_message('m1'))
+        page = self.store.list_messages('c1')
+        self.assertEqual(len(page.items), 1)
+        self.store.add_conversation_message('c1', make_message('m2'))
+        self.store.add_conversation_message('c1', make_message('m3'))
+        page = self.store.list_messages('c1', since=page.cursor, limit=1)
+        self.assertEqual(page.items[0].metadata['message_id'], 'm2')
+        self.assertTrue(page.has_more)
+        page = self.store.list_messages('c1', since=page.cursor)
+        self.assertEqual(page.items[0].metadata['message_id'], 'm3')
+        conversations = self.store.list_conversations(since=page.cursor)
+        self.assertEqual(conversations.items, [])
+        self.assertEqual(conversations.cursor, page.cursor)
+
+    def test_list_conversations_leaves_messages_out(self) -> None:
+        """Test listed conversations only count their messages."""
+        conversation = Conversation(conversation_id='c1', is_active=True)
+        self.store.add_conversation(conversation)
+        self.store.add_conversation_message('c1', make_message('m1'))
+        self.store.add_conversation_message('c1', make_message('m2'))
+        [listed] = self.store.list_conversations().items
+        self.assertEqual(listed.messages, [])
+        self.assertEqual(listed.message_count, 2)
+        self.assertEqual(len(conversation.messages), 2)
+
+    def test_list_message_views(self) -> None:
+        """Test message views are computed once when messages are added."""
+        views = []
+
+        def message_view(message: Message) -> Message:
+            views.append(message)
+            return message.model_copy(update={'parts': []})
+
+        store = InMemoryStore(message_view=message_view)
+        store.add_conversation(
+            Conversation(conversation_id='c1', is_active=True)
+        )
+        store.add_conversation_message('c1', make_message('m1'))
+        for _ in range(3):
+            page = store.list_messages('c1', views=True)
+            self.assertEqual(page.items[0].parts, [])
+        self.assertEqual(len(views), 1)
+        self.assertEqual(len(store.list_messages('c1').items[0].parts), 1)
+
+    def test_conversation_messages_are_loaded_lazily(self) -> None:
+        """Test restored conversations load their messages on first read."""
+        loads = []
+
+        def load_messages() -> list[Message]:
+            loads.append(1)
+            return [make_message('m1')]
+
+        self.store.add_conversation(
+            Conversation(conversation_id='c1', is_active=True),
+            load_messages=load_messages,
+        )
+        self.assertEqual(loads, [])
+        self.store.add_conversation_message('c1', make_message('m2'))
+        page = self.store.list_messages('c1')
+        self.assertEqual(
+            [x.metadata['message_id'] for x in page.items], ['m1', 'm2']
+        )
+        self.assertIsNotNone(self.store.get_message('m1'))
+        self.assertEqual(loads, [1])
+
+    def test_subscribe_notifies_on_change(self) -> None:
+        """Test listeners are notified of changes until unsubscribed."""
+        notifications = []
+        unsubscribe = self.store.subscribe(lambda: notifications.append(1))
+        self.store.add_pending_message('m1')
+        self.store.upsert_task(
+            Task(id='t1', status=TaskStatus(state=TaskState.WORKING))
+        )
+        self.assertEqual(len(notifications), 2)
+        unsubscribe()
+        self.store.remove_pending_message('m1')
+        self.assertEqual(len(notifications), 2)
+
+
+class PersistentStoreTest(unittest.TestCase):
+    """Tests for the InMemoryStore backed by a SQLite database."""
+
+    def setUp(self) -> None:
+        """Set up test fixtures."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'ui.db')
+        self.db = SqliteDatabase(self.path)
+        self.store = InMemoryStore(db=self.db, cache_size=2)
+
+    def tearDown(self) -> None:
+        self.db.close()
+        self.tmp.cleanup()
+
+    def add_tasks(self, count: int) -> None:
+        for i in range(count):
+            self.store.upsert_task(
+                Task(
+                    id=f't{i}',
+                    sessionId='c1',
+                    status=TaskStatus(state=TaskState.WORKING),
+                )
+            )
+
+    def add_events(self, count: int) -> None:
+        for i in range(count):
+            self.store.add_event(
+                Event(id=f'e{i}', content=make_message(f'm{i}'), timestamp=i)
+            )
+
+    def test_evicted_task_is_loaded_from_the_database(self) -> None:
+        """Test only the recently used tasks stay in memory."""
+        self.add_tasks(3)
+        self.assertEqual(list(self.store._tasks), ['t1', 't2'])
+        self.assertTrue(self.store.has_task('t0'))
+        task = self.store.get_task('t0')
+        self.assertEqual(task.id, 't0')
+        self.assertIs(self.store.get_task('t0'), task)
+        self.assertEqual(list(self.store._tasks), ['t2', 't0'])
+        self.assertEqual(
+            [x.id for x in self.store.get_conversation_tasks('c1')],
+            ['t0', 't1', 't2'],
+        )
+        self.assertIsNone(self.store.get_task('missing'))
+
+    def test_old_events_are_listed_from_the_database(self) -> None:
+        """Test events trimmed from memory are still listed in order."""
+        self.add_events(5)
+        self.assertLess(len(self.store._events), 5)
+        page = self.store.list_events(limit=2)
+        self.assertEqual([x.id for x in page.items], ['e0', 'e1'])
+        self.assertTrue(page.has_more)
+        page = self.store.list_events(page.cursor)
+        self.assertEqual([x.id for x in page.items], ['e2', 'e3', 'e4'])
+        self.assertFalse(page.has_more)
+
+    def test_tasks_and_events_outlive_the_store(self) -> None:
+        """Test a new store lists what a previous one persisted."""
+        self.add_tasks(3)
+        self.add_events(2)
+        seq = self.store.seq
+        self.db.close()
+        self.db = SqliteDatabase(self.path)
+        store = InMemoryStore(db=self.db, cache_size=2)
+        self.assertEqual(store.seq, seq)
+        self.assertEqual([x.id for x in store.tasks], ['t0', 't1', 't2'])
+        self.assertEqual([x.id for x in store.events], ['e0', 'e1'])
+        self.assertEqual(store.list_tasks(seq).items, [])
+        store.upsert_task(
+            Task(id='t0', status=TaskStatus(state=TaskState.COMPLETED))
+        )
+        page = store.list_tasks(seq)
+        self.assertEqual([x.id for x in page.items], ['t0'])
+        self.assertGreater(page.cursor, seq)
+
+
+if __name__ == '__main__':
+    unittest.main()
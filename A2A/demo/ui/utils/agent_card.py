@@ -1,11 +1,150 @@
-import requests
+import asyncio
+import dataclasses
+import time
+
+import httpx
 
 from common.types import AgentCard
 
 
-def get_agent_card(remote_agent_address: str) -> AgentCard:
+# Seconds an agent card is reused when the response sets no caching headers.
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_TIMEOUT_SECONDS = 10.0
+
+
+@dataclasses.dataclass
+class _CachedCard:
+    card: AgentCard
+    etag: str | None
+    expires_at: float
+
+
+class AgentCardCache:
+    """HTTP cache for agent cards, keyed by the agent address.
+
+    Cards are reused until they expire, which is set by the max-age of the
+    response's Cache-Control header or `ttl` without one. Expired cards with
+    an ETag are revalidated with If-None-Match, so an unchanged card costs a
+    304. Responses marked no-store are not cached and no-cache ones are
+    revalidated on every lookup.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    ):
+        self._ttl = ttl
+        self._timeout = timeout
+        self._cards: dict[str, _CachedCard] = {}
+
+    async def get(
+        self, address: str, client: httpx.AsyncClient | None = None
+    ) -> AgentCard:
+        cached = self._cards.get(address)
+        if cached and cached.expires_at > time.monotonic():
+            return cached.card
+        if not client:
+            async with httpx.AsyncClient(timeout=self._timeout) as owned:
+                return await self._fetch(address, owned, cached)
+        return await self._fetch(address, client, cached)
+
+    async def get_many(
+        self, addresses: list[str], client: httpx.AsyncClient | None = None
+    ) -> list[AgentCard | Exception]:
+        """Get the cards of several agents concurrently.
+
+        Failures are returned in place of the card rather than raised, so one
+        unreachable agent does not fail the others.
+        """
+        if not client:
+            async with httpx.AsyncClient(timeout=self._timeout) as owned:
+                return await self.get_many(addresses, owned)
+        return await asyncio.gather(
+            *[self.get(x, client) for x in addresses],
+            return_exceptions=True,
+        )
+
+    async def get_for_registration(
+        self, addresses: list[str], client: httpx.AsyncClient | None = None
+    ) -> list[AgentCard]:
+        """Get the cards of the agents to register.
+
+        The cards are copies, with the url set to the agent address when the
+        card has none, so the cached cards are never changed. Agents whose
+        card cannot be fetched are logged and skipped, unless all of them
+        fail, in which case the first error is raised.
+        """
+        cards = []
+        errors = []
+        results = await self.get_many(addresses, client)
+        for address, card in zip(addresses, results, strict=True):
+            if isinstance(card, Exception):
+                print('Failed to register agent', address, card)
+                errors.append(card)
+                continue
+            cards.append(card.model_copy(update={'url': card.url or address}))
+        if errors and len(errors) == len(addresses):
+            raise errors[0]
+        return cards
+
+    async def _fetch(
+        self,
+        address: str,
+        client: httpx.AsyncClient,
+        cached: _CachedCard | None,
+    ) -> AgentCard:
+        headers = {}
+        if cached and cached.etag:
+            headers['If-None-Match'] = cached.etag
+        response = await client.get(
+            f'http://{address}/.well-known/agent.json', headers=headers
+        )
+        if cached and response.status_code == 304:
+            card = cached.card
+        else:
+            response.raise_for_status()
+            card = AgentCard(**response.json())
+        max_age = self._max_age(response.headers.get('cache-control', ''))
+        if max_age is None:
+            self._cards.pop(address, None)
+        else:
+            self._cards[address] = _CachedCard(
+                card=card,
+                etag=response.headers.get('etag')
+                or (cached.etag if cached else None),
+                expires_at=time.monotonic() + max_age,
+            )
+        return card
+
+    def _max_age(self, cache_control: str) -> float | None:
+        """Seconds to reuse a response for, None if it must not be stored."""
+        directives = {}
+        for directive in cache_control.lower().split(','):
+            name, _, value = directive.strip().partition('=')
+            directives[name] = value.strip('"')
+        if 'no-store' in directives:
+            return None
+        if 'no-cache' in directives:
+            return 0
+        try:
+            return float(directives['max-age'])
+        except (KeyError, ValueError):
+            return self._ttl
+
+
+_cache = AgentCardCache()
+
+
+async def get_agent_card(remote_agent_address: str) -> AgentCard:
     """Get the agent card."""
-    agent_card = requests.get(
-        f'http://{remote_agent_address}/.well-known/agent.json'
-    )
-    return AgentCard(**agent_card.json())
+    return await _cache.get(remote_agent_address)
+
+
+async def get_agent_cards_for_registration(
+    remote_agent_addresses: str | list[str],
+) -> list[AgentCard]:
+    """Get copies of the cards of the agents to register."""
+    if isinstance(remote_agent_addresses, str):
+        remote_agent_addresses = [remote_agent_addresses]
+    return await _cache.get_for_registration(remote_agent_addresses)